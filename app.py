@@ -1,13 +1,34 @@
 import time
+import asyncio
 import logging
 import os
 import sys
 import json
-import re
-import urllib.request
-from datetime import datetime, timedelta
-from flask import Flask, request, jsonify, send_from_directory
+import threading
+from datetime import datetime
+from flask import Flask, Response, request, jsonify, send_file, send_from_directory
 from flask_cors import CORS
+from browser_pool import BrowserPool
+from jobs import JobQueue, QueueFull
+from async_engine import AsyncPurchaseEngine
+from purchase_scheduler import ScheduleStore, PurchaseScheduler
+from session_cache import SessionCache
+from screencast import Screencast, AsyncScreencast, ScreencastHub, ViewerLimit, mjpeg
+from capture import CaptureStore
+from resource_filter import ResourceRules, ResourceBlocker
+from page_probe import PageProbes, LOGIN_STATE_JS
+from selector_resolver import SelectorResolver
+from readiness import Readiness, CachedCheck
+import metrics
+from history_store import HistoryStore, HistoryIndex, HistoryCompactor
+from draw_cache import DrawResultCache
+from draw_archive import DrawArchive, DrawClient
+import draw_schedule
+from stats import DrawStats
+import recommend
+import grading
+import backtest
+import numpy as np
 
 # ── Render/Docker 환경 브라우저 경로 근본 해결 ──────────────────
 def _setup_browser_env():
@@ -33,7 +54,7 @@ def _setup_browser_env():
         os.environ['PLAYWRIGHT_BROWSERS_PATH'] = "/opt/render/.cache/ms-playwright"
     return None
 
-_setup_browser_env()
+BROWSERS_PATH = _setup_browser_env()   # 시작 시 1회만 탐색
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -44,12 +65,24 @@ logger = logging.getLogger(__name__)
 # ── 기본 경로 ──────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# `python app.py` 실행 시 백테스트 워커(spawn)가 이 모듈을 __mp_main__으로 다시 import 하므로
+# 백그라운드 스레드는 실제 서버 프로세스에서만 시작
+SERVER_PROCESS = __name__ != '__mp_main__'
+
 # ── Flask 앱 (즉시 생성 → gunicorn 포트 감지용) ───────────────
 app = Flask(__name__)
 CORS(app)
 
-# ── 구매 이력 파일 ─────────────────────────────────────────────
+# ── 구매 이력 저장소 (SQLite, 기존 JSON 파일은 최초 1회 이전) ──────
 HISTORY_FILE = os.path.join(BASE_DIR, 'purchase_history.json')
+HISTORY_DB = os.environ.get('HISTORY_DB', os.path.join(BASE_DIR, 'purchase_history.db'))
+history_store = HistoryStore(HISTORY_DB, legacy_json=HISTORY_FILE)
+history_index = HistoryIndex(history_store)   # user_id별 메모리 캐시
+HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', 30))      # 보관 기간(일)
+HISTORY_COMPACT_INTERVAL = int(os.environ.get('HISTORY_COMPACT_INTERVAL', 3600)) # 정리 주기(초)
+history_compactor = HistoryCompactor(
+    history_store, retention_days=HISTORY_RETENTION_DAYS, interval=HISTORY_COMPACT_INTERVAL
+)   # 시작은 채점 훅 등록 후 (아래 '구매 이력 당첨 채점')
 
 # ── User-Agent ────────────────────────────────────────────────
 UA = (
@@ -58,8 +91,52 @@ UA = (
     "Chrome/133.0.0.0 Safari/537.36"
 )
 
-# ── 실시간 화면 중계용 ──────────────────────────────────────────
-latest_screenshot = None
+# ── 실시간 화면 중계 (작업별 CDP 스크린캐스트 → MJPEG push) ───────────
+SCREENCAST_FPS = float(os.environ.get('SCREENCAST_FPS', 2))          # 초당 최대 전송 프레임
+SCREENCAST_QUALITY = int(os.environ.get('SCREENCAST_QUALITY', 60))   # JPEG 품질
+SCREENCAST_MAX_WIDTH = int(os.environ.get('SCREENCAST_MAX_WIDTH', 800))
+SCREENCAST_MAX_VIEWERS = int(os.environ.get('SCREENCAST_MAX_VIEWERS', 2))        # 전체 동시 시청자 (gthread 스레드 4개 중)
+SCREENCAST_VIEWERS_PER_JOB = int(os.environ.get('SCREENCAST_VIEWERS_PER_JOB', 1))
+screen_hub = ScreencastHub(fps=SCREENCAST_FPS, max_viewers=SCREENCAST_MAX_VIEWERS,
+                           max_viewers_per_stream=SCREENCAST_VIEWERS_PER_JOB)
+
+# ── 동행복권 사이트 주소 (벤치마크/테스트 시 mock_site.py 주소로 교체) ───────
+WWW_URL = os.environ.get('DHLOTTERY_WWW_URL', 'https://www.dhlottery.co.kr').rstrip('/')
+OL_URL = os.environ.get('DHLOTTERY_OL_URL', 'https://ol.dhlottery.co.kr').rstrip('/')
+EL_URL = os.environ.get('DHLOTTERY_EL_URL', 'https://el.dhlottery.co.kr').rstrip('/')
+LOTTO_PAGE_URL = f"{OL_URL}/olotto/game/game645.do"               # 로그인 확인용 로또 전용 페이지
+PURCHASE_PAGE_URL = f"{EL_URL}/game/TotalGame.jsp?LottoId=LO40"   # 6/45 구매 페이지
+
+# ── 단계별 버튼/팝업 선택자 (동기·비동기 구매 흐름 공용, 앞쪽 후보 우선) ──────
+PORTAL_BUTTONS = [   # 간소화 페이지 → 통합포탈 이동
+    "a:text-is('동행복권통합포탈이동')",
+    "button:text-is('동행복권통합포탈이동')",
+    "a:has-text('통합포탈')",
+    "button:has-text('통합포탈')",
+    "a:text-is('동행복권포탈이동')", # 기존 대비용
+]
+LOGIN_ALERT = ".alert_msg, .login_fail, #popupLayer"
+CLOSE_BUTTONS = [
+    "input[value='닫기']", ".close_btn", ".btn_close",
+    "a:text-is('닫기')", "button:text-is('닫기')"
+]
+CONFIRM_BUTTONS = ["#btnSelectNum", "input[value='확인']", "a.btn_common:text-is('확인')"]
+BUY_BUTTONS = ["#btnBuy", "input[value='구매하기']", "a.btn_common:text-is('구매하기')", "button:text-is('구매하기')"]
+POPUP_BUTTONS = [   # "구매하시겠습니까?" 확인
+    "#popupLayerConfirm input[value='확인']",
+    ".btn_confirm input[value='확인']",
+    "input[value='확인']",
+    "a:text-is('확인')", "button:text-is('확인')"
+]
+RECEIPT_BUTTONS = [   # 구매내역 팝업 확인
+    ".btn_popup_buy_confirm input[value='확인']",
+    ".confirm input[value='확인']",
+    "input[value='확인']",
+    "a:text-is('확인')", "button:text-is('확인')"
+]
+CONFIRM_POPUP = ["#popupLayerConfirm", ".btn_confirm"]
+CONFIRM_LAYER = ["#popupLayerConfirm"]
+RESULT_POPUP = [".btn_popup_buy_confirm", "#report", "#popReceipt"]
 
 # ── 프록시/타이밍 설정 ──────────────────────────────────────────
 PROXY_SERVER = os.environ.get('PROXY_SERVER') # 예: http://ip:port
@@ -67,6 +144,192 @@ PROXY_USER = os.environ.get('PROXY_USER')
 PROXY_PASS = os.environ.get('PROXY_PASS')
 DEFAULT_TIMEOUT = 60000 # 60초 (60,000ms)
 
+# ── 단계별 대기 상한 프로필 (ms) ───────────────────────────────
+# 고정 sleep 대신 각 단계가 의존하는 조건(프레임/체크 상태/팝업/버튼)을 기다리며,
+# 아래 값은 조건이 충족되지 않을 때 포기하기까지의 최대 대기 시간이다.
+TIMING_PROFILES = {
+    "default": {
+        "page_load": 10000,     # 메인/로그인 페이지 load 이벤트
+        "login_form": 30000,    # 아이디 입력창 표시
+        "login_result": 15000,  # 로그인 후 성공/실패/간소화 페이지 판정
+        "frame": 30000,         # 구매 페이지 게임 프레임 등장
+        "board": 10000,         # 프레임 내 번호 체크박스 로딩
+        "board_reset": 3000,    # 마킹판 초기화(모든 체크 해제)
+        "mark": 3000,           # 번호 1개 체크 상태 반영
+        "selected": 5000,       # '확인' 후 선택 번호 반영 또는 경고창
+        "confirm_popup": 5000,  # '구매하기' 후 구매확인 팝업 또는 경고창
+        "result_popup": 8000,   # 구매확인 후 구매내역 팝업 또는 경고창
+        "type_delay_id": 150,   # 아이디 입력 키 간격 (사람 입력 위장)
+        "type_delay_pw": 200,   # 비밀번호 입력 키 간격
+    },
+    "slow": {
+        "page_load": 20000, "login_form": 45000, "login_result": 30000,
+        "frame": 45000, "board": 20000, "board_reset": 6000, "mark": 6000,
+        "selected": 10000, "confirm_popup": 10000, "result_popup": 15000,
+        "type_delay_id": 150, "type_delay_pw": 200,
+    },
+}
+TIMING = {
+    **TIMING_PROFILES.get(os.environ.get('TIMING_PROFILE', 'default'), TIMING_PROFILES["default"]),
+    **json.loads(os.environ.get('TIMING_OVERRIDES') or '{}'),   # 예: {"frame": 20000}
+}
+
+# ── 브라우저 풀 설정 ────────────────────────────────────────────
+BROWSER_POOL_SIZE = int(os.environ.get('BROWSER_POOL_SIZE', 1))             # 미리 띄워둘 브라우저 수
+BROWSER_MAX_JOBS = int(os.environ.get('BROWSER_MAX_JOBS', 20))              # N회 작업 후 브라우저 재활용
+BROWSER_HEALTH_INTERVAL = int(os.environ.get('BROWSER_HEALTH_INTERVAL', 30)) # 유휴 헬스체크 주기(초)
+# ── 구매 작업 대기열 설정 ──────────────────────────────────────
+PURCHASE_CONCURRENCY = int(os.environ.get('PURCHASE_CONCURRENCY', BROWSER_POOL_SIZE))  # 동시 구매 수
+PURCHASE_QUEUE_MAX = int(os.environ.get('PURCHASE_QUEUE_MAX', 20))                     # 대기열 최대 길이
+# thread: 워커 스레드 + 브라우저 풀 (sync API) / async: 이벤트 루프 1개 + 브라우저 1개에서 컨텍스트 동시 실행
+PURCHASE_ENGINE = os.environ.get('PURCHASE_ENGINE', 'thread')
+ASYNC_PURCHASE_CONCURRENCY = int(os.environ.get('ASYNC_PURCHASE_CONCURRENCY', 4))  # async 엔진 동시 컨텍스트 수
+PURCHASE_TIMEOUT = int(os.environ.get('PURCHASE_TIMEOUT', 300))                       # async 엔진 작업당 제한 시간(초)
+
+# ── 로그인 세션 캐시 설정 ──────────────────────────────────────
+SESSION_CACHE_TTL = int(os.environ.get('SESSION_CACHE_TTL', 1200))   # 세션 재사용 허용 시간(초)
+SESSION_CACHE_MAX = int(os.environ.get('SESSION_CACHE_MAX', 50))     # 최대 보관 사용자 수 (LRU)
+SESSION_CACHE_DIR = os.environ.get('SESSION_CACHE_DIR', os.path.join(BASE_DIR, '.session_cache'))
+session_cache = SessionCache(
+    SESSION_CACHE_DIR,
+    ttl=SESSION_CACHE_TTL,
+    max_entries=SESSION_CACHE_MAX,
+    key=os.environ.get('SESSION_CACHE_KEY'),   # Fernet 키 (미설정 시 프로세스 임시 키)
+)
+
+# ── 버튼 위치 학습 (단계별로 찾은 프레임/선택자를 기억해 다음 구매 때 먼저 확인) ──
+SELECTOR_CACHE_FILE = os.environ.get('SELECTOR_CACHE_FILE', os.path.join(BASE_DIR, '.selector_cache.json'))
+selector_resolver = SelectorResolver(
+    SELECTOR_CACHE_FILE or None,
+    on_resolve=lambda step, result: SELECTOR_RESOLVE.inc(step=step, result=result),
+)
+
+# ── 실패/지연 작업 trace + HAR 보관 (기본 꺼짐, 정상 작업 기록은 버림) ──────
+CAPTURE_ENABLED = os.environ.get('CAPTURE_ENABLED', '0') == '1'
+CAPTURE_DIR = os.environ.get('CAPTURE_DIR', os.path.join(BASE_DIR, 'captures'))
+CAPTURE_SLOW_SECONDS = float(os.environ.get('CAPTURE_SLOW_SECONDS', 90))   # 이 시간 이상 걸리면 성공해도 보관
+CAPTURE_MAX_COUNT = int(os.environ.get('CAPTURE_MAX_COUNT', 20))
+CAPTURE_MAX_MB = int(os.environ.get('CAPTURE_MAX_MB', 200))
+capture_store = CaptureStore(
+    CAPTURE_DIR, max_count=CAPTURE_MAX_COUNT, max_bytes=CAPTURE_MAX_MB * 1024 * 1024,
+    slow_seconds=CAPTURE_SLOW_SECONDS,
+) if CAPTURE_ENABLED else None
+
+# ── 불필요한 리소스 차단 (이미지/폰트/미디어 + 외부 분석 스크립트) ─────────
+# 허용 도메인의 문서/스크립트/XHR(구매 흐름의 iframe·스크립트)은 항상 통과
+RESOURCE_BLOCKING = os.environ.get('RESOURCE_BLOCKING', '1') == '1'
+resource_rules = ResourceRules.from_strings(
+    os.environ.get('RESOURCE_BLOCK_TYPES', 'image,media,font'),
+    os.environ.get('RESOURCE_DENY_DOMAINS',
+                   'google-analytics.com,googletagmanager.com,googlesyndication.com,'
+                   'doubleclick.net,facebook.net,facebook.com,wcs.naver.net'),
+    os.environ.get('RESOURCE_ALLOW_DOMAINS', 'dhlottery.co.kr'),
+)
+
+# ── 한 장(티켓)당 최대 게임 수 (6/45 용지 A~E) ──────────────────
+MAX_GAMES_PER_TICKET = 5
+
+# ── 구매 진행 단계 (단계명: (진행률, 메시지)) ──────────────────
+PURCHASE_STEPS = {
+    "browser": (5,  "🌐 브라우저 준비 중..."),
+    "login":   (20, "🔐 연계 계정 로그인 처리 중..."),
+    "page":    (35, "🎱 로또 6/45 구매 페이지 진입 중..."),
+    "round":   (45, "📅 회차 정보 확인 중..."),
+    "marking": (60, "🔢 번호 자동 선택 및 마킹 중..."),
+    "confirm": (75, "✔️ 선택 번호 확정 중..."),
+    "buy":     (85, "💳 최종 구매 확정 처리 중..."),
+    "popup":   (92, "⏳ 최종 결과 수신 대기 중..."),
+}
+
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-blink-features=AutomationControlled",
+    "--disable-infobars",
+    "--disable-gpu",
+    "--no-zygote",
+    "--disable-software-rasterizer"
+]
+
+# ── 구매 지표 (/metrics, Prometheus 텍스트 포맷) ──────────────────
+PURCHASE_STEP_SECONDS = metrics.Histogram(
+    "lotto_purchase_step_seconds", "구매 단계별 소요 시간(초)", ["step"],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+PURCHASE_SECONDS = metrics.Histogram(
+    "lotto_purchase_seconds", "구매 1건 전체 소요 시간(초)", ["result"],
+    buckets=(5, 10, 20, 30, 45, 60, 90, 120, 180, 300),
+)
+PURCHASE_TOTAL = metrics.Counter("lotto_purchase_total", "구매 결과 건수", ["result", "reason"])
+PURCHASE_DIALOGS = metrics.Counter("lotto_purchase_dialogs_total", "구매 중 사이트 경고창 건수", ["reason"])
+BLOCKED_REQUESTS = metrics.Counter("lotto_blocked_requests_total", "차단한 리소스 요청 수", ["type"])
+BLOCKED_BYTES = metrics.Counter("lotto_blocked_bytes_estimate_total", "리소스 차단으로 절감한 추정 바이트")
+PAGE_PROBES = metrics.Counter("lotto_page_probes_total", "페이지 상태 조회(evaluate) 횟수", ["kind"])
+SELECTOR_RESOLVE = metrics.Counter("lotto_selector_resolve_total", "버튼 위치 조회 결과 (hit: 학습 위치 적중)", ["step", "result"])
+SCHEDULED_PURCHASES = metrics.Counter("lotto_scheduled_purchases_total", "정기 구매 실행 결과", ["outcome"])
+PAGE_PROBE_BYTES = metrics.Counter("lotto_page_probe_bytes_avoided_total", "page.content() 대신 상태 조회로 절감한 HTML 바이트")
+
+def _on_probe(kind, bytes_avoided):
+    PAGE_PROBES.inc(kind=kind)
+    PAGE_PROBE_BYTES.inc(bytes_avoided)
+
+# 로그인/회차 판정용 페이지 상태 조회 (DOM 전체 직렬화 없이 evaluate 1회)
+page_probes = PageProbes(on_probe=_on_probe)
+
+# 사이트 경고창(dialog) 문구 → 실패 사유
+DIALOG_REASONS = [
+    ("부족", "insufficient_balance"),
+    ("초과", "limit_exceeded"),
+    ("마감", "sales_closed"),
+    ("로그인", "login"),
+    ("오류", "site_error"),
+    ("실패", "rejected"),
+]
+
+def _dialog_reason(message):
+    for keyword, reason in DIALOG_REASONS:
+        if keyword in message:
+            return reason
+    return None
+
+def _insufficient_funds(dialog_msgs):
+    return any("부족" in m for m in dialog_msgs)
+
+def _add_failure(idx, message):
+    """게임 추가('확인') 단계 실패 메시지 - 일부 게임만 담긴 채 구매하지 않도록 즉시 중단"""
+    if _insufficient_funds([message]):
+        return f"예치금 부족: {message}"
+    return f"{idx}게임 추가 실패: {message}"
+
+def _success_message(games):
+    return f"✅ {len(games)}게임 구매 성공! 동행복권 마이페이지에서 구매내역을 확인하세요."
+
+def _failure_reason(message):
+    """구매 실패 메시지 → 지표 라벨"""
+    message = message or ""
+    if message.startswith("시스템 오류"):
+        return "system"
+    if message.startswith("구매 중 오류"):
+        return "exception"
+    if "로그인 실패" in message:
+        return "login"
+    return _dialog_reason(message) or ("ui" if "버튼" in message else "other")
+
+def _span(step):
+    """구매 단계 소요 시간 측정 (with _span("login"): ...)"""
+    return PURCHASE_STEP_SECONDS.time(step=step)
+
+def _report(progress, step):
+    """진행 단계 콜백 호출 (작업 상태 조회용, 실패해도 구매에는 영향 없음)"""
+    if not progress:
+        return
+    try:
+        pct, msg = PURCHASE_STEPS[step]
+        progress(step, pct, msg)
+    except Exception:
+        pass
+
 def _get_proxy_config():
     if not PROXY_SERVER:
         return None
@@ -80,34 +343,23 @@ def _get_proxy_config():
 #  이력 관리
 # ══════════════════════════════════════════════════════════════
 def load_history(user_id=None):
-    """구매 이력 로드 + 30일 초과 자동 삭제 (user_id 기준 필터)"""
-    if not os.path.exists(HISTORY_FILE):
-        return []
+    """구매 이력 로드 (보관 기간 내, user_id 기준 필터) - 삭제는 백그라운드 정리 작업이 담당"""
     try:
-        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-            history = json.load(f)
-        cutoff = datetime.now() - timedelta(days=30)
-        filtered = [h for h in history if datetime.fromisoformat(h['timestamp']) > cutoff]
-        if len(filtered) != len(history):
-            save_history(filtered)
-        # 사용자 ID로 필터링
         if user_id:
-            filtered = [h for h in filtered if h.get('user_id') == user_id]
-        return filtered
+            return history_index.get(user_id, since=history_compactor.cutoff())
+        return history_store.load(since=history_compactor.cutoff())
     except Exception as e:
         logger.error(f"[HISTORY] 로드 실패: {e}")
         return []
 
 def save_history(history):
     try:
-        with open(HISTORY_FILE, 'w', encoding='utf-8') as f:
-            json.dump(history, f, ensure_ascii=False, indent=2)
+        history_store.replace_all(history)
+        history_index.invalidate()
     except Exception as e:
         logger.error(f"[HISTORY] 저장 실패: {e}")
 
 def add_history(numbers, round_no, round_date, user_id=None):
-    # 전체 이력 로드 (필터 없이)
-    history = load_history()
     entry = {
         'timestamp': datetime.now().isoformat(),
         'numbers': numbers,
@@ -115,167 +367,255 @@ def add_history(numbers, round_no, round_date, user_id=None):
         'round_date': round_date or datetime.now().strftime('%Y-%m-%d'),
         'user_id': user_id or 'unknown',
     }
-    history.insert(0, entry)
-    save_history(history[:500])
+    try:
+        history_index.add(entry)
+    except Exception as e:
+        logger.error(f"[HISTORY] 저장 실패: {e}")
     return entry
 
 # ══════════════════════════════════════════════════════════════
 #  Playwright 헬퍼
 # ══════════════════════════════════════════════════════════════
-def _get_playwright_module():
-    """Playwright를 lazy import (서버 시작 속도에 영향 주지 않도록)"""
-    from playwright.sync_api import sync_playwright
-    return sync_playwright
+def _is_headless():
+    if os.environ.get('HEADLESS'):   # 명시 설정 우선 (1/0)
+        return os.environ['HEADLESS'] == '1'
+    return bool(os.environ.get('RENDER') or os.environ.get('DOCKER_ENV'))
+
+def _context_options():
+    """작업마다 생성되는 격리 컨텍스트 공통 설정"""
+    return {
+        "viewport": {"width": 1920, "height": 1080},
+        "user_agent": UA,
+        "locale": "ko-KR",
+        "timezone_id": "Asia/Seoul",
+        "ignore_https_errors": True,
+    }
 
-def _capture_screenshot(page):
-    """현재 브라우저 화면 캡처 및 전역 변수 업데이트"""
-    global latest_screenshot
+# 고급 스텔스 설정 (동기/비동기 엔진 공용 init script)
+_STEALTH_JS = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    window.chrome = { runtime: {} };
+    Object.defineProperty(navigator, 'languages', { get: () => ['ko-KR', 'ko', 'en-US', 'en'] });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+"""
+
+def _new_page(context):
+    """스텔스 설정이 적용된 새 페이지 생성"""
+    context.add_init_script(_STEALTH_JS)
+    page = context.new_page()
+
+    # Playwright Stealth (있으면 적용)
     try:
-        # 가벼운 JPEG 포맷으로 캡처 (용량 최적화)
-        latest_screenshot = page.screenshot(type="jpeg", quality=60)
-    except Exception as e:
-        logger.debug(f"[SCREEN] 캡처 실패: {e}")
+        from playwright_stealth import Stealth
+        Stealth().apply_stealth_sync(page)
+    except:
+        pass
+    return page
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+def get_browser_pool():
+    """브라우저 풀 싱글턴 (최초 호출 시 브라우저 사전 실행)"""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool(
+                size=BROWSER_POOL_SIZE,
+                launch_options={
+                    "headless": _is_headless(),
+                    "proxy": _get_proxy_config(),
+                    "args": BROWSER_ARGS,
+                },
+                context_options=_context_options(),
+                page_factory=_new_page,
+                max_jobs=BROWSER_MAX_JOBS,
+                health_interval=BROWSER_HEALTH_INTERVAL,
+            ).start()
+        return _browser_pool
+
+def _wait_for(page, check, timeout, interval=100):
+    """check()가 참이 될 때까지 대기 (page.wait_for_timeout으로 이벤트/다이얼로그 처리 유지)"""
+    deadline = time.time() + timeout / 1000
+    while True:
+        try:
+            result = check()
+            if result:
+                return result
+        except Exception:
+            pass
+        if time.time() >= deadline:
+            return None
+        page.wait_for_timeout(interval)
+
+def _wait_js(page, script, timeout, arg=None):
+    """페이지 내 JS 조건 대기 (로그인 등 페이지 이동 중 컨텍스트 파괴 시 재시도)"""
+    deadline = time.time() + timeout / 1000
+    while True:
+        remaining = int((deadline - time.time()) * 1000)
+        if remaining <= 0:
+            return None
+        try:
+            return page.wait_for_function(script, arg=arg, timeout=remaining).json_value()
+        except Exception as e:
+            if "Timeout" in type(e).__name__ or "Timeout" in str(e):
+                return None
+            page.wait_for_timeout(100)
+
+def _game_frame(page):
+    """번호 선택판이 있는 프레임 (ifrm_tab → ifrm_lotto645 순)"""
+    for fname in ["ifrm_tab", "ifrm_lotto645"]:
+        frame = page.frame(name=fname)
+        if frame:
+            return frame
+    return None
+
+_VISIBLE_JS = """(sels) => sels.some(sel => {
+    const el = document.querySelector(sel);
+    return !!el && !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+})"""
+
+def _visible_in_frames(page, selectors):
+    """게임 프레임/메인 페이지 중 하나에 selectors 중 하나라도 보이면 True"""
+    targets = [f for f in [_game_frame(page)] if f] + [page.main_frame]
+    for frame in targets:
+        try:
+            if frame.evaluate(_VISIBLE_JS, selectors):
+                return True
+        except Exception:
+            pass
+    return False
 
 def is_logged_in(page):
+    return page_probes.logged_in(page)
+
+def _session_alive(page):
+    """캐시된 세션 유효성 확인 (메인 페이지 1회 접속만으로 판단)"""
     try:
-        content = page.content()
-        return "로그아웃" in content or "btn_logout" in content or "myPage" in content
-    except:
+        page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=30000)
+        return is_logged_in(page)
+    except Exception:
         return False
 
 def do_login(page, user_id, user_pw):
     logger.info(f"[LOGIN] '{user_id}' 로그인 시도...")
     try:
         logger.info("[LOGIN] 메인 홈페이지 먼저 접속 후 대기...")
-        page.goto("https://www.dhlottery.co.kr/", wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
-        time.sleep(3)
+        page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        try:
+            page.wait_for_load_state("load", timeout=TIMING["page_load"])
+        except Exception:
+            pass
 
         logger.info("[LOGIN] 로그인 페이지로 이동...")
         # 리퍼러(이전 페이지 기록)를 조작하여 정상적인 링크 탑승으로 완전 위장
-        page.goto("https://www.dhlottery.co.kr/login", 
-                  referer="https://www.dhlottery.co.kr/", 
+        page.goto(f"{WWW_URL}/login", 
+                  referer=f"{WWW_URL}/", 
                   wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
-        time.sleep(2)
 
         # 변경된 아이디 입력창 (#inpUserId)
-        page.wait_for_selector("#inpUserId", timeout=30000)
-        page.wait_for_timeout(500)
+        page.wait_for_selector("#inpUserId", state="visible", timeout=TIMING["login_form"])
         page.locator("#inpUserId").click()
         page.fill("#inpUserId", "")
-        page.type("#inpUserId", user_id, delay=150)
+        page.type("#inpUserId", user_id, delay=TIMING["type_delay_id"])
         
         # 변경된 비밀번호 입력창 (#inpUserPswdEncn)
         page.locator("#inpUserPswdEncn").click()
         page.fill("#inpUserPswdEncn", "")
-        page.type("#inpUserPswdEncn", user_pw, delay=200)
-        page.wait_for_timeout(500)
-        _capture_screenshot(page)
+        page.type("#inpUserPswdEncn", user_pw, delay=TIMING["type_delay_pw"])
 
         # 로그인 버튼 (#btnLogin)
         login_btn = page.locator("#btnLogin")
         login_btn.hover()
-        page.wait_for_timeout(300)
         login_btn.click()
-        time.sleep(3)
 
-        # 1. 일반적인 로그인 성공 확인 + 간소화 페이지 대응
-        for i in range(15):
-            content = page.content()
-            # 간소화 페이지 운영 중 메시지 감지
-            if "간소화" in content and "운영" in content:
-                logger.info("[LOGIN] ⚠️ 간소화 페이지 감지! '동행복권통합포탈이동' 버튼 클릭 시도...")
-                # '동행복권통합포탈이동' 버튼 클릭 시도
-                try:
-                    btns = [
-                        "a:text-is('동행복권통합포탈이동')",
-                        "button:text-is('동행복권통합포탈이동')",
-                        "a:has-text('통합포탈')",
-                        "button:has-text('통합포탈')",
-                        "a:text-is('동행복권포탈이동')", # 기존 대비용
-                    ]
-                    clicked = False
-                    for b in btns:
-                        if page.locator(b).first.is_visible(timeout=2000):
-                            page.locator(b).first.click()
-                            logger.info(f"[LOGIN] '{b}' 버튼 클릭 성공")
-                            clicked = True
-                            break
-                    if not clicked:
-                        # 버튼을 못 찾으면 직접 메인으로 재접속
-                        page.goto("https://www.dhlottery.co.kr/common.do?method=main", timeout=30000)
-                except:
-                    pass
-                time.sleep(3)
-            
-            if is_logged_in(page):
+        # 1. 로그인 결과(성공/실패/간소화 페이지) 중 하나가 나타날 때까지 대기
+        deadline = time.time() + TIMING["login_result"] / 1000
+        while time.time() < deadline:
+            state = page_probes.login_result(
+                _wait_js(page, LOGIN_STATE_JS, int((deadline - time.time()) * 1000)))
+
+            if state == "ok":
                 logger.info("[LOGIN] ✅ 로그인 성공!")
                 return True
-            
-            # 페이지에 '로그인 실패' 혹은 '로그인 정보' 등 키워드가 있는지 확인
-            current_text = page.content()
-            if "로그인 정보가 맞지 않습니다" in current_text or "아이디 또는 비밀번호" in current_text:
+            if state == "error":
                 logger.warning("[LOGIN] ❌ 아이디/비밀번호 불일치 메시지 감지")
                 return False
-            
-            time.sleep(1)
+            if state != "simple":
+                break
+
+            # 간소화 페이지 운영 중 메시지 감지
+            logger.info("[LOGIN] ⚠️ 간소화 페이지 감지! '동행복권통합포탈이동' 버튼 클릭 시도...")
+            # '동행복권통합포탈이동' 버튼 클릭 시도
+            try:
+                clicked = False
+                for b in PORTAL_BUTTONS:
+                    if page.locator(b).first.is_visible(timeout=2000):
+                        page.locator(b).first.click()
+                        logger.info(f"[LOGIN] '{b}' 버튼 클릭 성공")
+                        clicked = True
+                        break
+                if not clicked:
+                    # 버튼을 못 찾으면 직접 메인으로 재접속
+                    page.goto(f"{WWW_URL}/common.do?method=main", timeout=30000)
+                page.wait_for_load_state("domcontentloaded", timeout=TIMING["page_load"])
+            except:
+                pass
 
         # 2. 로또 6/45 전용 직접 확인 (간소화 페이지 우회용)
         try:
-            page.goto("https://ol.dhlottery.co.kr/olotto/game/game645.do", timeout=10000)
-            if "로그아웃" in page.content() or "게임" in page.content():
+            page.goto(LOTTO_PAGE_URL, timeout=10000)
+            state = page_probes.state(page, "lotto_page", replaces=2)
+            if state["logged_in"] or state["game"]:
                 logger.info("[LOGIN] ✅ 로또 전용 페이지를 통해 로그인 성공 확인!")
                 return True
         except: pass
 
         # 실패 메시지 확인
         try:
-            alert_msg = page.locator(".alert_msg, .login_fail, #popupLayer").first.inner_text(timeout=2000)
+            alert_msg = page.locator(LOGIN_ALERT).first.inner_text(timeout=2000)
             logger.warning(f"[LOGIN] 실패 메시지: {alert_msg}")
         except:
             pass
 
-        logger.warning("[LOGIN] ❌ 로그인 확인 실패 (15초 타임아웃)")
+        logger.warning(f"[LOGIN] ❌ 로그인 확인 실패 ({TIMING['login_result'] // 1000}초 타임아웃)")
         return False
     except Exception as e:
         logger.error(f"[LOGIN] 오류: {e}")
         return False
 
-def _click_in_frame(page, selector, frame_names=["ifrm_lotto645", "ifrm_tab"]):
-    """지정된 프레임 내에서 클릭, 실패하면 전체 프레임 및 메인에서 시도"""
-    # 1. 우선순위 프레임들 탐색
-    for frame_name in frame_names:
-        try:
-            frame = page.frame(name=frame_name)
-            if frame:
-                el = frame.locator(selector).first
-                if el.is_visible(timeout=1000):
-                    el.click(force=True, timeout=2000)
-                    return True
-        except:
-            pass
+def _click_in_frame(page, selectors, step, frame_names=("ifrm_lotto645", "ifrm_tab")):
+    """후보 선택자 중 보이는 첫 요소 클릭 (우선 프레임 → 전체 프레임 → 메인 순), 클릭한 선택자 반환
 
-    # 2. 모든 프레임 순회
+    단계(step)별로 찾은 위치를 학습해 다음 구매 때 그 프레임부터 확인한다.
+    """
+    if isinstance(selectors, str):
+        selectors = [selectors]
+    found = selector_resolver.resolve(page, step, selectors, frame_names)
+    if not found:
+        return None
+    frame, selector, nth = found
     try:
-        for frame in page.frames:
-            try:
-                el = frame.locator(selector).first
-                if el.is_visible(timeout=500):
-                    el.click(force=True, timeout=1000)
-                    return True
-            except:
-                pass
-    except:
-        pass
+        frame.locator(selector).nth(nth).click(force=True, timeout=2000)
+        return selector
+    except Exception as e:
+        logger.debug(f"[RESOLVE] {step} 클릭 실패 ({selector}): {e}")
+        selector_resolver.forget(step)
+        return None
 
-    # 3. 메인 페이지
-    try:
-        el = page.locator(selector).first
-        if el.is_visible(timeout=500):
-            el.click(force=True, timeout=1000)
-            return True
-    except:
-        pass
-    return False
+# 마킹판 탭 활성화 + 초기화
+_PREPARE_BOARD_JS = """() => {
+    try {
+        if (typeof selectWayTab === 'function') selectWayTab(0);
+        if (typeof resetNumber645 === 'function') resetNumber645();
+        else if (typeof resetAllNum === 'function') resetAllNum();
+
+        // 시각적 리셋 (ID 기반)
+        const btnReset = document.getElementById('resetAllNum') || document.getElementById('btnReset');
+        if (btnReset) btnReset.click();
+    } catch(e) {}
+}"""
+_BOARD_CLEARED_JS = "() => !document.querySelector('input[id^=check645num]:checked')"
 
 def _prepare_lotto_board(page):
     """로또 마킹판 준비 (탭 활성화 및 초기화) - 한 번만 호출"""
@@ -284,121 +624,171 @@ def _prepare_lotto_board(page):
         for fname in ["ifrm_tab", "ifrm_lotto645"]:
             frame = page.frame(name=fname)
             if frame:
-                frame.evaluate("""() => {
-                    try {
-                        if (typeof selectWayTab === 'function') selectWayTab(0);
-                        if (typeof resetNumber645 === 'function') resetNumber645();
-                        else if (typeof resetAllNum === 'function') resetAllNum();
-                        
-                        // 시각적 리셋 (ID 기반)
-                        const btnReset = document.getElementById('resetAllNum') || document.getElementById('btnReset');
-                        if (btnReset) btnReset.click();
-                    } catch(e) {}
-                }""")
-                time.sleep(1)
+                frame.evaluate(_PREPARE_BOARD_JS)
+                # 모든 체크박스가 해제될 때까지 대기
+                try:
+                    frame.wait_for_function(_BOARD_CLEARED_JS, timeout=TIMING["board_reset"])
+                except Exception:
+                    logger.debug("[PURCHASE] 마킹판 초기화 확인 시간 초과")
                 return True
     except: pass
     return False
 
+# 번호 1개 마킹 (이미 체크되어 있으면 건너뜀) - 단건/일괄 마킹 공용
+_MARK_JS = """
+    const mark = (n) => {
+        try {
+            const pad = String(n).padStart(2,'0');
+            const id = 'check645num' + n;
+            const id_padded = 'check645num' + pad;
+            const cb = document.getElementById(id) || document.getElementById(id_padded);
+
+            // 이미 체크되어 있다면 건너뜀 (중복 클릭 방지)
+            if (cb && cb.checked) return true;
+
+            // 사이트 내장 함수 호출
+            if (typeof check645 === 'function') {
+                check645(n);
+                return true;
+            } else {
+                // 직접 클릭 (레이블 우선)
+                const label = document.querySelector(`label[for="${id}"]`) ||
+                               document.querySelector(`label[for="${id_padded}"]`);
+                if (label) { label.click(); return true; }
+                if (cb) { cb.click(); return true; }
+            }
+        } catch(e) {}
+        return false;
+    };
+"""
+
+# 번호 체크 상태 확인 (체크박스가 없는 변형 페이지는 통과 처리)
+_CHECKED_JS = """
+    const isChecked = (n) => {
+        const cb = document.getElementById('check645num' + n) ||
+                   document.getElementById('check645num' + String(n).padStart(2, '0'));
+        return !cb || cb.checked;
+    };
+"""
+_MARK_ONE_JS = "(n) => {" + _MARK_JS + " return mark(n); }"
+_MARK_ALL_JS = "(nums) => {" + _MARK_JS + " nums.forEach(mark); }"
+_ONE_CHECKED_JS = "(n) => {" + _CHECKED_JS + " return isChecked(n); }"
+_ALL_CHECKED_JS = "(nums) => {" + _CHECKED_JS + " return nums.every(isChecked); }"
+
 def _mark_single_number(page, num):
     """개별 번호 마킹 (초기화 없이 단순 마킹)"""
     try:
         for fname in ["ifrm_tab", "ifrm_lotto645"]:
             frame = page.frame(name=fname)
             if frame:
-                success = frame.evaluate(f"""(n) => {{
-                    try {{
-                        const pad = String(n).padStart(2,'0');
-                        const id = 'check645num' + n;
-                        const id_padded = 'check645num' + pad;
-                        const cb = document.getElementById(id) || document.getElementById(id_padded);
-                        
-                        // 이미 체크되어 있다면 건너뜀 (중복 클릭 방지)
-                        if (cb && cb.checked) return true;
-
-                        // 사이트 내장 함수 호출
-                        if (typeof check645 === 'function') {{
-                            check645(n);
-                            return true;
-                        }} else {{
-                            // 직접 클릭 (레이블 우선)
-                            const label = document.querySelector(`label[for="${{id}}"]`) || 
-                                           document.querySelector(`label[for="${{id_padded}}"]`);
-                            if (label) {{ label.click(); return true; }}
-                            if (cb) {{ cb.click(); return true; }}
-                        }}
-                    }} catch(e) {{}}
-                    return false;
-                }}""", num)
+                success = frame.evaluate(_MARK_ONE_JS, num)
                 if success: return True
     except: pass
     return False
 
+def _wait_checked(page, num):
+    """번호 체크박스가 실제로 checked 상태가 될 때까지 대기"""
+    frame = _game_frame(page)
+    if not frame:
+        return False
+    try:
+        frame.wait_for_function(_ONE_CHECKED_JS, arg=num, timeout=TIMING["mark"])
+        return True
+    except Exception:
+        return False
+
 def _mark_numbers_batch(page, numbers):
-    # 이 함수는 이제 순차 마킹 로직으로 통합 운영됩니다.
-    _prepare_lotto_board(page)
+    """한 게임(번호 6개)을 frame.evaluate 1회로 마킹하고 모두 체크될 때까지 대기, 체크된 개수 반환"""
+    frame = _game_frame(page)
+    if not frame:
+        return 0
+    try:
+        frame.evaluate(_MARK_ALL_JS, numbers)
+        frame.wait_for_function(_ALL_CHECKED_JS, arg=numbers, timeout=TIMING["mark"])
+        return len(numbers)
+    except Exception:
+        pass
+    # 일부 실패 시 개별 마킹으로 재시도
     count = 0
     for n in numbers:
-        if _mark_single_number(page, n):
+        if _mark_single_number(page, n) and _wait_checked(page, n):
             count += 1
-        time.sleep(0.8)
-    return count >= 6
+    return count
 
 def _click_number(page, num):
     # 개별 마킹용 폴백
     return _mark_single_number(page, num)
 
-def get_round_info(page):
-    """현재 회차 정보 수집"""
-    round_no, round_date = "---", datetime.now().strftime("%Y-%m-%d")
-    try:
-        page.goto("https://www.dhlottery.co.kr/common.do?method=main",
-                  wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
-        time.sleep(1)
-        content = page.content()
-
-        # 회차 번호
-        m = re.search(r'제\s*(\d{3,4})\s*회', content)
-        if not m:
-            m = re.search(r'(\d{3,4})회차', content)
-        if m:
-            round_no = m.group(1)
-
-        # 추첨일
-        m2 = re.search(r'(\d{4})[.\-](\d{2})[.\-](\d{2})', content)
-        if m2:
-            round_date = f"{m2.group(1)}-{m2.group(2)}-{m2.group(3)}"
-    except Exception as e:
-        logger.warning(f"[ROUND] 조회 실패: {e}")
+# 게임 프레임(ifrm_lotto645 / ifrm_tab) 등장 여부
+_GAME_FRAME_JS = """() =>
+    document.getElementById('ifrm_lotto645') !== null ||
+    document.getElementById('ifrm_tab') !== null ||
+    document.getElementsByName('ifrm_lotto645').length > 0 ||
+    document.getElementsByName('ifrm_tab').length > 0
+"""
+
+# '확인' 후 선택 번호가 구매 목록으로 넘어가(마킹판 해제) 구매 버튼이 활성화되었는지
+_SELECTED_JS = """() => {
+    const buy = document.getElementById('btnBuy');
+    return !document.querySelector('input[id^=check645num]:checked') && (!buy || !buy.disabled);
+}"""
+
+def _scheduled_round():
+    round_no = draw_schedule.current_sales_round()
+    # 아카이브에 결과가 이미 있는 회차라면 일정 계산이 어긋난 것 → 다음 회차
+    latest = draw_archive.latest_round()
+    if latest >= round_no:
+        round_no = latest + 1
+    return round_no
+
+def _round_result(round_no, shown=None):
+    # 일정 계산과 1회 이내 차이만 신뢰 (다른 숫자 오인식 방지)
+    if shown and shown != round_no and abs(shown - round_no) <= 1:
+        logger.warning(f"[ROUND] 일정 계산 {round_no}회 ≠ 구매 화면 {shown}회 → 화면 값 사용")
+        round_no = shown
+    round_date = draw_schedule.draw_date(round_no)
     logger.info(f"[ROUND] 회차: {round_no}, 추첨일: {round_date}")
-    return round_no, round_date
+    return str(round_no), round_date
 
-def do_purchase(page, numbers):
-    logger.info(f"[PURCHASE] 구매 번호: {numbers}")
+def get_round_info(page=None):
+    """판매 중인 회차/추첨일 (페이지 이동 없이 KST 추첨 일정으로 계산)
+
+    이미 열려 있는 게임 프레임에 회차가 표시되어 있으면 그 값으로 확인한다.
+    """
+    round_no = _scheduled_round()
+    shown = None
+    frame = _game_frame(page) if page is not None else None
+    if frame is not None:
+        try:
+            shown = page_probes.frame_round(frame)
+        except Exception as e:
+            logger.debug(f"[ROUND] 프레임 회차 확인 실패: {e}")
+    return _round_result(round_no, shown)
+
+def do_purchase(page, games, progress=None):
+    """games: 게임별 번호 6개 리스트 (최대 5게임, 한 세션에서 한 장으로 구매)"""
+    if games and isinstance(games[0], int):
+        games = [games]   # 단일 게임 호환
+    logger.info(f"[PURCHASE] 구매 번호: {games}")
     dialog_msgs = []
 
     def handle_dialog(dialog):
         logger.info(f"[DIALOG] '{dialog.message}' → 자동 확인")
         dialog_msgs.append(dialog.message)
+        PURCHASE_DIALOGS.inc(reason=_dialog_reason(dialog.message) or "other")
         dialog.accept()
 
     page.on("dialog", handle_dialog)
+    timer = metrics.Stopwatch(PURCHASE_STEP_SECONDS)
 
     try:
-        # ─────────────────────────────────────────
-        # 0. 회차 정보 수집
-        # ─────────────────────────────────────────
-        round_no, round_date = get_round_info(page)
-
         # ─────────────────────────────────────────
         # 1. 구매 페이지 이동
         # ─────────────────────────────────────────
         logger.info("[PURCHASE] 6/45 구매 페이지 이동...")
-        page.goto(
-            "https://el.dhlottery.co.kr/game/TotalGame.jsp?LottoId=LO40",
-            wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT
-        )
-        _capture_screenshot(page)
+        _report(progress, "page")
+        page.goto(PURCHASE_PAGE_URL, wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        timer.lap("page")
 
         # ─────────────────────────────────────────
         # ─────────────────────────────────────────
@@ -407,210 +797,698 @@ def do_purchase(page, numbers):
         logger.info("[PURCHASE] 게임 프레임 로딩 대기...")
         try:
             # ifrm_lotto645 또는 ifrm_tab 둘 중 하나가 나타날 때까지 대기
-            page.wait_for_function("""() => 
-                document.getElementById('ifrm_lotto645') !== null || 
-                document.getElementById('ifrm_tab') !== null ||
-                document.getElementsByName('ifrm_lotto645').length > 0 ||
-                document.getElementsByName('ifrm_tab').length > 0
-            """, timeout=30000)
+            page.wait_for_function(_GAME_FRAME_JS, timeout=TIMING["frame"])
             logger.info("[PURCHASE] 게임 프레임 식별 성공")
         except:
             logger.warning("[PURCHASE] 프레임 로딩 대기 시간 초과, 계속 진행 시도...")
-        
-        time.sleep(3)
 
-        # ─────────────────────────────────────────
-        # 3. 팝업 닫기 및 '혼합선택' 탭 클릭 (번호 입력을 위해 필수)
-        # ─────────────────────────────────────────
-        for close_sel in [
-            "input[value='닫기']", ".close_btn", ".btn_close",
-            "a:text-is('닫기')", "button:text-is('닫기')"
-        ]:
-            try:
-                _click_in_frame(page, close_sel)
-            except:
-                pass
-        time.sleep(1)
+        # 프레임 내부 번호 선택판(체크박스)이 로딩될 때까지 대기
+        if not _wait_for(page, lambda: _game_frame(page) and _game_frame(page).query_selector("input[id^=check645num]"),
+                         TIMING["board"]):
+            logger.warning("[PURCHASE] 번호 선택판 로딩 대기 시간 초과, 계속 진행 시도...")
+        timer.lap("frame")
+
+        # 회차 정보 (추첨 일정 계산 + 이미 열린 게임 프레임으로 확인, 별도 페이지 이동 없음)
+        _report(progress, "round")
+        round_no, round_date = get_round_info(page)
+        timer.lap("round")
 
         # ─────────────────────────────────────────
-        # 3. 마킹 준비 (탭 활성화 및 초기화)
+        # 3. 팝업 닫기 및 '혼합선택' 탭 클릭 (번호 입력을 위해 필수)
         # ─────────────────────────────────────────
-        logger.info("[PURCHASE] 번호 선택판 준비 중...")
-        # 이 과정은 _mark_numbers_batch 내부에서 JS로 더 안정적으로 처리하도록 이양했습니다.
-        time.sleep(1)
+        # 보이는 닫기 버튼을 모두 닫음 (선택자별 1회)
+        close_sels = list(CLOSE_BUTTONS)
+        while close_sels:
+            clicked = _click_in_frame(page, close_sels, "close")
+            if not clicked:
+                break
+            close_sels = [sel for sel in close_sels if sel != clicked]
 
         # ─────────────────────────────────────────
+        # 4. 번호 선택 (게임별 일괄 마킹 → '확인'으로 구매 목록에 추가)
         # ─────────────────────────────────────────
-        # 4. 번호 선택 (순차적으로 정밀 마킹)
-        # ─────────────────────────────────────────
-        logger.info(f"[PURCHASE] {numbers} 번호를 하나씩 순차적으로 마킹합니다...")
-        
+        _report(progress, "marking")
         # 4-1. 마킹판 준비 (탭 활성화 및 초기화) - 한 번만 수행
         _prepare_lotto_board(page)
-        
-        selected_count = 0
-        for num in numbers:
-            # 개별 순차 마킹 (중복 클릭 및 초기화 루프 방지)
-            ok = _mark_single_number(page, num)
-            if ok:
-                selected_count += 1
-                logger.info(f"[PURCHASE] {num}번 마킹 완료 ✅ ({selected_count}/6)")
-            else:
-                logger.warning(f"[PURCHASE] {num}번 마킹 실패 ⚠️")
-            
-            # 사람이 직접 누르는 느낌과 인식률을 위해 0.8초 간격 유지
-            time.sleep(0.8)
-            if num == numbers[-1]: _capture_screenshot(page) # 마지막 번호 선택 후 캡처
-
-        if selected_count < 6:
-            logger.warning(f"[PURCHASE] 번호 선택이 완벽하지 않음 ({selected_count}/6)")
-
-        time.sleep(1.0)
-
-        # ─────────────────────────────────────────
-        # 5. '확인' 버튼 (선택 완료)
-        # ─────────────────────────────────────────
-        logger.info("[PURCHASE] '확인' 버튼 클릭...")
-        ok = False
-        for sel in ["#btnSelectNum", "input[value='확인']", "a.btn_common:text-is('확인')"]:
-            if _click_in_frame(page, sel):
+        timer.lap("board")
+
+        added = []   # 구매 목록에 실제로 담긴 게임
+        for idx, numbers in enumerate(games, 1):
+            selected_count = _mark_numbers_batch(page, numbers)
+            timer.lap("marking")
+            if selected_count < 6:
+                logger.warning(f"[PURCHASE] ❌ {idx}게임 번호 선택이 완벽하지 않음 ({selected_count}/6)")
+                return False, _add_failure(idx, f"번호 선택 {selected_count}/6"), round_no, round_date
+            logger.info(f"[PURCHASE] {idx}게임 {numbers} 마킹 완료 ✅")
+
+            # ─────────────────────────────────────────
+            # 5. '확인' 버튼 (선택 완료 → 구매 목록에 추가)
+            # ─────────────────────────────────────────
+            logger.info(f"[PURCHASE] {idx}게임 '확인' 버튼 클릭...")
+            _report(progress, "confirm")
+            dialogs_before = len(dialog_msgs)
+            sel = _click_in_frame(page, CONFIRM_BUTTONS, "confirm")
+            if sel:
                 logger.info(f"[PURCHASE] '확인' 버튼 클릭 성공 ({sel})")
-                ok = True
-                break
-        if not ok:
-            logger.warning("[PURCHASE] ❌ '확인' 버튼 못 찾음")
-            return False, "번호 선택 '확인' 버튼을 클릭하지 못했습니다.", round_no, round_date
+            else:
+                logger.warning("[PURCHASE] ❌ '확인' 버튼 못 찾음")
+                return False, "번호 선택 '확인' 버튼을 클릭하지 못했습니다.", round_no, round_date
 
-        time.sleep(2)
+            # 선택 번호가 구매 목록으로 넘어가(마킹판 해제) 구매 버튼이 활성화되거나 경고창이 뜰 때까지 대기
+            frame = _game_frame(page)
+            _wait_for(page, lambda: len(dialog_msgs) > dialogs_before or (
+                frame is not None and frame.evaluate(_SELECTED_JS)
+            ), TIMING["selected"])
+            timer.lap("confirm")
 
-        # 예치금 부족 체크
-        if any("부족" in m for m in dialog_msgs):
-            return False, f"예치금 부족: {dialog_msgs[-1]}", round_no, round_date
+            # 경고창(예치금 부족, 한도 초과 등)이 뜨면 앞 게임만 담긴 상태 → 구매하지 않고 실패 처리
+            if len(dialog_msgs) > dialogs_before:
+                return False, _add_failure(idx, dialog_msgs[-1]), round_no, round_date
+            added.append(numbers)
 
         # ─────────────────────────────────────────
         # 6. '구매하기' 버튼
         # ─────────────────────────────────────────
         logger.info("[PURCHASE] '구매하기' 버튼 클릭...")
-        ok = False
-        for sel in ["#btnBuy", "input[value='구매하기']", "a.btn_common:text-is('구매하기')", "button:text-is('구매하기')"]:
-            if _click_in_frame(page, sel):
-                logger.info(f"[PURCHASE] '구매하기' 버튼 클릭 성공 ({sel})")
-                ok = True
-                break
-        if not ok:
+        _report(progress, "buy")
+        dialogs_before = len(dialog_msgs)
+        sel = _click_in_frame(page, BUY_BUTTONS, "buy")
+        if sel:
+            logger.info(f"[PURCHASE] '구매하기' 버튼 클릭 성공 ({sel})")
+        else:
             logger.warning("[PURCHASE] ❌ '구매하기' 버튼 못 찾음")
             return False, "'구매하기' 버튼을 클릭하지 못했습니다.", round_no, round_date
 
-        time.sleep(2)
-        
+        # 구매확인 팝업이 보이거나 경고창이 뜰 때까지 대기
+        _wait_for(page, lambda: len(dialog_msgs) > dialogs_before or
+                  _visible_in_frames(page, CONFIRM_POPUP), TIMING["confirm_popup"])
+        timer.lap("buy")
+
         # 구매 후 나타난 모든 경고/에러 다이얼로그(잔액부족, 구매한도, 구매불가 시간 등) 다시 한 번 확인
         for m in dialog_msgs:
-            if any(err in m for err in ["부족", "초과", "오류", "마감", "로그인", "실패"]):
+            if _dialog_reason(m):
                 return False, f"구매 실패: {m}", round_no, round_date
 
         # ─────────────────────────────────────────
         # 7. 확인 팝업 ("구매하시겠습니까?")
         # ─────────────────────────────────────────
         logger.info("[PURCHASE] 구매확인 팝업 처리...")
-        for sel in [
-            "#popupLayerConfirm input[value='확인']",
-            ".btn_confirm input[value='확인']",
-            "input[value='확인']",
-            "a:text-is('확인')", "button:text-is('확인')"
-        ]:
-            try:
-                if _click_in_frame(page, sel):
-                    logger.info(f"[PURCHASE] 확인 팝업 클릭 ({sel})")
-                    break
-            except:
-                pass
+        _report(progress, "popup")
+        dialogs_before = len(dialog_msgs)
+        sel = _click_in_frame(page, POPUP_BUTTONS, "popup")
+        if sel:
+            logger.info(f"[PURCHASE] 확인 팝업 클릭 ({sel})")
 
-        time.sleep(2)
+        # 구매확인 팝업이 닫히고 구매내역 팝업이 뜨거나 경고창이 뜰 때까지 대기
+        _wait_for(page, lambda: len(dialog_msgs) > dialogs_before or
+                  _visible_in_frames(page, RESULT_POPUP) or
+                  not _visible_in_frames(page, CONFIRM_LAYER), TIMING["result_popup"])
 
         # ─────────────────────────────────────────
         # 8. 구매내역 확인 팝업
         # ─────────────────────────────────────────
         logger.info("[PURCHASE] 구매내역 확인 팝업 처리...")
-        for sel in [
-            ".btn_popup_buy_confirm input[value='확인']",
-            ".confirm input[value='확인']",
-            "input[value='확인']",
-            "a:text-is('확인')", "button:text-is('확인')"
-        ]:
-            try:
-                if _click_in_frame(page, sel):
-                    logger.info(f"[PURCHASE] 구매내역 팝업 클릭 ({sel})")
-                    _capture_screenshot(page) # 최종 완료 직전 캡처
-                    break
-            except:
-                pass
-
-        time.sleep(1)
+        sel = _click_in_frame(page, RECEIPT_BUTTONS, "receipt")
+        if sel:
+            logger.info(f"[PURCHASE] 구매내역 팝업 클릭 ({sel})")
+        timer.lap("dialog")
 
         logger.info("[PURCHASE] ✅ 구매 프로세스 완료!")
-        return True, "✅ 구매 성공! 동행복권 마이페이지에서 구매내역을 확인하세요.", round_no, round_date
+        return True, _success_message(added), round_no, round_date
 
     except Exception as e:
         logger.error(f"[PURCHASE] 오류: {e}", exc_info=True)
         return False, f"구매 중 오류 발생: {str(e)[:80]}", None, None
 
-def automate_purchase(user_id, user_pw, numbers):
-    sync_playwright = _get_playwright_module()
-    is_headless = bool(os.environ.get('RENDER') or os.environ.get('DOCKER_ENV'))
-    logger.info(f"[CORE] Headless={is_headless}")
-
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(
-                headless=is_headless,
-                proxy=_get_proxy_config(),
-                args=[
-                    "--no-sandbox",
-                    "--disable-setuid-sandbox",
-                    "--disable-dev-shm-usage",
-                    "--disable-blink-features=AutomationControlled",
-                    "--disable-infobars",
-                    "--disable-gpu",
-                    "--no-zygote",
-                    "--disable-software-rasterizer"
-                ]
-            )
-            context = browser.new_context(
-                viewport={"width": 1920, "height": 1080},
-                user_agent=UA,
-                locale="ko-KR",
-                timezone_id="Asia/Seoul",
-                ignore_https_errors=True
+def automate_purchase(user_id, user_pw, games, progress=None, stream=None, report=None):
+    """report: dict 를 넘기면 작업별 부가 정보(resources: 리소스 차단 통계)를 채움"""
+    logger.info(f"[CORE] Headless={_is_headless()}")
+
+    cached_state = session_cache.get(user_id, user_pw)
+
+    started = time.perf_counter()
+    capture = capture_store.begin() if capture_store else None
+    blocker = ResourceBlocker(resource_rules) if RESOURCE_BLOCKING else None
+
+    def pipeline(page):
+        # 풀 대기 + 컨텍스트/페이지 생성까지
+        PURCHASE_STEP_SECONDS.observe(time.perf_counter() - started, step="browser")
+        if blocker:
+            blocker.attach(page.context)
+        cast = None
+        if stream is not None:
+            cast = Screencast(page, stream, quality=SCREENCAST_QUALITY, max_width=SCREENCAST_MAX_WIDTH).start()
+        result = False, "구매 중 오류 발생", None, None
+        try:
+            result = run(page)
+            return result
+        finally:
+            if cast:
+                cast.stop()
+            if capture:
+                capture.finish(page.context, failed=not result[0], reason=_failure_reason(result[1]),
+                               elapsed=time.perf_counter() - started, meta={"games": len(games)})
+
+    def run(page):
+        _report(progress, "login")
+        with _span("login"):
+            if cached_state and _session_alive(page):
+                logger.info("[LOGIN] ✅ 캐시된 세션 재사용 (로그인 생략)")
+            else:
+                if cached_state:
+                    logger.info("[LOGIN] 캐시된 세션 거부됨 → 재로그인")
+                    session_cache.reject(user_id)
+                    page.context.clear_cookies()
+                if not do_login(page, user_id, user_pw):
+                    return False, "❌ 로그인 실패. 아이디/비밀번호를 확인하세요.", None, None
+                _store_session(page, user_id, user_pw)
+
+        if capture:
+            capture.start(page.context)
+        result = do_purchase(page, games, progress=progress)
+        if result[0]:
+            _store_session(page, user_id, user_pw)   # 갱신된 쿠키로 TTL 연장
+        elif "로그인" in (result[1] or ""):
+            session_cache.invalidate(user_id)
+        return result
+
+    try:
+        _report(progress, "browser")
+        # 풀에서 미리 실행된 브라우저의 새 컨텍스트에서 진행 (캐시 세션이 있으면 주입)
+        context_options = {"storage_state": cached_state} if cached_state else {}
+        if capture:
+            context_options.update(capture.context_options())
+        result = get_browser_pool().run(pipeline, context_options=context_options or None)
+    except Exception as e:
+        logger.error(f"[CORE] 전체 실패: {e}", exc_info=True)
+        result = False, f"시스템 오류: {str(e)[:80]}", None, None
+    finally:
+        if capture:
+            capture.discard()   # 브라우저 실행 전 실패 시 임시 파일 정리
+    _record_result(result, time.perf_counter() - started)
+    if blocker:
+        _record_blocking(blocker.stats(), report)
+    return result
+
+def _record_result(result, elapsed):
+    outcome = "success" if result[0] else "failure"
+    reason = "ok" if result[0] else _failure_reason(result[1])
+    PURCHASE_TOTAL.inc(result=outcome, reason=reason)
+    PURCHASE_SECONDS.observe(elapsed, result=outcome)
+    logger.info(f"[METRICS] 구매 {outcome} ({reason}) {elapsed:.1f}초")
+
+def _record_blocking(stats, report=None):
+    for rtype, count in stats["blocked_by_type"].items():
+        BLOCKED_REQUESTS.inc(count, type=rtype)
+    BLOCKED_BYTES.inc(stats["bytes_saved_estimate"])
+    logger.info(f"[BLOCK] 요청 {stats['blocked']}건 차단 / {stats['allowed']}건 허용, "
+                f"약 {stats['bytes_saved_estimate'] // 1024}KB 절감")
+    if report is not None:
+        report["resources"] = stats
+
+def _store_session(page, user_id, user_pw):
+    try:
+        session_cache.put(user_id, user_pw, page.context.storage_state())
+    except Exception as e:
+        logger.warning(f"[SESSION] 세션 저장 실패: {e}")
+
+def parse_games(data):
+    """요청 본문에서 게임 목록 추출 (games: [[..6개], ...] 또는 기존 numbers: [..6개])
+
+    반환: (games, 오류 메시지)
+    """
+    games = data.get('games')
+    if games is None:
+        numbers = data.get('numbers', [])
+        games = [numbers] if numbers else []
+    if not isinstance(games, list) or not games:
+        return None, "번호 6개가 필요합니다."
+    if len(games) > MAX_GAMES_PER_TICKET:
+        return None, f"한 번에 최대 {MAX_GAMES_PER_TICKET}게임까지 구매할 수 있습니다."
+    parsed = []
+    for numbers in games:
+        try:
+            nums = sorted(int(n) for n in numbers)
+        except (TypeError, ValueError):
+            return None, "번호 형식이 올바르지 않습니다."
+        if len(nums) != 6 or len(set(nums)) != 6 or not all(1 <= n <= 45 for n in nums):
+            return None, "게임마다 1~45 사이의 서로 다른 번호 6개가 필요합니다."
+        parsed.append(nums)
+    return parsed, None
+
+# ══════════════════════════════════════════════════════════════
+#  구매 작업 대기열
+# ══════════════════════════════════════════════════════════════
+_purchase_queue = None
+_purchase_queue_lock = threading.Lock()
+
+def get_purchase_queue():
+    """구매 작업 대기열 싱글턴 (PURCHASE_CONCURRENCY개 워커가 순서대로 처리)
+
+    PURCHASE_ENGINE=async 이면 같은 인터페이스의 비동기 엔진 (작업 취소 지원)
+    """
+    global _purchase_queue
+    with _purchase_queue_lock:
+        if _purchase_queue is None:
+            if PURCHASE_ENGINE == 'async':
+                _purchase_queue = AsyncPurchaseEngine(
+                    concurrency=ASYNC_PURCHASE_CONCURRENCY,
+                    launch_options={
+                        "headless": _is_headless(),
+                        "proxy": _get_proxy_config(),
+                        "args": BROWSER_ARGS,
+                    },
+                    context_options=_context_options(),
+                    page_factory=_new_page_async,
+                    max_queue=PURCHASE_QUEUE_MAX,
+                    timeout=PURCHASE_TIMEOUT,
+                    max_jobs=BROWSER_MAX_JOBS,
+                    name="purchase-async",
+                ).start()
+            else:
+                _purchase_queue = JobQueue(
+                    concurrency=PURCHASE_CONCURRENCY,
+                    max_queue=PURCHASE_QUEUE_MAX,
+                    name="purchase",
+                ).start()
+        return _purchase_queue
+
+def _purchase_job(user_id, user_pw, games):
+    """로그인 → 구매 → 이력 저장까지 수행하는 작업 함수 생성"""
+    def run(job):
+        stream = screen_hub.open(job.id)
+        report = {}
+        try:
+            success, msg, round_no, round_date = automate_purchase(
+                user_id, user_pw, games, progress=job.step, stream=stream, report=report
             )
-            
-            # 고급 스텔스 설정
-            context.add_init_script("""
-                Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-                window.chrome = { runtime: {} };
-                Object.defineProperty(navigator, 'languages', { get: () => ['ko-KR', 'ko', 'en-US', 'en'] });
-                Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
-            """)
-            page = context.new_page()
-
-            # Playwright Stealth (있으면 적용)
+        finally:
+            stream.close()   # 브라우저 실행 전에 실패해도 구독자 연결 종료
+        return _job_result(user_id, games, success, msg, round_no, round_date, report)
+    return run
+
+def _job_result(user_id, games, success, msg, round_no, round_date, report):
+    entries = []
+    if success:
+        # 게임별로 이력 기록
+        entries = [add_history(numbers, round_no, round_date, user_id=user_id) for numbers in games]
+    return {
+        "success": success,
+        "message": msg,
+        "round": round_no,
+        "round_date": round_date,
+        "entry": entries[0] if entries else None,
+        "entries": entries,
+        "resources": report.get("resources"),
+    }
+
+# ══════════════════════════════════════════════════════════════
+#  비동기 구매 엔진 (Playwright async API, PURCHASE_ENGINE=async)
+#  이벤트 루프 1개에서 여러 구매 컨텍스트를 동시에 실행 - 동작은 위 동기 흐름과 동일
+#  선택자/주소/JS 는 동기 흐름과 같은 모듈 상수를 사용 (한쪽만 고치지 않도록)
+# ══════════════════════════════════════════════════════════════
+async def _new_page_async(context):
+    await context.add_init_script(_STEALTH_JS)
+    page = await context.new_page()
+    try:
+        from playwright_stealth import Stealth
+        await Stealth().apply_stealth_async(page)
+    except:
+        pass
+    return page
+
+async def _wait_for_async(check, timeout, interval=100):
+    """async check()가 참이 될 때까지 대기"""
+    deadline = time.time() + timeout / 1000
+    while True:
+        try:
+            result = await check()
+            if result:
+                return result
+        except Exception:
+            pass
+        if time.time() >= deadline:
+            return None
+        await asyncio.sleep(interval / 1000)
+
+async def _wait_js_async(page, script, timeout, arg=None):
+    deadline = time.time() + timeout / 1000
+    while True:
+        remaining = int((deadline - time.time()) * 1000)
+        if remaining <= 0:
+            return None
+        try:
+            handle = await page.wait_for_function(script, arg=arg, timeout=remaining)
+            return await handle.json_value()
+        except Exception as e:
+            if "Timeout" in type(e).__name__ or "Timeout" in str(e):
+                return None
+            await asyncio.sleep(0.1)
+
+async def _visible_in_frames_async(page, selectors):
+    targets = [f for f in [_game_frame(page)] if f] + [page.main_frame]
+    for frame in targets:
+        try:
+            if await frame.evaluate(_VISIBLE_JS, selectors):
+                return True
+        except Exception:
+            pass
+    return False
+
+async def _session_alive_async(page):
+    try:
+        await page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=30000)
+        return await page_probes.logged_in_async(page)
+    except Exception:
+        return False
+
+async def do_login_async(page, user_id, user_pw):
+    logger.info(f"[LOGIN] '{user_id}' 로그인 시도 (async)...")
+    try:
+        await page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        try:
+            await page.wait_for_load_state("load", timeout=TIMING["page_load"])
+        except Exception:
+            pass
+        await page.goto(f"{WWW_URL}/login", referer=f"{WWW_URL}/",
+                        wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+
+        await page.wait_for_selector("#inpUserId", state="visible", timeout=TIMING["login_form"])
+        await page.locator("#inpUserId").click()
+        await page.fill("#inpUserId", "")
+        await page.type("#inpUserId", user_id, delay=TIMING["type_delay_id"])
+        await page.locator("#inpUserPswdEncn").click()
+        await page.fill("#inpUserPswdEncn", "")
+        await page.type("#inpUserPswdEncn", user_pw, delay=TIMING["type_delay_pw"])
+        login_btn = page.locator("#btnLogin")
+        await login_btn.hover()
+        await login_btn.click()
+
+        # 1. 로그인 결과(성공/실패/간소화 페이지) 중 하나가 나타날 때까지 대기
+        deadline = time.time() + TIMING["login_result"] / 1000
+        while time.time() < deadline:
+            state = page_probes.login_result(
+                await _wait_js_async(page, LOGIN_STATE_JS, int((deadline - time.time()) * 1000)))
+            if state == "ok":
+                logger.info("[LOGIN] ✅ 로그인 성공!")
+                return True
+            if state == "error":
+                logger.warning("[LOGIN] ❌ 아이디/비밀번호 불일치 메시지 감지")
+                return False
+            if state != "simple":
+                break
+
+            logger.info("[LOGIN] ⚠️ 간소화 페이지 감지! '동행복권통합포탈이동' 버튼 클릭 시도...")
             try:
-                from playwright_stealth import Stealth
-                Stealth().apply_stealth_sync(page)
+                clicked = False
+                for b in PORTAL_BUTTONS:
+                    if await page.locator(b).first.is_visible(timeout=2000):
+                        await page.locator(b).first.click()
+                        logger.info(f"[LOGIN] '{b}' 버튼 클릭 성공")
+                        clicked = True
+                        break
+                if not clicked:
+                    await page.goto(f"{WWW_URL}/common.do?method=main", timeout=30000)
+                await page.wait_for_load_state("domcontentloaded", timeout=TIMING["page_load"])
             except:
                 pass
 
+        # 2. 로또 6/45 전용 직접 확인 (간소화 페이지 우회용)
+        try:
+            await page.goto(LOTTO_PAGE_URL, timeout=10000)
+            state = await page_probes.state_async(page, "lotto_page", replaces=2)
+            if state["logged_in"] or state["game"]:
+                logger.info("[LOGIN] ✅ 로또 전용 페이지를 통해 로그인 성공 확인!")
+                return True
+        except: pass
+
+        # 실패 메시지 확인
+        try:
+            alert_msg = await page.locator(LOGIN_ALERT).first.inner_text(timeout=2000)
+            logger.warning(f"[LOGIN] 실패 메시지: {alert_msg}")
+        except:
+            pass
+
+        logger.warning(f"[LOGIN] ❌ 로그인 확인 실패 ({TIMING['login_result'] // 1000}초 타임아웃)")
+        return False
+    except Exception as e:
+        logger.error(f"[LOGIN] 오류: {e}")
+        return False
+
+async def _click_in_frame_async(page, selectors, step, frame_names=("ifrm_lotto645", "ifrm_tab")):
+    found = await selector_resolver.resolve_async(page, step, selectors, frame_names)
+    if not found:
+        return None
+    frame, selector, nth = found
+    try:
+        await frame.locator(selector).nth(nth).click(force=True, timeout=2000)
+        return selector
+    except Exception as e:
+        logger.debug(f"[RESOLVE] {step} 클릭 실패 ({selector}): {e}")
+        selector_resolver.forget(step)
+        return None
+
+async def _mark_numbers_batch_async(page, numbers):
+    frame = _game_frame(page)
+    if not frame:
+        return 0
+    try:
+        await frame.evaluate(_MARK_ALL_JS, numbers)
+        await frame.wait_for_function(_ALL_CHECKED_JS, arg=numbers, timeout=TIMING["mark"])
+        return len(numbers)
+    except Exception:
+        pass
+    # 일부 실패 시 개별 마킹으로 재시도
+    count = 0
+    for n in numbers:
+        try:
+            if await frame.evaluate(_MARK_ONE_JS, n):
+                await frame.wait_for_function(_ONE_CHECKED_JS, arg=n, timeout=TIMING["mark"])
+                count += 1
+        except Exception:
+            pass
+    return count
+
+async def do_purchase_async(page, games, progress=None):
+    """do_purchase 의 async 버전 (단계/대기 조건/실패 판정 동일)"""
+    logger.info(f"[PURCHASE] 구매 번호: {games}")
+    dialog_msgs = []
+
+    async def handle_dialog(dialog):
+        logger.info(f"[DIALOG] '{dialog.message}' → 자동 확인")
+        dialog_msgs.append(dialog.message)
+        PURCHASE_DIALOGS.inc(reason=_dialog_reason(dialog.message) or "other")
+        try:
+            await dialog.accept()
+        except Exception:
+            pass
+
+    page.on("dialog", handle_dialog)
+    timer = metrics.Stopwatch(PURCHASE_STEP_SECONDS)
+
+    try:
+        _report(progress, "page")
+        await page.goto(PURCHASE_PAGE_URL, wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        timer.lap("page")
+
+        try:
+            await page.wait_for_function(_GAME_FRAME_JS, timeout=TIMING["frame"])
+        except Exception:
+            logger.warning("[PURCHASE] 프레임 로딩 대기 시간 초과, 계속 진행 시도...")
+
+        async def board_ready():
+            frame = _game_frame(page)
+            return frame and await frame.query_selector("input[id^=check645num]")
+        if not await _wait_for_async(board_ready, TIMING["board"]):
+            logger.warning("[PURCHASE] 번호 선택판 로딩 대기 시간 초과, 계속 진행 시도...")
+        timer.lap("frame")
+
+        _report(progress, "round")
+        shown = None
+        frame = _game_frame(page)
+        if frame is not None:
             try:
-                if not do_login(page, user_id, user_pw):
-                    return False, "❌ 로그인 실패. 아이디/비밀번호를 확인하세요.", None, None
-                return do_purchase(page, numbers)
+                shown = await page_probes.frame_round_async(frame)
+            except Exception as e:
+                logger.debug(f"[ROUND] 프레임 회차 확인 실패: {e}")
+        round_no, round_date = _round_result(_scheduled_round(), shown)
+        timer.lap("round")
+
+        # 보이는 닫기 버튼을 모두 닫음 (선택자별 1회)
+        close_sels = list(CLOSE_BUTTONS)
+        while close_sels:
+            clicked = await _click_in_frame_async(page, close_sels, "close")
+            if not clicked:
+                break
+            close_sels = [sel for sel in close_sels if sel != clicked]
+
+        _report(progress, "marking")
+        frame = _game_frame(page)
+        if frame:
+            try:
+                await frame.evaluate(_PREPARE_BOARD_JS)
+                await frame.wait_for_function(_BOARD_CLEARED_JS, timeout=TIMING["board_reset"])
+            except Exception:
+                logger.debug("[PURCHASE] 마킹판 초기화 확인 시간 초과")
+        timer.lap("board")
+
+        added = []
+        for idx, numbers in enumerate(games, 1):
+            selected_count = await _mark_numbers_batch_async(page, numbers)
+            timer.lap("marking")
+            if selected_count < 6:
+                logger.warning(f"[PURCHASE] ❌ {idx}게임 번호 선택이 완벽하지 않음 ({selected_count}/6)")
+                return False, _add_failure(idx, f"번호 선택 {selected_count}/6"), round_no, round_date
+
+            _report(progress, "confirm")
+            dialogs_before = len(dialog_msgs)
+            sel = await _click_in_frame_async(page, CONFIRM_BUTTONS, "confirm")
+            if not sel:
+                logger.warning("[PURCHASE] ❌ '확인' 버튼 못 찾음")
+                return False, "번호 선택 '확인' 버튼을 클릭하지 못했습니다.", round_no, round_date
+
+            async def selected():
+                frame = _game_frame(page)
+                return len(dialog_msgs) > dialogs_before or (frame is not None and await frame.evaluate(_SELECTED_JS))
+            await _wait_for_async(selected, TIMING["selected"])
+            timer.lap("confirm")
+            if len(dialog_msgs) > dialogs_before:
+                return False, _add_failure(idx, dialog_msgs[-1]), round_no, round_date
+            added.append(numbers)
+
+        _report(progress, "buy")
+        dialogs_before = len(dialog_msgs)
+        sel = await _click_in_frame_async(page, BUY_BUTTONS, "buy")
+        if not sel:
+            logger.warning("[PURCHASE] ❌ '구매하기' 버튼 못 찾음")
+            return False, "'구매하기' 버튼을 클릭하지 못했습니다.", round_no, round_date
+
+        async def confirm_popup():
+            return len(dialog_msgs) > dialogs_before or \
+                await _visible_in_frames_async(page, CONFIRM_POPUP)
+        await _wait_for_async(confirm_popup, TIMING["confirm_popup"])
+        timer.lap("buy")
+
+        for m in dialog_msgs:
+            if _dialog_reason(m):
+                return False, f"구매 실패: {m}", round_no, round_date
+
+        _report(progress, "popup")
+        dialogs_before = len(dialog_msgs)
+        await _click_in_frame_async(page, POPUP_BUTTONS, "popup")
+
+        async def result_popup():
+            return len(dialog_msgs) > dialogs_before or \
+                await _visible_in_frames_async(page, RESULT_POPUP) or \
+                not await _visible_in_frames_async(page, CONFIRM_LAYER)
+        await _wait_for_async(result_popup, TIMING["result_popup"])
+
+        await _click_in_frame_async(page, RECEIPT_BUTTONS, "receipt")
+        timer.lap("dialog")
+
+        logger.info("[PURCHASE] ✅ 구매 프로세스 완료!")
+        return True, _success_message(added), round_no, round_date
+
+    except Exception as e:
+        logger.error(f"[PURCHASE] 오류: {e}", exc_info=True)
+        return False, f"구매 중 오류 발생: {str(e)[:80]}", None, None
+
+async def _store_session_async(page, user_id, user_pw):
+    try:
+        session_cache.put(user_id, user_pw, await page.context.storage_state())
+    except Exception as e:
+        logger.warning(f"[SESSION] 세션 저장 실패: {e}")
+
+async def automate_purchase_async(engine, user_id, user_pw, games, progress=None, stream=None, report=None):
+    """automate_purchase 의 async 버전 (engine 의 격리 컨텍스트에서 실행, trace/HAR 보관은 미지원)"""
+    cached_state = session_cache.get(user_id, user_pw)
+    started = time.perf_counter()
+    blocker = ResourceBlocker(resource_rules) if RESOURCE_BLOCKING else None
+    result = False, "구매 중 오류 발생", None, None
+    try:
+        _report(progress, "browser")
+        async with engine.page({"storage_state": cached_state} if cached_state else None) as page:
+            PURCHASE_STEP_SECONDS.observe(time.perf_counter() - started, step="browser")
+            if blocker:
+                await blocker.attach_async(page.context)
+            cast = None
+            if stream is not None:
+                cast = await AsyncScreencast(page, stream, quality=SCREENCAST_QUALITY,
+                                             max_width=SCREENCAST_MAX_WIDTH).start()
+            try:
+                _report(progress, "login")
+                with _span("login"):
+                    if cached_state and await _session_alive_async(page):
+                        logger.info("[LOGIN] ✅ 캐시된 세션 재사용 (로그인 생략)")
+                    else:
+                        if cached_state:
+                            logger.info("[LOGIN] 캐시된 세션 거부됨 → 재로그인")
+                            session_cache.reject(user_id)
+                            await page.context.clear_cookies()
+                        if not await do_login_async(page, user_id, user_pw):
+                            result = False, "❌ 로그인 실패. 아이디/비밀번호를 확인하세요.", None, None
+                            return result
+                        await _store_session_async(page, user_id, user_pw)
+
+                result = await do_purchase_async(page, games, progress=progress)
+                if result[0]:
+                    await _store_session_async(page, user_id, user_pw)
+                elif "로그인" in (result[1] or ""):
+                    session_cache.invalidate(user_id)
+                return result
             finally:
-                try:
-                    browser.close()
-                except:
-                    pass
+                if cast:
+                    await cast.stop()
+    except asyncio.CancelledError:
+        result = False, "구매 중 오류 발생: 작업 취소", None, None
+        raise
     except Exception as e:
         logger.error(f"[CORE] 전체 실패: {e}", exc_info=True)
-        return False, f"시스템 오류: {str(e)[:80]}", None, None
+        result = False, f"시스템 오류: {str(e)[:80]}", None, None
+        return result
+    finally:
+        _record_result(result, time.perf_counter() - started)
+        if blocker:
+            _record_blocking(blocker.stats(), report)
+
+def _purchase_job_async(user_id, user_pw, games):
+    """_purchase_job 의 비동기 엔진용 작업 함수"""
+    async def run(job, engine):
+        stream = screen_hub.open(job.id)
+        report = {}
+        try:
+            success, msg, round_no, round_date = await automate_purchase_async(
+                engine, user_id, user_pw, games, progress=job.step, stream=stream, report=report
+            )
+        finally:
+            stream.close()
+        return _job_result(user_id, games, success, msg, round_no, round_date, report)
+    return run
+
+# ── 백테스트 작업 대기열 (CPU 작업은 한 번에 하나, 내부에서 프로세스 풀 사용) ──
+BACKTEST_MAX_TRIALS = int(os.environ.get('BACKTEST_MAX_TRIALS', 20000))
+BACKTEST_WORKERS = int(os.environ.get('BACKTEST_WORKERS', 0)) or None   # 미설정 시 CPU 코어 수
+_backtest_queue = None
+
+def get_backtest_queue():
+    global _backtest_queue
+    with _purchase_queue_lock:
+        if _backtest_queue is None:
+            _backtest_queue = JobQueue(concurrency=1, max_queue=5, name="backtest").start()
+        return _backtest_queue
+
+def _backtest_job(params):
+    def run(job):
+        count, numbers = draw_archive.snapshot()
+        draws = np.frombuffer(numbers, dtype=np.uint8).reshape(-1, 7)
+        job.step("simulate", 0, "시뮬레이션 준비 중...")
+        result = backtest.run_backtest(
+            draws, draw_archive.prizes[:count], workers=BACKTEST_WORKERS,
+            progress=lambda done, total: job.update(done * 100 // total, f"{done}/{total} 시행 완료"),
+            **params
+        )
+        return {"success": True, **result}
+    return run
 
 # ══════════════════════════════════════════════════════════════
 #  Flask Routes
@@ -630,38 +1508,76 @@ def health():
         "status": "ok", 
         "env": "render" if os.environ.get('RENDER') else "local",
         "python": sys.version[:10],
-        "playwright": "available"
+        "playwright": readiness.phase,
+        "browsers_path": BROWSERS_PATH,
+        "readiness": readiness.state(),
+        "diagnostic": diagnostics.stats(),
+        "browser_pool": _browser_pool.stats() if _browser_pool else None,
+        "purchase_queue": _purchase_queue.stats() if _purchase_queue else None,
+        "session_cache": session_cache.stats(),
+        "screencast": screen_hub.stats(),
+        "captures": capture_store.stats() if capture_store else None,
+        "resource_blocking": resource_rules.to_dict() if RESOURCE_BLOCKING else None,
+        "page_probes": page_probes.stats(),
+        "selector_resolver": selector_resolver.stats(),
+        "scheduler": purchase_scheduler.stats() if SCHEDULER_ENABLED else None,
+        "history": history_compactor.stats(),
+        "history_index": history_index.stats(),
+        "lotto_result_cache": draw_result_cache.stats(),
+        "draw_archive": draw_archive.stats(),
     }), 200
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """구매 단계별 소요 시간 히스토그램 + 결과/사유별 카운터 (Prometheus 텍스트 포맷)"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/captures')
+def list_captures():
+    """보관된 실패/지연 작업 capture 목록 (trace.zip + network.har + meta.json)"""
+    if not capture_store:
+        return jsonify({"success": False, "message": "CAPTURE_ENABLED=1 일 때만 사용할 수 있습니다."}), 404
+    return jsonify({"success": True, **capture_store.stats(), "captures": capture_store.list()})
+
+@app.route('/captures/<name>')
+def download_capture(name):
+    path = capture_store.path(name) if capture_store else None
+    if not path:
+        return jsonify({"success": False, "message": "capture를 찾을 수 없습니다."}), 404
+    return send_file(path, mimetype='application/zip', as_attachment=True, download_name=name)
+
+@app.route('/livez')
+def livez():
+    """liveness: 프로세스 응답 여부만 (외부 의존성 확인 없음)"""
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/readyz')
+def readyz():
+    """readiness: 브라우저 예열 완료 여부 (완료 전/재시도 대기 중이면 503)"""
+    state = readiness.state()
+    return jsonify(state), 200 if state["ready"] else 503
+
 @app.route('/diagnostic')
 def diagnostic():
-    """브라우저 실행 가능 여부 정밀 진단"""
-    logger.info("[DIAG] 브라우저 진단 시작...")
-    sync_playwright = _get_playwright_module()
-    try:
-        with sync_playwright() as p:
-            # 브라우저 실행 시 경로 이슈를 방지하기 위해 args와 함께 명시적 실행
-            browser = p.chromium.launch(
-                headless=True, 
-                proxy=_get_proxy_config(),
-                args=["--no-sandbox", "--disable-setuid-sandbox", "--disable-dev-shm-usage"]
-            )
-            page = browser.new_page()
-            # 동행복권 사이트 직접 접속 테스트
-            page.goto("https://www.dhlottery.co.kr/", timeout=DEFAULT_TIMEOUT)
-            title = page.title()
-            browser.close()
-            return jsonify({"success": True, "title": title, "msg": "브라우저 엔진이 정상 작동합니다."})
-    except Exception as e:
-        logger.error(f"[DIAG] 실패: {e}")
-        return jsonify({"success": False, "msg": str(e)}), 500
+    """브라우저 진단 결과 (TTL 캐시, ?refresh=1: 백그라운드 갱신 요청) - 요청 처리 중 브라우저를 띄우지 않음"""
+    diagnostics.start()
+    if request.args.get('refresh') == '1':
+        diagnostics.refresh()
+    cached = diagnostics.get()
+    result = cached.pop("result")
+    if result is None:
+        return jsonify({
+            "success": False, "pending": True, "msg": "진단 진행 중입니다. 잠시 후 다시 확인하세요.",
+            "readiness": readiness.state(), "cached": cached,
+        }), 202
+    return jsonify({**result, "cached": cached}), 200 if result.get("success") else 500
 
 @app.route('/screenshot')
 def get_screenshot():
-    """현재 캡처된 화면 이미지 전송"""
-    from flask import Response
-    if latest_screenshot:
-        return Response(latest_screenshot, mimetype='image/jpeg')
+    """작업의 마지막 화면 1장 (?job_id=)"""
+    stream = screen_hub.get(request.args.get('job_id', ''))
+    if stream and stream.frame:
+        return Response(stream.frame, mimetype='image/jpeg', headers={'Cache-Control': 'no-store'})
     return "No screenshot", 404
 
 @app.route('/buy', methods=['POST'])
@@ -669,26 +1585,116 @@ def buy():
     data = request.json or {}
     uid      = data.get('id', '').strip()
     upw      = data.get('pw', '').strip()
-    numbers  = data.get('numbers', [])
 
     if not uid or not upw:
         return jsonify({"success": False, "message": "아이디/비밀번호가 없습니다."}), 400
-    if not numbers or len(numbers) != 6:
-        return jsonify({"success": False, "message": "번호 6개가 필요합니다."}), 400
-
-    success, msg, round_no, round_date = automate_purchase(uid, upw, numbers)
+    games, err = parse_games(data)
+    if err:
+        return jsonify({"success": False, "message": err}), 400
 
-    entry = None
-    if success:
-        entry = add_history(numbers, round_no, round_date, user_id=uid)
+    make_job = _purchase_job_async if PURCHASE_ENGINE == 'async' else _purchase_job
+    try:
+        job = get_purchase_queue().submit(
+            make_job(uid, upw, games), kind="purchase",
+            meta={"user_id": uid, "games": games}
+        )
+    except QueueFull as e:
+        return jsonify({"success": False, "message": str(e)}), 503
 
+    logger.info(f"[BUY] 작업 등록: {job.id} ({uid})")
     return jsonify({
-        "success": success,
-        "message": msg,
-        "round": round_no,
-        "round_date": round_date,
-        "entry": entry,
-    })
+        "success": True,
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}",
+        "stream_url": f"/jobs/{job.id}/stream",
+        "message": "구매 요청이 대기열에 등록되었습니다.",
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """구매 작업 상태/단계별 진행/최종 결과 조회"""
+    job = get_purchase_queue().get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    """대기/진행 중인 구매 작업 취소 (PURCHASE_ENGINE=async 전용)"""
+    queue = get_purchase_queue()
+    if not hasattr(queue, 'cancel'):
+        return jsonify({"success": False, "message": "현재 구매 엔진은 작업 취소를 지원하지 않습니다."}), 409
+    if not queue.get(job_id):
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    if not queue.cancel(job_id):
+        return jsonify({"success": False, "message": "이미 종료된 작업입니다."}), 409
+    return jsonify({"success": True, "job_id": job_id})
+
+@app.route('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    """구매 작업 실시간 화면 (MJPEG, 화면이 바뀔 때만 push → <img src>로 바로 표시)
+
+    연결 동안 워커 스레드를 점유하므로 작업이 실행 중일 때만 연결을 받고(대기 중이면 409),
+    시청자 수 제한을 넘으면 429(같은 작업)/503(서버 전체), 작업이 끝나면 연결을 닫는다.
+    """
+    job = get_purchase_queue().get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    if job.status == "queued":
+        return jsonify({"success": False, "status": job.status,
+                        "message": "작업이 아직 대기 중입니다. 실행이 시작된 뒤 연결하세요."}), 409
+    try:
+        stream = screen_hub.attach(job_id)
+    except ViewerLimit as e:
+        return jsonify({"success": False, "message": str(e)}), 429 if e.scope == "job" else 503, {"Retry-After": "5"}
+    if not stream:
+        return jsonify({"success": False, "message": "화면 스트림을 찾을 수 없습니다."}), 404
+    response = Response(
+        mjpeg(stream, done=lambda: job.finished_at is not None),
+        mimetype='multipart/x-mixed-replace; boundary=frame',
+        headers={'Cache-Control': 'no-store', 'X-Accel-Buffering': 'no'},
+    )
+    response.call_on_close(lambda: screen_hub.detach(stream))
+    return response
+
+@app.route('/jobs')
+def job_stats():
+    return jsonify(get_purchase_queue().stats())
+
+@app.route('/backtest', methods=['POST'])
+def start_backtest():
+    """전략 백테스트 작업 등록: {"strategy", "trials", "tickets", "seed", "from", "to"}"""
+    data = request.json or {}
+    try:
+        params = {
+            "strategy": data.get('strategy', 'random'),
+            "trials": int(data.get('trials', 100)),
+            "tickets": int(data.get('tickets', 5)),
+            "seed": None if data.get('seed') is None else int(data['seed']),
+            "start": int(data.get('from', 1)),
+            "end": None if data.get('to') is None else int(data['to']),
+        }
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "파라미터 형식이 올바르지 않습니다."}), 400
+    if params["strategy"] not in backtest.STRATEGIES:
+        return jsonify({"success": False, "message": f"strategy: {', '.join(backtest.STRATEGIES)}"}), 400
+    if not 1 <= params["trials"] <= BACKTEST_MAX_TRIALS or not 1 <= params["tickets"] <= MAX_GAMES_PER_TICKET:
+        return jsonify({"success": False, "message": "trials/tickets 범위를 확인하세요."}), 400
+    if not len(draw_archive):
+        return jsonify({"success": False, "message": "당첨번호 아카이브 동기화 전입니다."}), 503
+    try:
+        job = get_backtest_queue().submit(_backtest_job(params), kind="backtest", meta=params)
+    except QueueFull as e:
+        return jsonify({"success": False, "message": str(e)}), 503
+    return jsonify({"success": True, "job_id": job.id, "status_url": f"/backtest/{job.id}"}), 202
+
+@app.route('/backtest/<job_id>')
+def get_backtest(job_id):
+    job = get_backtest_queue().get(job_id)
+    if not job:
+        return jsonify({"success": False, "message": "작업을 찾을 수 없습니다."}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/history', methods=['GET'])
 def get_history():
@@ -700,53 +1706,396 @@ def get_history():
 def del_history():
     user_id = request.args.get('user_id', None)
     if user_id:
-        # 해당 유저 이력만 삭제
-        all_history = load_history()
-        remaining = [h for h in all_history if h.get('user_id') != user_id]
-        save_history(remaining)
+        # 해당 유저 이력만 삭제 (인덱스 기반 단일 트랜잭션)
+        history_index.delete_user(user_id)
     else:
         save_history([])
     return jsonify({"success": True})
 
+# ── 역대 당첨번호 아카이브 (최초 1회 전체 수집 후 매주 빠진 회차만 동기화) ──
+DRAW_ARCHIVE_FILE = os.environ.get('DRAW_ARCHIVE_FILE', os.path.join(BASE_DIR, 'draws.bin'))
+DRAW_SYNC_WORKERS = int(os.environ.get('DRAW_SYNC_WORKERS', 8))   # 백필 동시 요청 수
+draw_client = DrawClient(UA, base_url=WWW_URL)
+draw_archive = DrawArchive(DRAW_ARCHIVE_FILE, draw_client, workers=DRAW_SYNC_WORKERS)
+
+def _fetch_draw(round_no):
+    """특정 회차 당첨번호 (아카이브 우선, 없으면 getLottoNumber API)"""
+    return draw_archive.get(round_no) or draw_client.fetch(round_no)
+
+# 추첨 일정 기반 캐시 (다음 추첨 결과 예상 시각까지 업스트림 호출 없음)
+draw_result_cache = DrawResultCache(_fetch_draw)
+if draw_archive.latest_round():
+    draw_result_cache.update(draw_archive.get(draw_archive.latest_round()))
+draw_archive.subscribe(lambda added: draw_result_cache.update(max(added, key=lambda d: d['round'])))
+
+# ── 당첨번호 통계 (아카이브 기반, 새 회차는 누적 반영) ─────────────
+draw_stats = DrawStats()
+
+def _rebuild_stats():
+    count, numbers = draw_archive.snapshot()
+    draw_stats.rebuild(numbers, count)
+
+def _on_new_draws_stats(added):
+    added = sorted(added, key=lambda d: d['round'])
+    rounds = [d['round'] for d in added]
+    contiguous = rounds == list(range(rounds[0], rounds[-1] + 1))
+    rows = [[*d['numbers'], d['bonus']] for d in added]
+    if not (contiguous and draw_stats.add(rows, rounds[0] - 1)):
+        _rebuild_stats()   # 중간 회차가 채워진 경우(백필)만 전체 재계산
+
+_rebuild_stats()
+draw_archive.subscribe(_on_new_draws_stats)
+
+# ── 구매 이력 당첨 채점 (새 회차 동기화·보관 정리 주기마다 대기 중인 이력 자동 채점) ──
+def grade_pending():
+    """추첨이 끝난 회차의 미채점 이력을 한 번에 채점, 채점 건수 반환 (채점할 것이 없으면 쓰기 없음)"""
+    pending = [p for p in history_store.pending_grades(draw_archive.latest_round()) if len(p[2]) == 6]
+    if not pending:
+        return 0
+    ids, rounds, numbers = zip(*pending)
+    table = grading.DrawTable.from_archive(draw_archive)
+    matches, bonus, rank = grading.grade(recommend.rows_to_masks(numbers), rounds, table)
+    done = rank != grading.PENDING
+    if not done.any():
+        return 0   # 아카이브에 아직 없는 회차만 남은 경우
+    history_index.save_grades(
+        [(i, m, b, r) for i, m, b, r, ok in zip(ids, matches, bonus, rank, done) if ok]
+    )
+    logger.info(f"[GRADE] 이력 {int(done.sum())}건 채점 완료")
+    return int(done.sum())
+
+draw_archive.subscribe(lambda added: grade_pending())
+history_compactor.subscribe(grade_pending)
+if SERVER_PROCESS:
+    history_compactor.start()
+
+if SERVER_PROCESS and os.environ.get('DRAW_ARCHIVE_SYNC', '1') == '1':
+    draw_archive.start_sync()
+
+def _results_summary(entries):
+    """등수별 건수 + 확정 당첨금 합계"""
+    summary = {"total": len(entries), "pending": 0, "ranks": {str(r): 0 for r in range(0, 6)}, "prize_total": 0}
+    for e in entries:
+        if e['rank'] is None or e['rank'] == grading.PENDING:
+            summary["pending"] += 1
+            continue
+        summary["ranks"][str(e['rank'])] += 1
+        summary["prize_total"] += e.get('prize') or 0
+    return summary
+
+@app.route('/history/results', methods=['GET'])
+def history_results():
+    """구매 이력 당첨 결과 (?user_id=)
+
+    읽기 전용 - 채점은 회차 동기화/보관 정리 훅에서 수행하고, 아직 채점되지 않은 이력은 pending 으로 반환.
+    """
+    table = grading.DrawTable.from_archive(draw_archive)
+    entries = history_store.load_results(
+        user_id=request.args.get('user_id'), since=history_compactor.cutoff()
+    )
+    for e in entries:
+        e['status'] = 'pending' if e['rank'] is None else 'graded'
+        if e['rank'] is not None:
+            e['prize'] = grading.prize_for(e['rank'], int(e['round']), table)
+    return jsonify({"success": True, "summary": _results_summary(entries), "results": entries})
+
+@app.route('/history/results', methods=['POST'])
+def grade_bulk():
+    """임의 조합 일괄 채점 (저장하지 않음): {"entries": [{"numbers": [..6], "round": 1190}, ...]}"""
+    entries = (request.json or {}).get('entries') or []
+    try:
+        rows = [sorted(int(n) for n in e['numbers']) for e in entries]
+        rounds = [int(e['round']) for e in entries]
+        if any(len(r) != 6 or len(set(r)) != 6 or not all(1 <= n <= 45 for n in r) for r in rows):
+            raise ValueError
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"success": False, "msg": "entries 형식이 올바르지 않습니다."}), 400
+    table = grading.DrawTable.from_archive(draw_archive)
+    matches, bonus, rank = grading.grade(recommend.rows_to_masks(rows), rounds, table)
+    results = [
+        {
+            "numbers": n, "round": r, "matches": int(m), "bonus_match": bool(b), "rank": int(k),
+            "status": "pending" if k == grading.PENDING else "graded",
+            "prize": None if k == grading.PENDING else grading.prize_for(int(k), r, table),
+        }
+        for n, r, m, b, k in zip(rows, rounds, matches, bonus, rank)
+    ]
+    return jsonify({"success": True, "summary": _results_summary(results), "results": results})
+
 @app.route('/lotto-result')
 def lotto_result():
-    """동행복권 API에서 최신 당첨번호 조회"""
-    try:
-        # 1. 최신 회차 번호 파악 (메인에서 파싱)
-        headers = {'User-Agent': UA}
-        req = urllib.request.Request('https://www.dhlottery.co.kr/common.do?method=main', headers=headers)
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            html = resp.read().decode('utf-8')
-        m = re.search(r'제\s*(\d{3,4})\s*회', html)
-        if not m:
-            m = re.search(r'drwNo=(\d{3,4})', html)
-        latest_round = int(m.group(1)) if m else 1162
-
-        # 2. 해당 회차 당첨 정보 API 호출
-        api_url = f'https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={latest_round}'
-        req2 = urllib.request.Request(api_url, headers=headers)
-        with urllib.request.urlopen(req2, timeout=10) as resp2:
-            result = json.loads(resp2.read().decode('utf-8'))
-
-        if result.get('returnValue') != 'success':
-            return jsonify({'success': False, 'msg': '당첨번호 데이터 없음'}), 404
-
-        return jsonify({
-            'success': True,
-            'round': result.get('drwNo'),
-            'date': result.get('drwNoDate'),
-            'numbers': [
-                result.get('drwtNo1'), result.get('drwtNo2'),
-                result.get('drwtNo3'), result.get('drwtNo4'),
-                result.get('drwtNo5'), result.get('drwtNo6'),
-            ],
-            'bonus': result.get('bnusNo'),
-            'first_winners': result.get('firstPrzwnerCo', 0),
-            'first_prize': result.get('firstWinamnt', 0),
-        })
+    """최신 당첨번호 조회 (캐시 우선, 만료 시 백그라운드 갱신)"""
+    try:
+        data, meta = draw_result_cache.get()
     except Exception as e:
         logger.error(f"[RESULT] 당첨번호 조회 실패: {e}")
         return jsonify({'success': False, 'msg': str(e)}), 500
+    if not data:
+        return jsonify({'success': False, 'msg': '당첨번호 데이터 없음'}), 404
+    return jsonify({'success': True, **data, 'cache': meta})
+
+@app.route('/stats')
+def stats():
+    """역대 당첨번호 통계 (?matrix=1: 45×45 동시출현 행렬 포함, ?window=N: 최근 N회 빈도)"""
+    data = draw_stats.summary(matrix=request.args.get('matrix') == '1')
+    try:
+        window = _int_arg('window', 1, draw_stats.count)
+    except ValueError:
+        return jsonify({'success': False, 'msg': f'window는 1~{draw_stats.count} 사이의 정수여야 합니다.'}), 400
+    if window:
+        data['window'] = {"size": window, "frequency": draw_stats.window_freq(window).tolist()}
+    return jsonify({'success': True, **data})
+
+def _winning_masks():
+    """역대 1등 당첨 조합 비트마스크 (보너스 제외)"""
+    count, numbers = draw_archive.snapshot()
+    rows = np.frombuffer(numbers, dtype=np.uint8, count=count * 7).reshape(-1, 7)[:, :6]
+    return recommend.rows_to_masks(rows[rows[:, 0] > 0])
+
+RECOMMEND_MODES = ('random', 'statistics', 'hot')
+
+def _mode_weights(mode):
+    """번호 생성 방식별 가중치 (random 또는 통계 없음: None)"""
+    if mode == 'statistics' and draw_stats.count:
+        return np.asarray(draw_stats.summary()['frequency'], dtype=np.float64)
+    if mode == 'hot' and draw_stats.count:
+        return draw_stats.window_freq(52).astype(np.float64) + 1
+    return None
+
+def _int_arg(name, lo=None, hi=None):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    value = int(value)
+    if (lo is not None and value < lo) or (hi is not None and value > hi):
+        raise ValueError(f"{name} 범위 초과")
+    return value
+
+@app.route('/recommend')
+def recommend_numbers():
+    """조건부 번호 조합 일괄 생성
+
+    ?count=N&mode=random|statistics|hot&sum_min=&sum_max=&odd_min=&odd_max=
+    &max_consecutive=&exclude_winning=1&user_id=(구매 이력 조합 제외)&seed=
+    """
+    try:
+        count = _int_arg('count', 1, 10000) or 5
+        constraints = recommend.Constraints(
+            sum_min=_int_arg('sum_min', 21, 255), sum_max=_int_arg('sum_max', 21, 255),
+            odd_min=_int_arg('odd_min', 0, 6), odd_max=_int_arg('odd_max', 0, 6),
+            max_consecutive=_int_arg('max_consecutive', 1, 6),
+        )
+        seed = _int_arg('seed', 0)
+        mode = request.args.get('mode') or 'random'
+        if mode not in RECOMMEND_MODES:
+            raise ValueError(f"mode는 {', '.join(RECOMMEND_MODES)} 중 하나")
+    except ValueError as e:
+        return jsonify({'success': False, 'msg': f'잘못된 파라미터: {e}'}), 400
+
+    weights = _mode_weights(mode)
+
+    exclude = []
+    if request.args.get('exclude_winning', '1') == '1':
+        exclude.append(_winning_masks())
+    user_id = request.args.get('user_id')
+    if user_id:
+        bought = [h['numbers'] for h in load_history(user_id=user_id) if len(h.get('numbers') or []) == 6]
+        exclude.append(recommend.rows_to_masks(bought))
+
+    started = time.perf_counter()
+    masks, generated = recommend.generate(
+        count, np.random.default_rng(seed), weights=weights, constraints=constraints,
+        exclude=np.concatenate(exclude) if exclude else None,
+    )
+    return jsonify({
+        'success': len(masks) == count,
+        'mode': mode,
+        'constraints': constraints.to_dict(),
+        'combinations': recommend.masks_to_rows(masks).tolist(),
+        'candidates': generated,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        **({} if len(masks) == count else {'msg': '조건을 만족하는 조합이 부족합니다.'}),
+    })
+
+@app.route('/draws')
+def draws():
+    """아카이브 회차 범위 조회 (?from=&to=, 기본: 최근 10회)"""
+    latest = draw_archive.latest_round()
+    try:
+        end = int(request.args.get('to', latest))
+        start = int(request.args.get('from', max(1, end - 9)))
+    except ValueError:
+        return jsonify({'success': False, 'msg': 'from/to는 회차 번호여야 합니다.'}), 400
+    if start > end:
+        return jsonify({'success': False, 'msg': 'from이 to보다 큽니다.'}), 400
+    return jsonify({'success': True, 'latest': latest, 'draws': draw_archive.range(max(1, start), end)})
+
+# ══════════════════════════════════════════════════════════════
+#  정기 구매 스케줄러 (매 회차 판매 마감 전에 주문을 분산 실행)
+# ══════════════════════════════════════════════════════════════
+SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+SCHEDULE_DB = os.environ.get('SCHEDULE_DB', os.path.join(BASE_DIR, 'purchase_schedule.db'))
+SCHEDULE_INTERVAL = int(os.environ.get('SCHEDULE_INTERVAL', 30))            # 실행 대상 확인 주기(초)
+SCHEDULE_CONCURRENCY = int(os.environ.get('SCHEDULE_CONCURRENCY', 1))       # 동시에 대기열에 넣는 정기 구매 수
+SCHEDULE_MARGIN = int(os.environ.get('SCHEDULE_MARGIN', 3600))              # 판매 마감 N초 전까지 분산 배치
+SCHEDULE_MAX_ATTEMPTS = int(os.environ.get('SCHEDULE_MAX_ATTEMPTS', 4))     # 회차당 최대 시도 횟수
+SCHEDULE_RETRY_BASE = int(os.environ.get('SCHEDULE_RETRY_BASE', 300))       # 재시도 대기(초), 실패마다 2배
+SCHEDULE_MAX_ORDERS = int(os.environ.get('SCHEDULE_MAX_ORDERS', 5))         # 사용자당 최대 주문 수
+schedule_store = ScheduleStore(SCHEDULE_DB, key=os.environ.get('SCHEDULE_KEY'))   # 미설정 시 DB 옆 .key 파일
+
+def _scheduled_games(order):
+    """생성 방식 주문의 이번 회차 번호 (역대 당첨/사용자 구매 조합 제외)"""
+    exclude = [_winning_masks()]
+    bought = [h['numbers'] for h in load_history(user_id=order['user_id']) if len(h.get('numbers') or []) == 6]
+    if bought:
+        exclude.append(recommend.rows_to_masks(bought))
+    masks, _ = recommend.generate(
+        order['count'], np.random.default_rng(), weights=_mode_weights(order['mode']),
+        exclude=np.concatenate(exclude),
+    )
+    return recommend.masks_to_rows(masks).tolist()
+
+def _submit_scheduled(order, user_pw, games):
+    make_job = _purchase_job_async if PURCHASE_ENGINE == 'async' else _purchase_job
+    return get_purchase_queue().submit(
+        make_job(order['user_id'], user_pw, games), kind="scheduled",
+        meta={"user_id": order['user_id'], "games": games, "order_id": order['order_id']},
+    )
+
+def _verify_scheduled(order):
+    """구매 여부 불명 실행 확인: 실행 시작 이후 같은 번호의 구매 이력이 있으면 구매됨
+
+    이력이 없다고 구매되지 않은 것은 아니므로(이력 기록 전 종료 등) 그 경우는 판단 보류(None).
+    """
+    run = order['run']
+    since = datetime.fromtimestamp(run['started_at']).isoformat()
+    games = {tuple(sorted(g)) for g in run['games'] or []}
+    bought = {tuple(sorted(h['numbers'])) for h in history_store.load(user_id=order['user_id'], since=since)}
+    return True if games and games <= bought else None
+
+purchase_scheduler = PurchaseScheduler(
+    schedule_store, submit=_submit_scheduled, generate=_scheduled_games, classify=_failure_reason,
+    verify=_verify_scheduled, interval=SCHEDULE_INTERVAL, max_inflight=SCHEDULE_CONCURRENCY,
+    margin=SCHEDULE_MARGIN, retry_base=SCHEDULE_RETRY_BASE, max_attempts=SCHEDULE_MAX_ATTEMPTS,
+    on_result=lambda outcome: SCHEDULED_PURCHASES.inc(outcome=outcome),
+)
+if SERVER_PROCESS and SCHEDULER_ENABLED:
+    purchase_scheduler.start()
+
+def _order_view(order):
+    order = dict(order)
+    if order.get('next_run_at'):
+        order['next_run_kst'] = datetime.fromtimestamp(order['next_run_at'], draw_schedule.KST).isoformat()
+    return order
+
+@app.route('/schedule', methods=['POST'])
+def create_schedule():
+    """정기 구매 주문 등록: {"id", "pw", "games"|"numbers"} 또는 {"id", "pw", "count", "mode"}"""
+    data = request.json or {}
+    uid = data.get('id', '').strip()
+    upw = data.get('pw', '').strip()
+    if not uid or not upw:
+        return jsonify({"success": False, "message": "아이디/비밀번호가 없습니다."}), 400
+
+    games, count, mode = None, None, None
+    if data.get('games') is not None or data.get('numbers'):
+        games, err = parse_games(data)
+        if err:
+            return jsonify({"success": False, "message": err}), 400
+    else:
+        try:
+            count = int(data.get('count', 1))
+        except (TypeError, ValueError):
+            count = 0
+        mode = data.get('mode', 'random')
+        if not 1 <= count <= MAX_GAMES_PER_TICKET or mode not in RECOMMEND_MODES:
+            return jsonify({"success": False, "message": f"count는 1~{MAX_GAMES_PER_TICKET}, mode는 {', '.join(RECOMMEND_MODES)} 중 하나입니다."}), 400
+    if len(schedule_store.list(uid)) >= SCHEDULE_MAX_ORDERS:
+        return jsonify({"success": False, "message": f"사용자당 최대 {SCHEDULE_MAX_ORDERS}개까지 등록할 수 있습니다."}), 409
+
+    order_id = schedule_store.add(uid, upw, games=games, count=count, mode=mode)
+    purchase_scheduler.schedule(order_id)
+    logger.info(f"[SCHEDULE] 주문 등록: {order_id} ({uid})")
+    return jsonify({"success": True, "order": _order_view(schedule_store.get(order_id))}), 201
+
+@app.route('/schedule', methods=['GET'])
+def list_schedule():
+    """사용자의 정기 구매 주문 목록 (?user_id= 필수)"""
+    user_id = request.args.get('user_id', '').strip()
+    if not user_id:
+        return jsonify({"success": False, "message": "user_id가 필요합니다."}), 400
+    return jsonify({"success": True, "orders": [_order_view(o) for o in schedule_store.list(user_id)]})
+
+@app.route('/schedule/<order_id>', methods=['DELETE'])
+def delete_schedule(order_id):
+    """정기 구매 주문 삭제 (?user_id= 가 주문 사용자와 같아야 함)"""
+    order = schedule_store.get(order_id)
+    if not order or order['user_id'] != request.args.get('user_id'):
+        return jsonify({"success": False, "message": "주문을 찾을 수 없습니다."}), 404
+    schedule_store.delete(order_id)
+    return jsonify({"success": True})
+
+@app.route('/schedule/<order_id>/resolve', methods=['POST'])
+def resolve_schedule(order_id):
+    """구매 여부 불명 실행 확인 결과 입력: {"user_id", "purchased": true|false} (동행복권 구매내역 확인 후)"""
+    data = request.json or {}
+    order = schedule_store.get(order_id)
+    if not order or order['user_id'] != data.get('user_id'):
+        return jsonify({"success": False, "message": "주문을 찾을 수 없습니다."}), 404
+    if not isinstance(data.get('purchased'), bool):
+        return jsonify({"success": False, "message": "purchased는 true 또는 false여야 합니다."}), 400
+    if not purchase_scheduler.resolve(order_id, data['purchased']):
+        return jsonify({"success": False, "message": "구매 여부 확인이 필요한 실행이 없습니다."}), 409
+    return jsonify({"success": True, "order": _order_view(schedule_store.get(order_id))})
+
+# ══════════════════════════════════════════════════════════════
+#  예열 / 상태 확인 (liveness · readiness · 캐시된 브라우저 진단)
+# ══════════════════════════════════════════════════════════════
+BROWSER_WARMUP = os.environ.get('BROWSER_WARMUP', '1') == '1'   # 시작 시 브라우저 실행/확인
+DIAGNOSTIC_TTL = int(os.environ.get('DIAGNOSTIC_TTL', 600))        # 진단 결과 재사용 시간(초)
+
+_PROBE_JS = "() => navigator.userAgent"
+
+async def _probe_async(page):
+    return await page.evaluate(_PROBE_JS)
+
+def _warm_browser():
+    """구매 엔진 브라우저 실행 + 빈 페이지에서 JS 실행 확인"""
+    if PURCHASE_ENGINE == 'async':
+        get_purchase_queue().run(_probe_async, timeout=120)
+    else:
+        get_browser_pool().run(lambda page: page.evaluate(_PROBE_JS), timeout=120)
+
+def _diagnose():
+    """예열된 구매 엔진 브라우저로 사이트 접속 확인 (새 브라우저를 띄우지 않음)"""
+    def visit(page):
+        page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        return page.title()
+
+    async def visit_async(page):
+        await page.goto(f"{WWW_URL}/", wait_until="domcontentloaded", timeout=DEFAULT_TIMEOUT)
+        return await page.title()
+
+    timeout = DEFAULT_TIMEOUT / 1000 + 30
+    if PURCHASE_ENGINE == 'async':
+        title = get_purchase_queue().run(visit_async, timeout=timeout)
+    else:
+        title = get_browser_pool().run(visit, timeout=timeout)
+    return {"success": True, "title": title, "msg": "브라우저 엔진이 정상 작동합니다."}
+
+def _purchases_busy():
+    """구매 작업이 대기/진행 중이면 진단 갱신을 미룸"""
+    stats = _purchase_queue.stats() if _purchase_queue else {}
+    return bool(stats.get("running") or stats.get("queued"))
+
+readiness = Readiness(
+    [("purchase_queue", get_purchase_queue), ("browser", _warm_browser)] if BROWSER_WARMUP else []
+)
+diagnostics = CachedCheck(_diagnose, ttl=DIAGNOSTIC_TTL, busy=_purchases_busy, ready=lambda: readiness.ready)
+if SERVER_PROCESS:
+    readiness.start()
+    if BROWSER_WARMUP:
+        diagnostics.start()   # 꺼져 있으면 /diagnostic 첫 요청 때 시작
 
 # ══════════════════════════════════════════════════════════════
 #  개발 서버 실행
@@ -0,0 +1,242 @@
+import asyncio
+import contextlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from jobs import Job, QueueFull
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPurchaseEngine:
+    """이벤트 루프 1개 + 브라우저 1개에서 여러 구매 컨텍스트를 동시에 실행 (Playwright async API)
+
+    - 전용 스레드의 asyncio 루프가 async Playwright/브라우저를 소유
+    - Semaphore 로 동시 컨텍스트 수 제한, 대기 작업이 max_queue 를 넘으면 QueueFull
+    - 작업별 시간 제한(timeout)과 취소(cancel) 지원
+    - submit/get/stats 는 JobQueue 와 같은 형태 (Flask 라우트에서 그대로 사용)
+
+    fn(job, engine) 은 코루틴 함수이며 `async with engine.page(options) as page:` 로 컨텍스트를 연다.
+    """
+
+    def __init__(self, concurrency, launch_options, context_options=None, page_factory=None,
+                 max_queue=20, timeout=300, max_jobs=100, keep=200, name="async"):
+        self.concurrency = max(1, int(concurrency))
+        self.launch_options = launch_options
+        self.context_options = context_options or {}
+        self.page_factory = page_factory
+        self.max_queue = max(1, int(max_queue))
+        self.timeout = timeout
+        self.max_jobs = max(1, int(max_jobs))
+        self.keep = keep
+        self.name = name
+        self._jobs = OrderedDict()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._sem = None
+        self._browser_lock = None
+        self._playwright = None
+        self._browser = None
+        self._contexts = 0         # 현재 열린 컨텍스트 수
+        self._browser_jobs = 0     # 현재 브라우저로 연 컨텍스트 수 (재활용 판단용)
+        self._launches = 0
+        self._completed = 0
+        self._failed = 0
+        self._cancelled = 0
+        self._timeouts = 0
+        self._rejected = 0
+
+    # ── 수명 주기 ───────────────────────────────────────────────
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return self
+            self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._loop_main, args=(ready,), name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+        logger.info(f"[ASYNC] '{self.name}' 엔진 시작 (동시 {self.concurrency}, 대기열 {self.max_queue})")
+        return self
+
+    def _loop_main(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._browser_lock = asyncio.Lock()
+        self._loop.call_soon(ready.set)
+        self._loop.run_forever()
+
+    def shutdown(self, timeout=10):
+        if self._loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_browser(stop=True), self._loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"[ASYNC] 브라우저 종료 실패: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    # ── 브라우저/컨텍스트 (루프 스레드 전용) ───────────────────────
+    async def _ensure_browser(self):
+        """브라우저 반환 + 컨텍스트 슬롯 예약 (잠금 안에서 예약해야 new_context 대기 중 재활용되지 않음)"""
+        async with self._browser_lock:
+            if self._browser is not None and self._contexts == 0 and self._browser_jobs >= self.max_jobs:
+                logger.info(f"[ASYNC] 컨텍스트 {self._browser_jobs}회 사용 → 브라우저 재활용")
+                await self._close_browser()
+            if self._browser is None or not self._browser.is_connected():
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(**self.launch_options)
+                self._browser_jobs = 0
+                with self._lock:
+                    self._launches += 1
+                logger.info("[ASYNC] 브라우저 실행 완료")
+            self._contexts += 1
+            self._browser_jobs += 1
+            return self._browser
+
+    async def _close_browser(self, stop=False):
+        browser, self._browser = self._browser, None
+        if browser is not None:
+            with contextlib.suppress(Exception):
+                await browser.close()
+        if stop and self._playwright is not None:
+            with contextlib.suppress(Exception):
+                await self._playwright.stop()
+            self._playwright = None
+
+    @contextlib.asynccontextmanager
+    async def page(self, context_options=None):
+        """작업용 격리 컨텍스트의 새 페이지 (종료/취소 시 컨텍스트 닫음)"""
+        browser = await self._ensure_browser()
+        try:
+            context = await browser.new_context(**{**self.context_options, **(context_options or {})})
+        except BaseException:
+            # 예약한 슬롯 반환 (그 사이 브라우저가 다시 실행됐으면 사용 횟수는 이미 초기화됨)
+            self._contexts -= 1
+            if self._browser is browser:
+                self._browser_jobs -= 1
+            raise
+        try:
+            if self.page_factory:
+                yield await self.page_factory(context)
+            else:
+                yield await context.new_page()
+        finally:
+            self._contexts -= 1
+            with contextlib.suppress(Exception):
+                await context.close()
+
+    async def _with_page(self, fn, context_options):
+        async with self.page(context_options) as page:
+            return await fn(page)
+
+    def run(self, fn, context_options=None, timeout=None):
+        """async fn(page) 를 대기열과 별도로 바로 실행하고 결과 반환 (예열/진단용, BrowserPool.run 대응)"""
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self._with_page(fn, context_options), self._loop)
+        return future.result(timeout)
+
+    # ── 작업 제출/취소 (다른 스레드에서 호출) ──────────────────────
+    def submit(self, fn, kind="job", meta=None, timeout=None):
+        if self._loop is None:
+            self.start()
+        with self._lock:
+            # 실행 슬롯(concurrency) + 대기열(max_queue) 까지 수용
+            pending = sum(1 for j in self._jobs.values() if j.finished_at is None)
+            if pending >= self.concurrency + self.max_queue:
+                self._rejected += 1
+                raise QueueFull(f"대기열이 가득 찼습니다 ({self.max_queue}건). 잠시 후 다시 시도하세요.")
+            job = Job(fn, kind, meta)
+            self._jobs[job.id] = job
+            self._evict()
+        future = asyncio.run_coroutine_threadsafe(self._run(job, timeout or self.timeout), self._loop)
+        with self._lock:
+            self._futures[job.id] = future
+        future.add_done_callback(lambda f: self._on_done(job, f))
+        return job
+
+    def cancel(self, job_id):
+        """대기/실행 중인 작업 취소 (이미 끝났거나 없으면 False)"""
+        with self._lock:
+            future = self._futures.get(job_id)
+        return bool(future and future.cancel())
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+            return {
+                "engine": "async",
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "queued": statuses.count("queued"),
+                "running": statuses.count("running"),
+                "completed": self._completed,
+                "failed": self._failed,
+                "cancelled": self._cancelled,
+                "timeouts": self._timeouts,
+                "rejected": self._rejected,
+                "contexts": self._contexts,
+                "browser_launches": self._launches,
+            }
+
+    def _evict(self):
+        # 완료된 작업만 오래된 순서로 정리 (진행 중인 작업은 유지)
+        if len(self._jobs) <= self.keep:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.keep:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+    # ── 실행 (루프 스레드) ──────────────────────────────────────
+    async def _run(self, job, timeout):
+        async with self._sem:
+            if job.status == "cancelled":
+                return None
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                result = await asyncio.wait_for(job.fn(job, self), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[ASYNC] 작업 {job.id} 시간 초과 ({timeout}초)")
+                with self._lock:
+                    self._timeouts += 1
+                job._finish("failed", error=f"작업 시간 초과 ({timeout}초)")
+                return None
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[ASYNC] 작업 {job.id} 실패: {e}", exc_info=True)
+                job._finish("failed", error=str(e)[:200])
+                return None
+            if job.status == "cancelled":   # 취소 요청 직후 끝난 경우 취소 상태 유지
+                return result
+            ok = not (isinstance(result, dict) and result.get("success") is False)
+            job._finish("done" if ok else "failed", result=result)
+            return result
+
+    def _on_done(self, job, future):
+        # 대기 중 취소되면 코루틴이 시작되지 않으므로 여기서 상태 정리
+        if future.cancelled() and job.finished_at is None:
+            logger.info(f"[ASYNC] 작업 {job.id} 취소")
+            job._finish("cancelled", error="작업이 취소되었습니다.")
+        job.fn = None
+        with self._lock:
+            self._futures.pop(job.id, None)
+            if job.status == "done":
+                self._completed += 1
+            elif job.status == "cancelled":
+                self._cancelled += 1
+            else:
+                self._failed += 1
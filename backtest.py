@@ -0,0 +1,245 @@
+"""번호 선택 전략 백테스트 / 몬테카를로 시뮬레이션
+
+역대 회차마다 전략으로 조합을 골라 실제 당첨번호와 채점하는 과정을 trials번 반복한다.
+당첨 비트마스크·전략 가중치는 부모 프로세스에서 한 번만 계산해 공유 메모리에 올리고
+워커 프로세스들은 복사 없이 참조한다.
+
+    python backtest.py --strategy statistics --trials 2000 --tickets 5 --seed 42
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import grading
+from recommend import rows_to_masks
+from stats import onehot
+
+logger = logging.getLogger(__name__)
+
+STRATEGIES = ("random", "statistics", "frequency", "hot")
+# 프론트엔드 '통계 분석' 모드와 동일한 가중 번호
+STAT_NUMS = [1, 27, 34, 43, 13, 33, 17, 4, 39, 11, 40, 2, 20, 26, 37, 10, 14, 18, 5, 24]
+TICKET_PRICE = 1000
+# 회차별 금액이 없는 등수의 추정 당첨금 (1등은 아카이브 금액 우선)
+PRIZE_ESTIMATES = {1: 2_000_000_000, 2: 55_000_000, 3: 1_500_000, 4: 50_000, 5: 5_000}
+
+_worker = {}   # 워커 프로세스 전역 상태 (공유 메모리 뷰)
+
+
+def strategy_log_weights(strategy, draws):
+    """회차별(행) 번호 가중치 log 행렬, random 이면 None
+
+    frequency/hot 은 해당 회차 이전 결과만 사용한다.
+    """
+    if strategy == "random":
+        return None
+    if strategy == "statistics":
+        w = np.ones(45)
+        w[np.asarray(STAT_NUMS) - 1] += 2
+        return np.broadcast_to(np.log(w / w.sum()), (len(draws), 45))
+    prefix = np.vstack([np.zeros((1, 45), dtype=np.int64), np.cumsum(onehot(draws), axis=0)])[:-1]
+    if strategy == "frequency":
+        w = prefix + 1.0
+    elif strategy == "hot":
+        lag = np.vstack([np.zeros((52, 45), dtype=np.int64), prefix])[:len(prefix)]
+        w = prefix - lag + 1.0
+    else:
+        raise ValueError(f"알 수 없는 전략: {strategy}")
+    return np.log(w / w.sum(axis=1, keepdims=True))
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python 3.12 이하: 워커 종료 시 공유 메모리를 지우지 않도록 추적 해제
+        shm = shared_memory.SharedMemory(name=name)
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _share(arrays, shms):
+    """{이름: 배열} 을 공유 메모리에 복사 → 워커 전달용 명세 [(이름, 세그먼트, shape, dtype)]
+
+    생성한 세그먼트는 shms 에 추가 (호출한 쪽에서 정리).
+    """
+    spec = []
+    for key, arr in arrays.items():
+        arr = np.ascontiguousarray(arr)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, arr.nbytes))
+        shms.append(shm)
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[:] = arr
+        spec.append((key, shm.name, arr.shape, arr.dtype.str))
+    return spec
+
+
+def _init_worker(spec, tickets):
+    shms, views = [], {}
+    for key, name, shape, dtype in spec:
+        shm = _attach(name)
+        shms.append(shm)
+        views[key] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _worker.update(
+        shms=shms,
+        table=grading.DrawTable.from_masks(views["main"], views["bonus"], views["prizes"]),
+        rounds=views["rounds"],
+        log_w=views.get("log_w"),
+        round_prize=views["round_prize"],
+        tickets=tickets,
+    )
+
+
+def _run_trials(chunk):
+    """chunk: [(시행 번호, SeedSequence)] → [(시행 번호, 등수별 건수[0..5], 당첨금)]"""
+    table, rounds, log_w = _worker["table"], _worker["rounds"], _worker["log_w"]
+    tickets, round_prize = _worker["tickets"], _worker["round_prize"]
+    out = []
+    for trial, seq in chunk:
+        rng = np.random.default_rng(seq)
+        keys = rng.random((len(rounds), tickets, 45))
+        if log_w is not None:
+            keys = log_w[:, None, :] - np.log(-np.log(keys))     # Gumbel top-k 가중 추출
+        picks = np.argpartition(-keys, 6, axis=2)[..., :6] + 1
+        masks = rows_to_masks(picks.reshape(-1, 6))
+        _, _, rank = grading.grade(masks, np.repeat(rounds, tickets), table)
+        hist = np.bincount(rank, minlength=6)[:6]
+        rank = rank.reshape(len(rounds), tickets)
+        winnings = (
+            (rank == 1).sum(axis=1) @ round_prize
+            + sum(PRIZE_ESTIMATES[r] * int((rank == r).sum()) for r in (2, 3, 4, 5))
+        )
+        out.append((trial, hist.tolist(), float(winnings)))
+    return out
+
+
+def run_backtest(draws, prizes, strategy="random", trials=100, tickets=5, seed=None,
+                 start=1, end=None, workers=None, progress=None):
+    """draws: (N, 7) uint8 [번호 6개 + 보너스], prizes: (N,) 1등 당첨금
+
+    progress(완료 시행 수, 전체 시행 수) 콜백으로 진행 상황 보고.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy는 {', '.join(STRATEGIES)} 중 하나여야 합니다.")
+    draws = np.ascontiguousarray(draws, dtype=np.uint8).reshape(-1, 7)
+    count = len(draws)
+    end = min(end or count, count)
+    if not 1 <= start <= end:
+        raise ValueError("회차 범위가 올바르지 않습니다.")
+    workers = max(1, min(workers or os.cpu_count() or 1, trials))
+    seed_seq = np.random.SeedSequence(seed)
+    # 시행마다 고유 시드 → 워커 수와 무관하게 같은 seed면 같은 결과
+    tasks = list(enumerate(seed_seq.spawn(trials)))
+    chunk_size = max(1, min(50, trials // (workers * 4) or 1))
+    chunks = [tasks[i:i + chunk_size] for i in range(0, trials, chunk_size)]
+
+    started = time.perf_counter()
+    # 채점 테이블/가중치는 여기서 한 번만 계산 (워커는 공유 메모리 뷰만 연결)
+    table = grading.DrawTable(count, draws, np.asarray(prizes, dtype=np.int64)[:count])
+    rounds = np.arange(start, end + 1)
+    rounds = rounds[draws[rounds - 1, 0] > 0]       # 수집된 회차만
+    arrays = {
+        "main": table.main,
+        "bonus": table.bonus,
+        "prizes": table.prizes,
+        "rounds": rounds,
+        "round_prize": np.where(table.prizes[rounds - 1] > 0,
+                                table.prizes[rounds - 1], PRIZE_ESTIMATES[1]).astype(np.float64),
+    }
+    log_w = strategy_log_weights(strategy, draws)
+    if log_w is not None:
+        arrays["log_w"] = log_w[rounds - 1]
+
+    shms = []
+    try:
+        init_args = (_share(arrays, shms), tickets)
+
+        results = []
+        if workers == 1:
+            _init_worker(*init_args)
+            for chunk in chunks:
+                results.extend(_run_trials(chunk))
+                if progress:
+                    progress(len(results), trials)
+            _worker.clear()
+        else:
+            # gunicorn 스레드 안에서도 안전하도록 spawn 컨텍스트 사용
+            with mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+                for part in pool.imap_unordered(_run_trials, chunks):
+                    results.extend(part)
+                    if progress:
+                        progress(len(results), trials)
+    finally:
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+    results.sort()
+    hists = np.array([r[1] for r in results], dtype=np.int64)
+    winnings = np.array([r[2] for r in results])
+    rounds_used = int((draws[start - 1:end, 0] > 0).sum())
+    cost = rounds_used * tickets * TICKET_PRICE
+    return {
+        "strategy": strategy,
+        "seed": seed,
+        "trials": trials,
+        "rounds": rounds_used,
+        "range": [start, end],
+        "tickets_per_round": tickets,
+        "cost_per_trial": cost,
+        "hits": {
+            "total": {str(r): int(hists[:, r].sum()) for r in range(6)},
+            "mean_per_trial": {str(r): round(float(hists[:, r].mean()), 4) for r in range(6)},
+        },
+        "return": {
+            "mean": round(float(winnings.mean()), 1),
+            "std": round(float(winnings.std()), 1),
+            "p5": float(np.percentile(winnings, 5)),
+            "p50": float(np.percentile(winnings, 50)),
+            "p95": float(np.percentile(winnings, 95)),
+            "roi": round(float(winnings.mean()) / cost, 4) if cost else None,
+        },
+        "workers": workers,
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    from draw_archive import DrawArchive
+
+    parser = argparse.ArgumentParser(description="번호 선택 전략 백테스트 / 몬테카를로 시뮬레이션")
+    parser.add_argument("--archive", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "draws.bin"))
+    parser.add_argument("--strategy", choices=STRATEGIES, default="random")
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--tickets", type=int, default=5, help="회차당 구매 게임 수")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--from", dest="start", type=int, default=1)
+    parser.add_argument("--to", dest="end", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    archive = DrawArchive(args.archive, client=None)
+    if not len(archive):
+        parser.error(f"아카이브가 비어 있습니다: {args.archive} (서버를 한 번 실행해 동기화하세요)")
+    count, numbers = archive.snapshot()
+    draws = np.frombuffer(numbers, dtype=np.uint8).reshape(-1, 7)
+
+    def report(done, total):
+        print(f"\r진행: {done}/{total} ({done * 100 // total}%)", end="", file=sys.stderr, flush=True)
+
+    result = run_backtest(draws, archive.prizes, strategy=args.strategy, trials=args.trials,
+                          tickets=args.tickets, seed=args.seed, start=args.start, end=args.end,
+                          workers=args.workers, progress=report)
+    print(file=sys.stderr)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
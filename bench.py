@@ -0,0 +1,147 @@
+"""구매 자동화 end-to-end 지연 벤치마크 (mock_site.py 대상, 완전 오프라인)
+
+mock 사이트를 띄우고 실제 브라우저 풀 + automate_purchase 로 구매 작업을 동시에 실행해
+p50/p95 지연, 처리량, 단계별 평균 소요 시간, 실패 사유 분포를 JSON 으로 출력한다.
+
+    python bench.py --jobs 20 --concurrency 2 --latency-ms 80 --fail-balance 0.1
+    python bench.py --engine async --jobs 20 --concurrency 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import mock_site
+
+
+def _percentiles(values):
+    if not values:
+        return {}
+    arr = np.asarray(values)
+    return {
+        "p50": round(float(np.percentile(arr, 50)), 3),
+        "p95": round(float(np.percentile(arr, 95)), 3),
+        "mean": round(float(arr.mean()), 3),
+        "max": round(float(arr.max()), 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="구매 자동화 지연/처리량 벤치마크 (오프라인 mock 사이트)")
+    parser.add_argument("--jobs", type=int, default=10, help="전체 구매 작업 수")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 작업 수 (thread: 브라우저 풀 크기, async: 동시 컨텍스트 수)")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread", help="구매 엔진 (PURCHASE_ENGINE)")
+    parser.add_argument("--games", type=int, default=1, help="작업당 게임 수 (1~5)")
+    parser.add_argument("--warmup", type=int, default=1, help="집계에서 제외할 예열 작업 수")
+    parser.add_argument("--reuse-session", action="store_true", help="같은 계정으로 반복 (세션 캐시 재사용)")
+    parser.add_argument("--latency-ms", type=float, default=50, help="mock 응답 지연")
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--timing-profile", default=None, help="TIMING_PROFILE (default/slow)")
+    parser.add_argument("--seed", type=int, default=0)
+    for kind in mock_site.FAILURES:
+        parser.add_argument(f"--fail-{kind}", type=float, default=0, help=f"{kind} 실패 주입 확률 (0~1)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    fail = {k: getattr(args, f"fail_{k}") for k in mock_site.FAILURES}
+    server, url = mock_site.start(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, fail=fail, seed=args.seed)
+
+    # app 은 import 시점에 환경변수를 읽으므로 mock 주소/임시 저장소를 먼저 지정
+    workdir = tempfile.mkdtemp(prefix="lotto-bench-")
+    os.environ.update({
+        "DHLOTTERY_WWW_URL": url,
+        "DHLOTTERY_OL_URL": url,
+        "DHLOTTERY_EL_URL": url,
+        "BROWSER_POOL_SIZE": str(args.concurrency),
+        "PURCHASE_ENGINE": args.engine,
+        "ASYNC_PURCHASE_CONCURRENCY": str(args.concurrency),
+        "PURCHASE_QUEUE_MAX": str(args.jobs + args.warmup),
+        "DRAW_ARCHIVE_SYNC": "0",
+        "DRAW_ARCHIVE_FILE": os.path.join(workdir, "draws.bin"),
+        "HISTORY_DB": os.path.join(workdir, "history.db"),
+        "SESSION_CACHE_DIR": os.path.join(workdir, "sessions"),
+        "SELECTOR_CACHE_FILE": os.path.join(workdir, "selectors.json"),
+        "HEADLESS": "1",
+        "BROWSER_WARMUP": "0",        # 예열은 --warmup 작업으로 직접 수행
+        "SCHEDULER_ENABLED": "0",
+    })
+    if args.timing_profile:
+        os.environ["TIMING_PROFILE"] = args.timing_profile
+    import app
+
+    pool = app.get_purchase_queue() if args.engine == "async" else app.get_browser_pool()
+    rng = np.random.default_rng(args.seed)
+    tickets = {
+        i: [sorted(int(n) for n in rng.choice(45, 6, replace=False) + 1) for _ in range(args.games)]
+        for i in range(-args.warmup, args.jobs)
+    }
+
+    def run_one(i):
+        games = tickets[i]
+        user_id = "bench" if args.reuse_session else f"bench{i}"
+        started = time.perf_counter()
+        if args.engine == "async":
+            # 이벤트 루프에서 실행, 이 스레드는 결과만 대기
+            async def job_fn(job, engine):
+                return await app.automate_purchase_async(engine, user_id, "pw", games)
+            job = pool.submit(job_fn, kind="bench")
+            while job.finished_at is None:
+                time.sleep(0.01)
+            success, msg = (job.result or (False, job.error))[:2]
+        else:
+            success, msg, _, _ = app.automate_purchase(user_id, "pw", games)
+        return i, success, msg, time.perf_counter() - started
+
+    # 예열 (브라우저 실행/첫 페이지 로드 비용 제외)
+    for i in range(args.warmup):
+        run_one(-1 - i)
+    steps_before = app.PURCHASE_STEP_SECONDS.totals()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(run_one, range(args.jobs)))
+    wall = time.perf_counter() - started
+
+    latencies = [r[3] for r in results if r[1]]
+    failures = {}
+    for _, success, msg, _ in results:
+        if not success:
+            reason = app._failure_reason(msg)
+            failures[reason] = failures.get(reason, 0) + 1
+    steps = {}
+    for key, (count, total) in app.PURCHASE_STEP_SECONDS.totals().items():
+        prev_count, prev_total = steps_before.get(key, (0, 0.0))
+        if count > prev_count:
+            steps[key[0]] = round((total - prev_total) / (count - prev_count), 3)
+
+    report = {
+        "jobs": args.jobs,
+        "concurrency": args.concurrency,
+        "games_per_job": args.games,
+        "mock": {"latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "fail": fail},
+        "success": len(latencies),
+        "failures": failures,
+        "latency": _percentiles(latencies),
+        "latency_all": _percentiles([r[3] for r in results]),
+        "throughput_per_min": round(len(results) / wall * 60, 2),
+        "wall_seconds": round(wall, 2),
+        "step_mean_seconds": dict(sorted(steps.items(), key=lambda kv: -kv[1])),
+        "pool": pool.stats(),
+        "selector_resolver": app.selector_resolver.stats(),
+    }
+    pool.shutdown()
+    server.shutdown()
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if latencies else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class _Slot:
+    """브라우저 한 개를 소유하는 슬롯 (sync Playwright 객체는 생성한 스레드에서만 사용 가능)"""
+
+    def __init__(self, index):
+        self.index = index
+        self.thread = None
+        self.browser = None
+        self.jobs = 0          # 현재 브라우저로 처리한 작업 수 (재활용 판단용)
+        self.busy = False
+
+
+class BrowserPool:
+    """미리 띄워둔 Chromium 브라우저 풀
+
+    - 슬롯마다 전용 스레드가 Playwright + 브라우저를 소유하고 작업 큐를 소비
+    - 작업마다 새 격리 컨텍스트(new_context) 생성 → 종료 시 컨텍스트만 닫음
+    - 유휴 시 주기적 헬스체크, N회 작업 후 브라우저 재활용(recycle)
+    """
+
+    def __init__(self, size, launch_options, context_options, page_factory=None,
+                 max_jobs=20, health_interval=30):
+        self.size = max(1, int(size))
+        self.launch_options = launch_options
+        self.context_options = context_options
+        self.page_factory = page_factory or (lambda context: context.new_page())
+        self.max_jobs = max(1, int(max_jobs))
+        self.health_interval = health_interval
+        self._tasks = queue.Queue()
+        self._slots = [_Slot(i) for i in range(self.size)]
+        self._lock = threading.Lock()
+        self._started = False
+        self._stopped = False
+        self._launches = 0
+        self._recycles = 0
+        self._launch_failures = 0
+        self._jobs_total = 0
+
+    # ── 수명 주기 ───────────────────────────────────────────────
+    def start(self):
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+        for slot in self._slots:
+            slot.thread = threading.Thread(
+                target=self._slot_main, args=(slot,),
+                name=f"browser-pool-{slot.index}", daemon=True
+            )
+            slot.thread.start()
+        logger.info(f"[POOL] 브라우저 풀 시작 (size={self.size}, max_jobs={self.max_jobs})")
+        return self
+
+    def shutdown(self):
+        self._stopped = True
+        for _ in self._slots:
+            self._tasks.put(None)
+
+    # ── 작업 제출 ───────────────────────────────────────────────
+    def submit(self, fn, context_options=None):
+        """fn(page)를 풀의 격리 컨텍스트에서 실행하는 Future 반환"""
+        if not self._started:
+            self.start()
+        future = Future()
+        self._tasks.put((fn, context_options, future))
+        return future
+
+    def run(self, fn, context_options=None, timeout=None):
+        return self.submit(fn, context_options).result(timeout=timeout)
+
+    # ── 상태 ────────────────────────────────────────────────────
+    def stats(self):
+        with self._lock:
+            busy = sum(1 for s in self._slots if s.busy)
+            alive = sum(1 for s in self._slots if s.browser is not None)
+            return {
+                "size": self.size,
+                "idle": alive - busy,
+                "busy": busy,
+                "queued": self._tasks.qsize(),
+                "launches": self._launches,
+                "recycles": self._recycles,
+                "launch_failures": self._launch_failures,
+                "jobs": self._jobs_total,
+            }
+
+    # ── 슬롯 스레드 ─────────────────────────────────────────────
+    def _slot_main(self, slot):
+        from playwright.sync_api import sync_playwright
+        try:
+            with sync_playwright() as p:
+                self._launch(p, slot)
+                while not self._stopped:
+                    try:
+                        task = self._tasks.get(timeout=self.health_interval)
+                    except queue.Empty:
+                        self._health_check(p, slot)
+                        continue
+                    if task is None:
+                        break
+                    self._execute(p, slot, task)
+                self._close(slot)
+        except Exception as e:
+            logger.error(f"[POOL] 슬롯 {slot.index} 중단: {e}", exc_info=True)
+
+    def _launch(self, p, slot):
+        try:
+            slot.browser = p.chromium.launch(**self.launch_options)
+            slot.jobs = 0
+            with self._lock:
+                self._launches += 1
+            logger.info(f"[POOL] 슬롯 {slot.index} 브라우저 실행 완료")
+        except Exception as e:
+            slot.browser = None
+            with self._lock:
+                self._launch_failures += 1
+            logger.error(f"[POOL] 슬롯 {slot.index} 브라우저 실행 실패: {e}")
+
+    def _close(self, slot):
+        browser, slot.browser = slot.browser, None
+        if browser:
+            try:
+                browser.close()
+            except Exception:
+                pass
+
+    def _healthy(self, slot):
+        try:
+            return slot.browser is not None and slot.browser.is_connected()
+        except Exception:
+            return False
+
+    def _health_check(self, p, slot):
+        if not self._healthy(slot):
+            logger.warning(f"[POOL] 슬롯 {slot.index} 헬스체크 실패 → 재실행")
+            self._close(slot)
+            self._launch(p, slot)
+
+    def _recycle(self, p, slot):
+        logger.info(f"[POOL] 슬롯 {slot.index} {slot.jobs}회 사용 → 브라우저 재활용")
+        self._close(slot)
+        with self._lock:
+            self._recycles += 1
+        self._launch(p, slot)
+
+    def _execute(self, p, slot, task):
+        fn, extra_options, future = task
+        if not future.set_running_or_notify_cancel():
+            return
+        self._health_check(p, slot)
+        if slot.browser is None:
+            future.set_exception(RuntimeError("브라우저를 실행할 수 없습니다."))
+            return
+
+        with self._lock:
+            slot.busy = True
+        context = None
+        try:
+            context = slot.browser.new_context(**{**self.context_options, **(extra_options or {})})
+            page = self.page_factory(context)
+            future.set_result(fn(page))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            if context is not None:
+                try:
+                    context.close()
+                except Exception:
+                    pass
+            slot.jobs += 1
+            with self._lock:
+                slot.busy = False
+                self._jobs_total += 1
+            if slot.jobs >= self.max_jobs:
+                self._recycle(p, slot)
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+_NAME_RE = re.compile(r"^[\w\-]+\.zip$")
+_SECRET_HEADERS = {"cookie", "set-cookie", "authorization"}
+
+
+def _scrub_har(path):
+    """HAR에서 쿠키/인증 헤더/요청 본문(로그인 폼) 제거"""
+    with open(path, encoding="utf-8") as f:
+        har = json.load(f)
+    for entry in har.get("log", {}).get("entries", []):
+        for part in (entry.get("request", {}), entry.get("response", {})):
+            part["cookies"] = []
+            part["headers"] = [h for h in part.get("headers", []) if h.get("name", "").lower() not in _SECRET_HEADERS]
+        post = entry.get("request", {}).get("postData")
+        if post:
+            entry["request"]["postData"] = {"mimeType": post.get("mimeType", ""), "text": "", "params": []}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(har, f, ensure_ascii=False)
+
+
+class Capture:
+    """작업 1건의 trace + HAR 임시 기록 (실패/지연 시에만 보관)"""
+
+    def __init__(self, store):
+        self.store = store
+        self.id = uuid.uuid4().hex[:8]
+        self.tmp = tempfile.mkdtemp(prefix=f"capture-{self.id}-", dir=store.tmp_dir)
+        self.har_path = os.path.join(self.tmp, "network.har")
+        self.trace_path = os.path.join(self.tmp, "trace.zip")
+        self.tracing = False
+
+    def context_options(self):
+        # 응답 본문은 제외 (용량 절감), HAR 파일은 컨텍스트 종료 시 기록됨
+        return {"record_har_path": self.har_path, "record_har_content": "omit"}
+
+    def start(self, context):
+        """컨텍스트 생성 스레드에서 호출 (trace 에는 입력값이 남으므로 로그인 이후에 시작)"""
+        try:
+            context.tracing.start(screenshots=True, snapshots=True)
+            self.tracing = True
+        except Exception as e:
+            logger.warning(f"[CAPTURE] trace 시작 실패: {e}")
+
+    def finish(self, context, failed, reason, elapsed, meta=None):
+        """실패했거나 느린 작업이면 trace/HAR 를 zip 한 개로 보관 (예외를 던지지 않음)"""
+        slow = elapsed >= self.store.slow_seconds
+        keep = failed or slow
+        try:
+            if self.tracing and keep:
+                context.tracing.stop(path=self.trace_path)
+            elif self.tracing:
+                context.tracing.stop()   # 정상 작업은 기록 버림
+            context.close()   # HAR 파일 기록 (풀의 컨텍스트 정리보다 먼저 닫아야 결과에 포함)
+        except Exception as e:
+            logger.warning(f"[CAPTURE] trace/HAR 마무리 실패: {e}")
+        try:
+            if keep:
+                return self.store.save(self, reason if failed else "slow", elapsed, meta)
+        except Exception as e:
+            logger.error(f"[CAPTURE] 저장 실패: {e}")
+        finally:
+            self.discard()
+        return None
+
+    def discard(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+class CaptureStore:
+    """실패/지연 작업 capture 보관소 (개수·용량 초과 시 오래된 것부터 삭제)"""
+
+    def __init__(self, directory, max_count=20, max_bytes=200 * 1024 * 1024, slow_seconds=90):
+        self.directory = directory
+        self.tmp_dir = os.path.join(directory, ".tmp")
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.slow_seconds = slow_seconds
+        self.saved = 0
+        self.rotated = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        # 이전 실행에서 남은 임시 기록 정리
+        for name in os.listdir(self.tmp_dir):
+            shutil.rmtree(os.path.join(self.tmp_dir, name), ignore_errors=True)
+
+    def begin(self):
+        return Capture(self)
+
+    def save(self, capture, reason, elapsed, meta=None):
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}_{reason}_{capture.id}.zip"
+        path = os.path.join(self.directory, name)
+        info = {"reason": reason, "elapsed": round(elapsed, 3), "created_at": time.time(), **(meta or {})}
+        with zipfile.ZipFile(path + ".tmp", "w", zipfile.ZIP_DEFLATED) as z:
+            if os.path.exists(capture.trace_path):
+                # trace 는 이미 압축된 zip → 그대로 저장
+                z.write(capture.trace_path, "trace.zip", compress_type=zipfile.ZIP_STORED)
+            if os.path.exists(capture.har_path):
+                _scrub_har(capture.har_path)
+                z.write(capture.har_path, "network.har")
+            z.writestr("meta.json", json.dumps(info, ensure_ascii=False, indent=2))
+        os.replace(path + ".tmp", path)
+        with self._lock:
+            self.saved += 1
+        logger.info(f"[CAPTURE] {name} 저장 ({os.path.getsize(path) // 1024}KB, {reason})")
+        self._rotate()
+        return name
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if _NAME_RE.match(name):
+                st = os.stat(os.path.join(self.directory, name))
+                entries.append({"name": name, "size": st.st_size, "created_at": st.st_mtime})
+        return sorted(entries, key=lambda e: e["created_at"], reverse=True)
+
+    def _rotate(self):
+        with self._lock:
+            entries = self._entries()
+            total = sum(e["size"] for e in entries)
+            while entries and (len(entries) > self.max_count or total > self.max_bytes):
+                old = entries.pop()
+                total -= old["size"]
+                try:
+                    os.remove(os.path.join(self.directory, old["name"]))
+                    self.rotated += 1
+                except OSError:
+                    pass
+
+    def list(self):
+        with self._lock:
+            return self._entries()
+
+    def path(self, name):
+        """다운로드할 capture 파일 경로 (이름 검증, 없으면 None)"""
+        if not _NAME_RE.match(name or ""):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
+
+    def stats(self):
+        entries = self.list()
+        return {
+            "count": len(entries),
+            "bytes": sum(e["size"] for e in entries),
+            "saved": self.saved,
+            "rotated": self.rotated,
+            "slow_seconds": self.slow_seconds,
+        }
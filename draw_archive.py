@@ -0,0 +1,243 @@
+import http.client
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from urllib.parse import urlsplit
+
+import draw_schedule
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"LDA1"
+_HEADER = struct.Struct("<4sII")   # magic, 회차 수, 시작 회차
+
+
+class DrawClient:
+    """getLottoNumber API 클라이언트 (스레드별 keep-alive HTTPS 연결 재사용)"""
+
+    def __init__(self, user_agent, timeout=10, base_url="https://www.dhlottery.co.kr"):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        url = urlsplit(base_url)
+        self.host = url.netloc
+        # 로컬 mock 서버(http) 지원
+        self._conn_class = http.client.HTTPConnection if url.scheme == "http" else http.client.HTTPSConnection
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._conn_class(self.host, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def fetch(self, round_no):
+        """round_no 회차 결과 dict, 미추첨이면 None"""
+        path = f"/common.do?method=getLottoNumber&drwNo={round_no}"
+        for attempt in range(2):
+            conn = self._conn()
+            try:
+                conn.request("GET", path, headers={"User-Agent": self.user_agent, "Connection": "keep-alive"})
+                resp = conn.getresponse()
+                result = json.loads(resp.read().decode("utf-8"))
+                break
+            except (http.client.HTTPException, OSError):
+                # 끊긴 연결은 버리고 1회 재연결
+                conn.close()
+                self._local.conn = None
+                if attempt:
+                    raise
+        if result.get("returnValue") != "success":
+            return None
+        return {
+            "round": result.get("drwNo"),
+            "date": result.get("drwNoDate"),
+            "numbers": [result.get(f"drwtNo{i}") for i in range(1, 7)],
+            "bonus": result.get("bnusNo"),
+            "first_winners": result.get("firstPrzwnerCo", 0),
+            "first_prize": result.get("firstWinamnt", 0),
+        }
+
+
+class DrawArchive:
+    """역대 당첨번호 로컬 아카이브 (열 단위 고정폭 배열)
+
+    파일 구성: 헤더 + [번호 7바이트(6개+보너스) × N][추첨일 int32 × N]
+              [1등 당첨자 수 uint32 × N][1등 당첨금 uint64 × N]
+    회차 r 의 위치는 r - 1 (미수집 회차는 번호 0으로 남음).
+    """
+
+    def __init__(self, path, client, workers=8):
+        self.path = path
+        self.client = client
+        self.workers = workers
+        self._lock = threading.RLock()
+        self._listeners = []
+        self.numbers = array("B")   # 회차당 7칸
+        self.dates = array("i")     # date.toordinal()
+        self.winners = array("I")
+        self.prizes = array("Q")
+        self.last_sync_at = None
+        self.last_sync_added = 0
+        self.sync_failures = 0
+        self.load()
+
+    # ── 파일 입출력 ─────────────────────────────────────────────
+    def load(self):
+        started = time.perf_counter()
+        try:
+            with open(self.path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            return 0
+        try:
+            magic, count, first = _HEADER.unpack_from(raw, 0)
+            if magic != _MAGIC or first != 1:
+                raise ValueError("헤더 불일치")
+            offset = _HEADER.size
+            columns = []
+            for typecode, width in (("B", 7), ("i", 1), ("I", 1), ("Q", 1)):
+                col = array(typecode)
+                size = col.itemsize * width * count
+                col.frombytes(raw[offset:offset + size])
+                offset += size
+                columns.append(col)
+        except (ValueError, struct.error) as e:
+            logger.error(f"[DRAWS] 아카이브 파일 손상, 무시: {e}")
+            return 0
+        with self._lock:
+            self.numbers, self.dates, self.winners, self.prizes = columns
+        logger.info(f"[DRAWS] 아카이브 {count}회차 로드 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+        return count
+
+    def save(self):
+        with self._lock:
+            blob = _HEADER.pack(_MAGIC, len(self.dates), 1) + b"".join(
+                col.tobytes() for col in (self.numbers, self.dates, self.winners, self.prizes)
+            )
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(blob)
+        os.replace(tmp, self.path)
+
+    # ── 조회 ────────────────────────────────────────────────────
+    def __len__(self):
+        return len(self.dates)
+
+    def latest_round(self):
+        """수집된 마지막 회차 (없으면 0)"""
+        with self._lock:
+            for r in range(len(self.dates), 0, -1):
+                if self.numbers[(r - 1) * 7]:
+                    return r
+        return 0
+
+    def missing_rounds(self, upto):
+        with self._lock:
+            have = len(self.dates)
+            return [r for r in range(1, upto + 1) if r > have or not self.numbers[(r - 1) * 7]]
+
+    def get(self, round_no):
+        with self._lock:
+            if not 1 <= round_no <= len(self.dates) or not self.numbers[(round_no - 1) * 7]:
+                return None
+            i = round_no - 1
+            nums = self.numbers[i * 7:i * 7 + 7]
+            return {
+                "round": round_no,
+                "date": date.fromordinal(self.dates[i]).isoformat(),
+                "numbers": list(nums[:6]),
+                "bonus": nums[6],
+                "first_winners": self.winners[i],
+                "first_prize": self.prizes[i],
+            }
+
+    def range(self, start, end):
+        return [d for d in (self.get(r) for r in range(start, end + 1)) if d]
+
+    def snapshot(self):
+        """(회차 수, 번호 배열 복사본) - 통계 등 읽기 전용 계산용"""
+        with self._lock:
+            return len(self.dates), array("B", self.numbers)
+
+    # ── 수집/동기화 ─────────────────────────────────────────────
+    def subscribe(self, callback):
+        """새 회차 추가 시 callback(추가된 회차 dict 리스트) 호출"""
+        self._listeners.append(callback)
+
+    def _store(self, draw):
+        i = draw["round"] - 1
+        with self._lock:
+            while len(self.dates) <= i:
+                self.numbers.extend([0] * 7)
+                self.dates.append(0)
+                self.winners.append(0)
+                self.prizes.append(0)
+            self.numbers[i * 7:i * 7 + 7] = array("B", [*draw["numbers"], draw["bonus"]])
+            self.dates[i] = date.fromisoformat(draw["date"]).toordinal()
+            self.winners[i] = int(draw.get("first_winners") or 0)
+            self.prizes[i] = int(draw.get("first_prize") or 0)
+
+    def sync(self):
+        """추첨 일정상 나와 있어야 할 회차 중 빠진 회차만 수집 (최초 실행 시 전체 백필)"""
+        missing = self.missing_rounds(draw_schedule.latest_drawn_round())
+        if not missing:
+            return []
+        logger.info(f"[DRAWS] {len(missing)}개 회차 수집 시작 (동시 {self.workers})")
+        started = time.perf_counter()
+        added = []
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(missing))) as pool:
+            for r, draw in zip(missing, pool.map(self._safe_fetch, missing)):
+                if draw and draw.get("round") == r:
+                    self._store(draw)
+                    added.append(draw)
+        if added:
+            self.save()
+            for callback in self._listeners:
+                try:
+                    callback(added)
+                except Exception as e:
+                    logger.error(f"[DRAWS] 동기화 후처리 실패: {e}", exc_info=True)
+        self.last_sync_at = time.time()
+        self.last_sync_added = len(added)
+        logger.info(f"[DRAWS] {len(added)}개 회차 추가 ({time.perf_counter() - started:.1f}초)")
+        return added
+
+    def _safe_fetch(self, round_no):
+        try:
+            return self.client.fetch(round_no)
+        except Exception as e:
+            logger.warning(f"[DRAWS] {round_no}회 조회 실패: {e}")
+            return None
+
+    def start_sync(self, retry_interval=600):
+        """백그라운드 동기화: 즉시 1회 + 매주 결과 예상 시각마다 빠진 회차 수집"""
+        def loop():
+            while True:
+                try:
+                    self.sync()
+                except Exception as e:
+                    self.sync_failures += 1
+                    logger.error(f"[DRAWS] 동기화 실패: {e}")
+                if self.missing_rounds(draw_schedule.latest_drawn_round()):
+                    wait = retry_interval
+                else:
+                    wait = (draw_schedule.next_result_at() - draw_schedule.now_kst()).total_seconds()
+                time.sleep(max(60, wait))
+        threading.Thread(target=loop, name="draw-archive-sync", daemon=True).start()
+        return self
+
+    def stats(self):
+        return {
+            "rounds": len(self),
+            "latest_round": self.latest_round(),
+            "last_sync_at": self.last_sync_at,
+            "last_sync_added": self.last_sync_added,
+            "sync_failures": self.sync_failures,
+        }
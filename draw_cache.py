@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+
+import draw_schedule
+
+logger = logging.getLogger(__name__)
+
+
+class DrawResultCache:
+    """추첨 일정 기반 최신 당첨결과 캐시
+
+    - 다음 추첨 결과 예상 시각 전까지는 업스트림 호출 없이 캐시 응답
+    - 시각이 지나면 기존 결과를 즉시 응답하고 백그라운드에서 갱신 (stale-while-revalidate)
+    - 업스트림이 느리거나 실패해도 마지막 결과를 계속 제공, retry_interval 후 재시도
+    """
+
+    def __init__(self, fetch, retry_interval=300):
+        self.fetch = fetch                  # fetch(round_no) → dict | None
+        self.retry_interval = retry_interval
+        self._data = None
+        self._fetched_at = None
+        self._next_attempt = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    # ── 조회 ────────────────────────────────────────────────────
+    def get(self):
+        """(결과 dict, 캐시 메타) 반환, 결과가 한 번도 없으면 동기 조회"""
+        expected = draw_schedule.latest_drawn_round()
+        with self._lock:
+            data = self._data
+            fresh = data is not None and data['round'] >= expected
+
+        if fresh:
+            self.hits += 1
+            return data, self._meta(stale=False)
+        if data is not None:
+            # 오래된 결과 즉시 응답 + 백그라운드 갱신
+            self.stale_hits += 1
+            self._refresh_async(expected)
+            return data, self._meta(stale=True)
+
+        self.misses += 1
+        self._refresh(expected)
+        with self._lock:
+            data = self._data
+        if data is None:
+            return None, self._meta(stale=True)
+        return data, self._meta(stale=data['round'] < expected)
+
+    def update(self, data):
+        """외부(당첨번호 아카이브 동기화 등)에서 받은 최신 결과 반영"""
+        with self._lock:
+            if self._data is None or data['round'] >= self._data['round']:
+                self._data = data
+                self._fetched_at = time.time()
+
+    def stats(self):
+        total = self.hits + self.stale_hits + self.misses
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.hits + self.stale_hits) / total, 3) if total else 0.0,
+            "age": round(time.time() - self._fetched_at, 1) if self._fetched_at else None,
+            "round": self._data['round'] if self._data else None,
+        }
+
+    # ── 내부 ────────────────────────────────────────────────────
+    def _meta(self, stale):
+        stats = self.stats()
+        return {
+            "stale": stale,
+            "age": stats["age"],
+            "hit_rate": stats["hit_rate"],
+            "expires_at": draw_schedule.next_result_at().isoformat(),
+        }
+
+    def _refresh_async(self, expected):
+        with self._lock:
+            if self._refreshing or time.time() < self._next_attempt:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._refresh, args=(expected, True), daemon=True).start()
+
+    def _refresh(self, expected, claimed=False):
+        if not claimed:
+            with self._lock:
+                self._refreshing = True
+        try:
+            self.refreshes += 1
+            # 예상 회차가 아직 반영 전이면 직전 회차로 대체
+            data = self.fetch(expected) or (self._data is None and self.fetch(expected - 1))
+            if data:
+                self.update(data)
+            if not data or data['round'] < expected:
+                raise RuntimeError(f"{expected}회 결과 미반영")
+        except Exception as e:
+            self.refresh_failures += 1
+            self._next_attempt = time.time() + self.retry_interval
+            logger.warning(f"[RESULT] 당첨결과 갱신 실패 (기존 결과 유지): {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+
+# ── 로또 6/45 추첨 일정 (한국시간) ─────────────────────────────
+KST = timezone(timedelta(hours=9))
+FIRST_DRAW_DATE = datetime(2002, 12, 7, tzinfo=KST)   # 1회 추첨일 (토요일)
+DRAW_TIME = (20, 35)                                    # 매주 토요일 20:35 추첨
+RESULT_DELAY = timedelta(minutes=25)                    # 추첨 후 결과 API 반영까지 여유
+SALES_CLOSE = (20, 0)                                   # 추첨일 판매 마감 20:00
+SALES_DAILY_OPEN = 6                                    # 매일 00~06시 판매 정지
+
+
+def now_kst():
+    return datetime.now(KST)
+
+
+def draw_datetime(round_no):
+    """round_no 회차 추첨 시각 (KST)"""
+    return FIRST_DRAW_DATE + timedelta(weeks=round_no - 1, hours=DRAW_TIME[0], minutes=DRAW_TIME[1])
+
+
+def draw_date(round_no):
+    """round_no 회차 추첨일 (YYYY-MM-DD)"""
+    return draw_datetime(round_no).strftime('%Y-%m-%d')
+
+
+def result_available_at(round_no):
+    """round_no 회차 결과가 조회 가능해지는 예상 시각"""
+    return draw_datetime(round_no) + RESULT_DELAY
+
+
+def latest_drawn_round(now=None):
+    """now 시점에 결과가 나와 있어야 하는 최신 회차"""
+    now = now or now_kst()
+    weeks = (now - result_available_at(1)) // timedelta(weeks=1)
+    return max(1, int(weeks) + 1)
+
+
+def current_sales_round(now=None):
+    """now 시점에 판매 중인 회차 (토요일 추첨 전까지는 이번 주 회차)"""
+    now = now or now_kst()
+    weeks = (now - draw_datetime(1)) // timedelta(weeks=1)
+    return max(1, int(weeks) + 2)
+
+
+def next_result_at(now=None):
+    """다음 회차 결과가 나올 예상 시각 (캐시 만료 기준)"""
+    now = now or now_kst()
+    return result_available_at(latest_drawn_round(now) + 1)
+
+
+def sales_deadline(round_no):
+    """round_no 회차 판매 마감 시각 (추첨일 20:00 KST)"""
+    return draw_datetime(round_no).replace(hour=SALES_CLOSE[0], minute=SALES_CLOSE[1])
+
+
+def sales_open_at(round_no):
+    """round_no 회차 판매 시작 시각 (직전 추첨 다음 날 06:00 KST)"""
+    day = draw_datetime(round_no - 1) + timedelta(days=1)
+    return day.replace(hour=SALES_DAILY_OPEN, minute=0)
+
+
+def _sales_intervals(start, end):
+    """start~end 사이 판매 가능 구간 목록 (매일 06:00~24:00)"""
+    intervals = []
+    day = start.replace(hour=0, minute=0, second=0, microsecond=0)
+    while day < end:
+        lo = max(start, day.replace(hour=SALES_DAILY_OPEN))
+        hi = min(end, day + timedelta(days=1))
+        if lo < hi:
+            intervals.append((lo, hi))
+        day += timedelta(days=1)
+    return intervals
+
+
+def next_sales_time(at):
+    """at 이후 가장 이른 판매 가능 시각 (판매 정지 시간이면 다음 판매 시작 시각)"""
+    round_no = current_sales_round(at)
+    if at >= sales_deadline(round_no):
+        return sales_open_at(round_no + 1)
+    if at.hour < SALES_DAILY_OPEN:
+        return at.replace(hour=SALES_DAILY_OPEN, minute=0, second=0, microsecond=0)
+    return at
+
+
+def sales_slot(round_no, fraction, margin=timedelta(0)):
+    """round_no 회차 판매 시간(정지 시간 제외) 중 fraction(0~1) 지점 시각, 마감 margin 전까지로 한정"""
+    intervals = _sales_intervals(sales_open_at(round_no), sales_deadline(round_no) - margin)
+    total = sum((hi - lo for lo, hi in intervals), timedelta(0))
+    target = total * min(max(fraction, 0.0), 1.0)
+    for lo, hi in intervals:
+        if target <= hi - lo:
+            return lo + target
+        target -= hi - lo
+    return intervals[-1][1] if intervals else sales_deadline(round_no) - margin
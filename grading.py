@@ -0,0 +1,76 @@
+import numpy as np
+
+from recommend import rows_to_masks
+
+# 등수별 고정 당첨금 (1~3등은 회차별 변동 → 1등만 아카이브 값 사용)
+FIXED_PRIZES = {4: 50000, 5: 5000}
+PENDING = -1   # 아직 추첨 전(또는 회차 미상)
+
+_POP8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(masks):
+    """uint64 배열 비트 수"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).astype(np.int64)
+    return _POP8[masks.view(np.uint8).reshape(-1, 8)].sum(axis=1).astype(np.int64)
+
+
+class DrawTable:
+    """회차별 당첨 비트마스크/보너스 비트 (인덱스 = 회차-1, 미수집 회차는 0)"""
+
+    def __init__(self, count, numbers, prizes=None):
+        rows = np.frombuffer(numbers, dtype=np.uint8, count=count * 7).reshape(-1, 7).astype(np.intp)
+        drawn = rows[:, 0] > 0
+        safe = np.where(drawn[:, None], rows, 1)    # 미수집 회차는 계산 후 0으로
+        self.main = np.where(drawn, rows_to_masks(safe[:, :6]), np.uint64(0))
+        self.bonus = np.where(drawn, np.uint64(1) << (safe[:, 6] - 1).astype(np.uint64), np.uint64(0))
+        self.prizes = np.asarray(prizes if prizes is not None else np.zeros(count), dtype=np.int64)
+
+    @classmethod
+    def from_masks(cls, main, bonus, prizes):
+        """이미 계산된 배열로 생성 (복사 없음, 공유 메모리 뷰를 그대로 사용)"""
+        table = cls.__new__(cls)
+        table.main, table.bonus, table.prizes = main, bonus, prizes
+        return table
+
+    @classmethod
+    def from_archive(cls, archive):
+        count, numbers = archive.snapshot()
+        return cls(count, numbers, archive.prizes[:count])
+
+
+def grade(ticket_masks, rounds, table):
+    """구매 조합 전체를 한 번에 채점
+
+    반환: (일치 개수, 보너스 일치, 등수[1~5, 0=낙첨, -1=대기]) 배열
+    """
+    masks = np.asarray(ticket_masks, dtype=np.uint64)
+    idx = np.asarray(rounds, dtype=np.int64) - 1
+    drawn = (idx >= 0) & (idx < len(table.main))
+    drawn[drawn] &= table.main[idx[drawn]] != 0
+
+    matches = np.zeros(len(masks), dtype=np.int64)
+    bonus = np.zeros(len(masks), dtype=bool)
+    d = idx[drawn]
+    matches[drawn] = popcount(masks[drawn] & table.main[d])
+    bonus[drawn] = (masks[drawn] & table.bonus[d]) != 0
+
+    rank = np.select(
+        [matches == 6, (matches == 5) & bonus, matches == 5, matches == 4, matches == 3],
+        [1, 2, 3, 4, 5], default=0,
+    )
+    rank[~drawn] = PENDING
+    return matches, bonus, rank
+
+
+def prize_for(rank, round_no, table):
+    """등수별 당첨금 (2·3등은 회차별 금액 미보관 → None)"""
+    if rank in FIXED_PRIZES:
+        return FIXED_PRIZES[rank]
+    if rank == 1 and 1 <= round_no <= len(table.prizes):
+        return int(table.prizes[round_no - 1]) or None
+    if rank in (2, 3):
+        return None
+    return 0
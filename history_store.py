@@ -0,0 +1,378 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    timestamp   TEXT NOT NULL,
+    user_id     TEXT NOT NULL,
+    round       TEXT,
+    round_date  TEXT,
+    numbers     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_history_user_ts ON history(user_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_ts ON history(timestamp);
+CREATE TABLE IF NOT EXISTS grades (
+    history_id  INTEGER PRIMARY KEY REFERENCES history(id) ON DELETE CASCADE,
+    matches     INTEGER NOT NULL,
+    bonus       INTEGER NOT NULL,
+    rank        INTEGER NOT NULL,
+    graded_at   TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class HistoryStore:
+    """구매 이력 SQLite 저장소
+
+    - 추가는 INSERT 1건 (전체 파일 재작성 없음)
+    - user_id/timestamp 인덱스로 사용자별·기간별 조회
+    - 모든 쓰기는 트랜잭션, WAL 모드로 읽기와 쓰기가 서로 막지 않음
+    """
+
+    def __init__(self, path, legacy_json=None):
+        self.path = path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+        if legacy_json:
+            self.migrate_json(legacy_json)
+
+    def _conn(self):
+        # sqlite3 연결은 스레드별로 유지
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_entry(row):
+        return {
+            'timestamp': row['timestamp'],
+            'numbers': json.loads(row['numbers']),
+            'round': row['round'],
+            'round_date': row['round_date'],
+            'user_id': row['user_id'],
+        }
+
+    @staticmethod
+    def _to_row(entry):
+        return (
+            entry['timestamp'],
+            entry.get('user_id') or 'unknown',
+            entry.get('round'),
+            entry.get('round_date'),
+            json.dumps(entry.get('numbers', [])),
+        )
+
+    # ── 마이그레이션 ────────────────────────────────────────────
+    def migrate_json(self, json_path):
+        """기존 purchase_history.json을 1회만 가져옴 (meta 테이블에 완료 기록)"""
+        conn = self._conn()
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+            return 0
+        rows = []
+        if os.path.exists(json_path):
+            try:
+                with open(json_path, 'r', encoding='utf-8') as f:
+                    rows = [self._to_row(h) for h in json.load(f) if h.get('timestamp')]
+            except Exception as e:
+                logger.error(f"[HISTORY] JSON 마이그레이션 실패: {e}")
+                return 0
+        with conn:
+            # 오래된 항목부터 넣어 id 순서가 시간 순서와 일치하도록
+            conn.executemany(
+                "INSERT INTO history (timestamp, user_id, round, round_date, numbers) VALUES (?, ?, ?, ?, ?)",
+                sorted(rows, key=lambda r: r[0])
+            )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (json_path,))
+        logger.info(f"[HISTORY] JSON 이력 {len(rows)}건 SQLite로 이전 완료")
+        return len(rows)
+
+    # ── 조회 ────────────────────────────────────────────────────
+    def load(self, user_id=None, since=None):
+        """최신순 이력 (user_id/since 조건은 인덱스로 처리)"""
+        sql = "SELECT * FROM history"
+        where, args = [], []
+        if user_id:
+            where.append("user_id = ?")
+            args.append(user_id)
+        if since:
+            where.append("timestamp > ?")
+            args.append(since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY timestamp DESC, id DESC"
+        return [self._to_entry(r) for r in self._conn().execute(sql, args)]
+
+    def pending_grades(self, max_round):
+        """채점 안 된 이력 중 max_round 이하 회차 → [(id, 회차, 번호)]"""
+        rows = self._conn().execute(
+            """SELECT h.id, CAST(h.round AS INTEGER) AS round_no, h.numbers FROM history h
+               LEFT JOIN grades g ON g.history_id = h.id
+               WHERE g.history_id IS NULL AND CAST(h.round AS INTEGER) BETWEEN 1 AND ?""",
+            (max_round,)
+        )
+        return [(r['id'], r['round_no'], json.loads(r['numbers'])) for r in rows]
+
+    def save_grades(self, grades):
+        """grades: [(history_id, 일치 개수, 보너스 일치, 등수)]"""
+        now = datetime.now().isoformat()
+        with self._conn() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO grades (history_id, matches, bonus, rank, graded_at) VALUES (?, ?, ?, ?, ?)",
+                [(int(i), int(m), int(b), int(r), now) for i, m, b, r in grades]
+            )
+
+    def load_results(self, user_id=None, since=None):
+        """이력 + 채점 결과 (채점 전이면 rank 등은 None)"""
+        sql = """SELECT h.*, g.matches, g.bonus, g.rank, g.graded_at FROM history h
+                 LEFT JOIN grades g ON g.history_id = h.id"""
+        where, args = [], []
+        if user_id:
+            where.append("h.user_id = ?")
+            args.append(user_id)
+        if since:
+            where.append("h.timestamp > ?")
+            args.append(since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY h.timestamp DESC, h.id DESC"
+        results = []
+        for r in self._conn().execute(sql, args):
+            entry = self._to_entry(r)
+            entry.update({
+                'matches': r['matches'],
+                'bonus_match': bool(r['bonus']) if r['bonus'] is not None else None,
+                'rank': r['rank'],
+                'graded_at': r['graded_at'],
+            })
+            results.append(entry)
+        return results
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def size_bytes(self):
+        """DB 파일 + WAL 파일 크기 합계"""
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+    # ── 쓰기 ────────────────────────────────────────────────────
+    def add(self, entry):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO history (timestamp, user_id, round, round_date, numbers) VALUES (?, ?, ?, ?, ?)",
+                self._to_row(entry)
+            )
+        return entry
+
+    def replace_all(self, history):
+        """전체 이력 교체 (기존 save_history 호환)"""
+        with self._conn() as conn:
+            conn.execute("DELETE FROM history")
+            conn.executemany(
+                "INSERT INTO history (timestamp, user_id, round, round_date, numbers) VALUES (?, ?, ?, ?, ?)",
+                [self._to_row(h) for h in reversed(history)]
+            )
+
+    def delete_user(self, user_id):
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM history WHERE user_id = ?", (user_id,)).rowcount
+
+    def prune(self, before):
+        """before(ISO 문자열) 이전 이력 삭제, 삭제 건수 반환"""
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM history WHERE timestamp <= ?", (before,)).rowcount
+
+
+class HistoryIndex:
+    """user_id별로 묶은 이력 메모리 캐시
+
+    - 사용자 조회/삭제 비용은 해당 사용자 이력 수에만 비례
+    - DB 파일(mtime/size) 변경 감지 시 전체 무효화 (외부 쓰기·보관 정리 반영)
+    - add/delete/replace 는 캐시를 직접 갱신한 뒤 파일 시그니처를 다시 기록
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._users = {}          # user_id → 최신순 이력 리스트
+        self._signature = None
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _file_signature(self):
+        sig = []
+        for suffix in ("", "-wal"):
+            try:
+                st = os.stat(self.store.path + suffix)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    def _check(self):
+        sig = self._file_signature()
+        if sig != self._signature:
+            if self._users:
+                self.invalidations += 1
+            self._users.clear()
+            self._signature = sig
+
+    def get(self, user_id, since=None):
+        with self._lock:
+            self._check()
+            rows = self._users.get(user_id)
+            if rows is None:
+                self.misses += 1
+                rows = self.store.load(user_id=user_id)
+                self._users[user_id] = rows
+            else:
+                self.hits += 1
+            if since:
+                return [h for h in rows if h['timestamp'] > since]
+            return list(rows)
+
+    def add(self, entry):
+        with self._lock:
+            self._check()
+            self.store.add(entry)
+            rows = self._users.get(entry.get('user_id') or 'unknown')
+            if rows is not None:
+                rows.insert(0, entry)
+            self._signature = self._file_signature()
+        return entry
+
+    def delete_user(self, user_id):
+        with self._lock:
+            self._check()
+            deleted = self.store.delete_user(user_id)
+            self._users[user_id] = []
+            self._signature = self._file_signature()
+        return deleted
+
+    def save_grades(self, grades):
+        """채점 결과 저장 (캐시된 이력 내용은 그대로이므로 무효화하지 않음)"""
+        with self._lock:
+            self._check()
+            self.store.save_grades(grades)
+            self._signature = self._file_signature()
+
+    def invalidate(self):
+        with self._lock:
+            self._users.clear()
+            self._signature = None
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "rows": sum(len(r) for r in self._users.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+class HistoryCompactor:
+    """보관 기간이 지난 이력을 주기적으로 삭제하는 백그라운드 작업 (조회 경로는 쓰기 없음)"""
+
+    def __init__(self, store, retention_days=30, interval=3600):
+        self.store = store
+        self.retention_days = retention_days
+        self.interval = interval
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.runs = 0
+        self.rows_pruned_total = 0
+        self.last_pruned = 0
+        self.last_duration = 0.0
+        self.last_run_at = None
+
+    def cutoff(self):
+        return (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+
+    def subscribe(self, callback):
+        """정리 주기마다 callback() 호출 (미채점 이력 채점 등)"""
+        self._listeners.append(callback)
+
+    def start(self):
+        threading.Thread(target=self._loop, name="history-compactor", daemon=True).start()
+        logger.info(f"[HISTORY] 보관 정리 시작 (보관 {self.retention_days}일, 주기 {self.interval}초)")
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval)
+
+    def run_once(self):
+        started = time.perf_counter()
+        try:
+            pruned = self.store.prune(self.cutoff())
+        except Exception as e:
+            logger.error(f"[HISTORY] 보관 정리 실패: {e}")
+            return 0
+        duration = time.perf_counter() - started
+        with self._lock:
+            self.runs += 1
+            self.rows_pruned_total += pruned
+            self.last_pruned = pruned
+            self.last_duration = duration
+            self.last_run_at = time.time()
+        if pruned:
+            logger.info(f"[HISTORY] 보관 기간 초과 이력 {pruned}건 삭제 ({duration * 1000:.1f}ms)")
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[HISTORY] 정리 후처리 실패: {e}", exc_info=True)
+        return pruned
+
+    def stats(self):
+        with self._lock:
+            data = {
+                "retention_days": self.retention_days,
+                "interval": self.interval,
+                "runs": self.runs,
+                "rows_pruned_total": self.rows_pruned_total,
+                "last_pruned": self.last_pruned,
+                "last_duration_ms": round(self.last_duration * 1000, 3),
+                "last_run_at": self.last_run_at,
+            }
+        try:
+            data["rows"] = self.store.count()
+            data["size_bytes"] = self.store.size_bytes()
+        except Exception:
+            pass
+        return data
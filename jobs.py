@@ -0,0 +1,186 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """대기열이 가득 차서 작업을 받을 수 없음"""
+
+
+class Job:
+    """비동기 작업 1건의 상태 (단계별 진행 상황 + 최종 결과)"""
+
+    def __init__(self, fn, kind, meta=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.fn = fn
+        self.status = "queued"      # queued → running → done | failed (| cancelled: 비동기 엔진)
+        self.step_name = "queued"
+        self.progress = 0
+        self.message = "대기열에서 순서를 기다리는 중..."
+        self.steps = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def step(self, name, progress=None, message=None):
+        """현재 단계 갱신 (이전 단계는 완료 처리)"""
+        now = time.time()
+        with self._lock:
+            if self.steps and self.steps[-1]["finished_at"] is None:
+                self.steps[-1]["finished_at"] = now
+            self.steps.append({"name": name, "started_at": now, "finished_at": None})
+            self.step_name = name
+            if progress is not None:
+                self.progress = progress
+            if message is not None:
+                self.message = message
+
+    def update(self, progress=None, message=None):
+        """단계 추가 없이 현재 단계의 진행률/메시지만 갱신"""
+        with self._lock:
+            if progress is not None:
+                self.progress = progress
+            if message is not None:
+                self.message = message
+
+    def _finish(self, status, result=None, error=None):
+        now = time.time()
+        with self._lock:
+            if self.steps and self.steps[-1]["finished_at"] is None:
+                self.steps[-1]["finished_at"] = now
+            self.status = status
+            self.result = result
+            self.error = error
+            self.progress = 100
+            self.finished_at = now
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "step": self.step_name,
+                "progress": self.progress,
+                "message": self.message,
+                "steps": [
+                    {
+                        "name": s["name"],
+                        "duration": round((s["finished_at"] or time.time()) - s["started_at"], 3),
+                        "done": s["finished_at"] is not None,
+                    }
+                    for s in self.steps
+                ],
+                "meta": self.meta,
+                "result": self.result,
+                "error": self.error,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+            }
+
+
+class JobQueue:
+    """크기 제한 대기열 + 고정 개수 워커 스레드로 작업 실행
+
+    fn(job)이 dict를 반환하면 결과로 저장하고, 그 dict의 success가 False이거나
+    예외가 발생하면 failed 상태로 기록한다.
+    """
+
+    def __init__(self, concurrency=1, max_queue=20, keep=200, name="jobs"):
+        self.concurrency = max(1, int(concurrency))
+        self.max_queue = max(1, int(max_queue))
+        self.keep = keep
+        self.name = name
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._workers = []
+
+    def start(self):
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+        logger.info(f"[JOBS] '{self.name}' 워커 {self.concurrency}개 시작 (대기열 {self.max_queue})")
+        return self
+
+    def submit(self, fn, kind="job", meta=None):
+        job = Job(fn, kind, meta)
+        # 대기열에 넣기 전에 등록 (작업자/조회가 곧바로 job id 를 찾을 수 있도록)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job.id, None)
+                self._rejected += 1
+            raise QueueFull(f"대기열이 가득 찼습니다 ({self.max_queue}건). 잠시 후 다시 시도하세요.")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "max_queue": self.max_queue,
+                "queued": self._queue.qsize(),
+                "running": self._running,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+            }
+
+    def _evict(self):
+        # 완료된 작업만 오래된 순서로 정리 (진행 중인 작업은 유지)
+        if len(self._jobs) <= self.keep:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.keep:
+                break
+            if self._jobs[job_id].finished_at is not None:
+                del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            with self._lock:
+                self._running += 1
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                result = job.fn(job)
+                ok = not (isinstance(result, dict) and result.get("success") is False)
+                job._finish("done" if ok else "failed", result=result)
+            except Exception as e:
+                logger.error(f"[JOBS] 작업 {job.id} 실패: {e}", exc_info=True)
+                ok = False
+                job._finish("failed", error=str(e)[:200])
+            finally:
+                job.fn = None
+                with self._lock:
+                    self._running -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                self._queue.task_done()
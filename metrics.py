@@ -0,0 +1,150 @@
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """Prometheus 텍스트 포맷으로 내보낼 지표 모음"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        return "".join(m.render() for m in metrics)
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name}: 라벨 {self.label_names} 필요 (받음: {tuple(labels)})")
+        return tuple(str(labels[n]) for n in self.label_names)
+
+    def _header(self):
+        return f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.kind}\n"
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        lines = [f"{self.name}{_labels(self.label_names, k)} {_fmt(v)}\n" for k, v in items]
+        return self._header() + "".join(lines)
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램 (le 상한별 관측 수 + 합계 + 개수)"""
+    kind = "histogram"
+
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록 소요 시간(초) 관측 (예외/조기 반환 포함)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def totals(self):
+        """라벨 값 튜플 → (개수, 합계)"""
+        with self._lock:
+            return {k: (s[2], s[1]) for k, s in self._values.items()}
+
+    def render(self):
+        with self._lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._values.items())
+        out = [self._header()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = ("le", _fmt(float(bound)))
+                out.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}\n")
+            out.append(f"{self.name}_sum{_labels(self.label_names, key)} {_fmt(float(total))}\n")
+            out.append(f"{self.name}_count{_labels(self.label_names, key)} {count}\n")
+        return "".join(out)
+
+
+class Stopwatch:
+    """연속된 단계 측정: lap(name) 호출 시 직전 lap 이후 경과 시간을 name 단계로 기록"""
+
+    def __init__(self, histogram, label="step"):
+        self.histogram = histogram
+        self.label = label
+        self.laps = []
+        self._last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._last = now
+        self.histogram.observe(elapsed, **{self.label: name})
+        self.laps.append((name, elapsed))
+        return elapsed
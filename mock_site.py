@@ -0,0 +1,287 @@
+"""동행복권 사이트 오프라인 대역 (벤치마크/회귀 테스트용)
+
+자동화 코드가 의존하는 페이지·요소만 재현한다.
+  - 로그인: #inpUserId / #inpUserPswdEncn / #btnLogin → 성공 시 '로그아웃' 표시
+  - 구매: TotalGame.jsp 의 ifrm_tab 프레임 안 check645num1~45, #btnSelectNum, #btnBuy,
+          #popupLayerConfirm, #report .btn_popup_buy_confirm, 경고창(alert)
+  - /common.do?method=getLottoNumber JSON, method=main 회차 정보
+
+응답 지연(latency_ms ± jitter_ms)과 실패 주입 확률(fail)은 실행 중 /__mock/config 로도 바꿀 수 있다.
+
+    python mock_site.py --port 8765 --latency-ms 80 --fail-balance 0.1
+    DHLOTTERY_WWW_URL=http://127.0.0.1:8765 DHLOTTERY_OL_URL=... DHLOTTERY_EL_URL=... python app.py
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+import uuid
+
+from flask import Flask, jsonify, make_response, redirect, request
+from werkzeug.serving import make_server
+
+import draw_schedule
+
+logger = logging.getLogger(__name__)
+
+# 실패 주입 종류: 로그인 거부 / 예치금 부족 / 판매 마감 / 구매 버튼 누락
+FAILURES = ("login", "balance", "closed", "button")
+
+
+_LOGIN_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>로그인</title></head><body>
+<form id="loginForm" method="post" action="/login">
+  <input type="text" id="inpUserId" name="userId">
+  <input type="password" id="inpUserPswdEncn" name="userPswdEncn">
+  <a href="#" id="btnLogin" onclick="document.getElementById('loginForm').submit(); return false;">로그인</a>
+</form>
+<p class="login_fail">{error}</p>
+</body></html>"""
+
+_MAIN_PAGE = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>동행복권</title></head><body>
+<div class="gnb">{auth}</div>
+<div class="win_result"><h4>제 {round}회</h4><p class="desc">({date} 추첨)</p></div>
+</body></html>"""
+
+_TOTAL_GAME = """<!DOCTYPE html><html><head><meta charset="utf-8"><title>로또6/45 구매</title></head><body>
+<div class="gnb"><a href="/logout" class="btn_logout">로그아웃</a></div>
+<iframe id="ifrm_tab" name="ifrm_tab" src="/game/lotto645.jsp" width="900" height="700"></iframe>
+</body></html>"""
+
+_GAME_FRAME = """<!DOCTYPE html><html><head><meta charset="utf-8">
+<style>.popup {{ border: 1px solid #333; padding: 10px; }}</style></head><body>
+<h2>제 <span id="curRound">{round}</span>회</h2>
+<div id="board">{checkboxes}</div>
+<input type="button" id="resetAllNum" value="초기화" onclick="resetNumber645()">
+<input type="button" id="btnSelectNum" value="확인" onclick="selectNum()">
+<ul id="selectedGames"></ul>
+{buy_button}
+<div id="popupLayerConfirm" class="popup" style="display:none">
+  <p>구매하시겠습니까?</p>
+  <input type="button" value="확인" onclick="execBuy()">
+  <input type="button" value="취소" onclick="hide('popupLayerConfirm')">
+</div>
+<div id="report" class="popup" style="display:none">
+  <p id="reportMsg"></p>
+  <div class="btn_popup_buy_confirm"><input type="button" value="확인" onclick="hide('report')"></div>
+</div>
+<script>
+  const games = [];
+  const boxes = () => Array.from(document.querySelectorAll('input[id^=check645num]'));
+  function hide(id) {{ document.getElementById(id).style.display = 'none'; }}
+  function show(id) {{ document.getElementById(id).style.display = 'block'; }}
+  function selectWayTab(i) {{}}
+  function resetNumber645() {{ boxes().forEach(cb => cb.checked = false); }}
+  function check645(n) {{
+    const cb = document.getElementById('check645num' + n);
+    if (!cb.checked && boxes().filter(b => b.checked).length >= 6) {{ alert('번호는 6개까지 선택할 수 있습니다.'); return; }}
+    cb.checked = !cb.checked;
+  }}
+  function selectNum() {{
+    const nums = boxes().filter(b => b.checked).map(b => Number(b.value));
+    if (nums.length !== 6) {{ alert('번호 6개를 선택해 주세요.'); return; }}
+    if (games.length >= 5) {{ alert('한 번에 5게임을 초과하여 구매할 수 없습니다.'); return; }}
+    games.push(nums);
+    const li = document.createElement('li');
+    li.textContent = nums.join(', ');
+    document.getElementById('selectedGames').appendChild(li);
+    setTimeout(() => {{
+      resetNumber645();
+      const buy = document.getElementById('btnBuy');
+      if (buy) buy.disabled = false;
+    }}, {ui_delay});
+  }}
+  async function buyLotto() {{
+    if (!games.length) {{ alert('구매할 번호를 선택해 주세요.'); return; }}
+    const res = await fetch('/game/checkBuy', {{ method: 'POST', headers: {{ 'Content-Type': 'application/json' }}, body: JSON.stringify({{ games }}) }});
+    const data = await res.json();
+    if (!data.success) {{ alert(data.message); return; }}
+    show('popupLayerConfirm');
+  }}
+  async function execBuy() {{
+    hide('popupLayerConfirm');
+    const res = await fetch('/game/execBuy', {{ method: 'POST', headers: {{ 'Content-Type': 'application/json' }}, body: JSON.stringify({{ games }}) }});
+    const data = await res.json();
+    if (!data.success) {{ alert(data.message); return; }}
+    document.getElementById('reportMsg').textContent = data.message;
+    show('report');
+  }}
+</script>
+</body></html>"""
+
+
+def _draw(round_no):
+    """회차별 고정 당첨번호 (회차 번호를 시드로 생성)"""
+    rng = random.Random(round_no)
+    balls = rng.sample(range(1, 46), 7)
+    return sorted(balls[:6]), balls[6]
+
+
+def create_app(latency_ms=0, jitter_ms=0, fail=None, ui_delay_ms=50, seed=None):
+    """mock 사이트 Flask 앱 (설정은 app.config['MOCK'] 에 보관)"""
+    mock = Flask(__name__)
+    state = {
+        "latency_ms": latency_ms,
+        "jitter_ms": jitter_ms,
+        "ui_delay_ms": ui_delay_ms,
+        "fail": {k: float((fail or {}).get(k, 0)) for k in FAILURES},
+    }
+    sessions = {}        # 세션 id → user_id
+    purchases = []
+    counters = {"requests": 0, "logins": 0, "purchases": 0, "injected": {k: 0 for k in FAILURES}}
+    lock = threading.Lock()
+    rng = random.Random(seed)
+    mock.config["MOCK"] = state
+
+    def inject(kind):
+        with lock:
+            hit = rng.random() < state["fail"][kind]
+            if hit:
+                counters["injected"][kind] += 1
+            return hit
+
+    def user():
+        return sessions.get(request.cookies.get("JSESSIONID", ""))
+
+    def html(body):
+        resp = make_response(body)
+        resp.headers["Content-Type"] = "text/html; charset=utf-8"
+        return resp
+
+    @mock.before_request
+    def delay():
+        with lock:
+            counters["requests"] += 1
+            wait = state["latency_ms"] + rng.uniform(-1, 1) * state["jitter_ms"]
+        if not request.path.startswith("/__mock") and wait > 0:
+            time.sleep(wait / 1000)
+
+    @mock.route("/")
+    def main():
+        round_no = draw_schedule.current_sales_round()
+        auth = '<a href="/logout" class="btn_logout">로그아웃</a>' if user() else '<a href="/login">로그인</a>'
+        return html(_MAIN_PAGE.format(auth=auth, round=round_no,
+                                      date=draw_schedule.draw_date(round_no).replace("-", ".")))
+
+    @mock.route("/common.do")
+    def common():
+        method = request.args.get("method")
+        if method == "getLottoNumber":
+            round_no = request.args.get("drwNo", type=int) or 0
+            if not 1 <= round_no <= draw_schedule.latest_drawn_round():
+                return jsonify({"returnValue": "fail"})
+            numbers, bonus = _draw(round_no)
+            return jsonify({
+                "returnValue": "success",
+                "drwNo": round_no,
+                "drwNoDate": draw_schedule.draw_date(round_no),
+                **{f"drwtNo{i}": n for i, n in enumerate(numbers, 1)},
+                "bnusNo": bonus,
+                "firstPrzwnerCo": 10,
+                "firstWinamnt": 2_000_000_000,
+            })
+        return main()
+
+    @mock.route("/login", methods=["GET", "POST"])
+    def login():
+        if request.method == "GET":
+            return html(_LOGIN_PAGE.format(error=""))
+        user_id = request.form.get("userId", "")
+        if not user_id or request.form.get("userPswdEncn") == "wrong" or inject("login"):
+            return html(_LOGIN_PAGE.format(error="아이디 또는 비밀번호가 일치하지 않습니다."))
+        sid = uuid.uuid4().hex
+        with lock:
+            sessions[sid] = user_id
+            counters["logins"] += 1
+        resp = redirect("/")
+        resp.set_cookie("JSESSIONID", sid)
+        return resp
+
+    @mock.route("/olotto/game/game645.do")
+    def game645():
+        if not user():
+            return redirect("/login")
+        return html("<html><body>로또6/45 게임 <a class='btn_logout'>로그아웃</a></body></html>")
+
+    @mock.route("/game/TotalGame.jsp")
+    def total_game():
+        if not user():
+            return redirect("/login")
+        return html(_TOTAL_GAME)
+
+    @mock.route("/game/lotto645.jsp")
+    def game_frame():
+        checkboxes = "".join(
+            f'<input type="checkbox" id="check645num{n}" value="{n}"><label for="check645num{n}">{n}</label>'
+            for n in range(1, 46)
+        )
+        buy = "" if inject("button") else '<input type="button" id="btnBuy" value="구매하기" disabled onclick="buyLotto()">'
+        return html(_GAME_FRAME.format(round=draw_schedule.current_sales_round(), checkboxes=checkboxes,
+                                       buy_button=buy, ui_delay=state["ui_delay_ms"]))
+
+    @mock.route("/game/checkBuy", methods=["POST"])
+    def check_buy():
+        if not user():
+            return jsonify({"success": False, "message": "로그인 후 이용해 주세요."})
+        if inject("closed"):
+            return jsonify({"success": False, "message": "판매가 마감되었습니다."})
+        if inject("balance"):
+            return jsonify({"success": False, "message": "예치금이 부족합니다. 충전 후 이용해 주세요."})
+        return jsonify({"success": True})
+
+    @mock.route("/game/execBuy", methods=["POST"])
+    def exec_buy():
+        uid = user()
+        if not uid:
+            return jsonify({"success": False, "message": "로그인 후 이용해 주세요."})
+        games = (request.get_json(silent=True) or {}).get("games", [])
+        with lock:
+            purchases.append({"user_id": uid, "games": games, "at": time.time()})
+            counters["purchases"] += 1
+        return jsonify({"success": True, "message": f"{len(games)}게임 구매가 완료되었습니다."})
+
+    @mock.route("/__mock/config", methods=["GET", "POST"])
+    def config():
+        data = request.get_json(silent=True) or {}
+        with lock:
+            for key in ("latency_ms", "jitter_ms", "ui_delay_ms"):
+                if key in data:
+                    state[key] = float(data[key])
+            for key, rate in (data.get("fail") or {}).items():
+                if key in state["fail"]:
+                    state["fail"][key] = float(rate)
+            return jsonify({**state, "stats": counters})
+
+    @mock.route("/__mock/purchases")
+    def purchase_log():
+        with lock:
+            return jsonify(list(purchases))
+
+    return mock
+
+
+def start(port=0, host="127.0.0.1", **options):
+    """백그라운드 스레드에서 mock 서버 실행 → (서버, 기본 URL)"""
+    server = make_server(host, port, create_app(**options), threaded=True)
+    threading.Thread(target=server.serve_forever, name="mock-site", daemon=True).start()
+    url = f"http://{host}:{server.server_port}"
+    logger.info(f"[MOCK] 동행복권 mock 사이트 실행: {url}")
+    return server, url
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="동행복권 사이트 오프라인 mock 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    for kind in FAILURES:
+        parser.add_argument(f"--fail-{kind}", type=float, default=0, help=f"{kind} 실패 주입 확률 (0~1)")
+    args = parser.parse_args(argv)
+    fail = {k: getattr(args, f"fail_{k}") for k in FAILURES}
+    make_server(args.host, args.port, create_app(args.latency_ms, args.jitter_ms, fail), threaded=True).serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,106 @@
+import threading
+
+# 페이지 상태를 evaluate 1회로 판정 (DOM 전체 직렬화/전송 없음)
+# size: 현재 문서 HTML 크기(Navigation Timing) → page.content() 였다면 전송됐을 바이트 추정치
+_STATE_JS = """
+    const probe = () => {
+        const text = document.body ? document.body.textContent : '';
+        const logout = document.querySelector(
+            '.btn_logout, #btnLogout, a[href*="logout" i], a[href*="myPage"], a[onclick*="logout" i]');
+        const loggedIn = !!logout || Array.from(document.querySelectorAll('a, button'))
+            .some(el => (el.textContent || '').includes('로그아웃'));
+        const nav = performance.getEntriesByType('navigation')[0];
+        return {
+            logged_in: loggedIn,
+            simple: text.includes('간소화') && text.includes('운영'),
+            login_error: text.includes('로그인 정보가 맞지 않습니다') || text.includes('아이디 또는 비밀번호'),
+            game: text.includes('게임'),
+            size: nav ? nav.decodedBodySize : 0,
+        };
+    };
+"""
+
+STATE_JS = "() => {" + _STATE_JS + " return probe(); }"
+
+# 로그인 결과 대기용 조건식 (wait_for_function 에서 반복 평가)
+# 결과가 나오기 전에는 false, 이후 {state: 'ok' | 'simple' | 'error', size}
+LOGIN_STATE_JS = "() => {" + _STATE_JS + """
+    const s = probe();
+    const state = s.logged_in ? 'ok' : s.simple ? 'simple' : s.login_error ? 'error' : null;
+    return state ? {state: state, size: s.size} : false;
+}"""
+
+# 게임 프레임에 표시된 판매 회차 (#curRound 또는 '제 N회' 문구)
+ROUND_JS = """() => {
+    const el = document.getElementById('curRound');
+    const text = el ? el.textContent : (document.body ? document.body.textContent : '');
+    const m = text.match(/제?\\s*(\\d{3,5})\\s*회/) || text.match(/^\\s*(\\d{3,5})\\s*$/);
+    return m ? parseInt(m[1], 10) : null;
+}"""
+
+
+class PageProbes:
+    """page.content() 대신 쓰는 대상 지정 상태 조회 + 호출 수/절감 바이트 집계
+
+    on_probe(kind, bytes_avoided): 조회마다 호출 (지표 연동용)
+    """
+
+    def __init__(self, on_probe=None):
+        self.on_probe = on_probe
+        self.counts = {}
+        self.bytes_avoided = 0
+        self._lock = threading.Lock()
+
+    def record(self, kind, bytes_avoided=0):
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.bytes_avoided += bytes_avoided
+        if self.on_probe:
+            try:
+                self.on_probe(kind, bytes_avoided)
+            except Exception:
+                pass
+
+    def state(self, page, kind="state", replaces=1):
+        """현재 문서 상태 dict (replaces: 대체한 page.content() 호출 수)"""
+        state = page.evaluate(STATE_JS)
+        self.record(kind, state.get("size", 0) * replaces)
+        return state
+
+    async def state_async(self, page, kind="state", replaces=1):
+        state = await page.evaluate(STATE_JS)
+        self.record(kind, state.get("size", 0) * replaces)
+        return state
+
+    def logged_in(self, page):
+        try:
+            return self.state(page, "logged_in")["logged_in"]
+        except Exception:
+            return False
+
+    async def logged_in_async(self, page):
+        try:
+            return (await self.state_async(page, "logged_in"))["logged_in"]
+        except Exception:
+            return False
+
+    def login_result(self, value):
+        """LOGIN_STATE_JS 대기 결과 → 'ok'/'simple'/'error'/None (기존 루프의 content() 3회 대체)"""
+        if not value:
+            return None
+        self.record("login_wait", value.get("size", 0) * 3)
+        return value.get("state")
+
+    def frame_round(self, frame):
+        round_no = frame.evaluate(ROUND_JS)
+        self.record("round")
+        return round_no
+
+    async def frame_round_async(self, frame):
+        round_no = await frame.evaluate(ROUND_JS)
+        self.record("round")
+        return round_no
+
+    def stats(self):
+        with self._lock:
+            return {"probes": dict(self.counts), "bytes_avoided": self.bytes_avoided}
@@ -0,0 +1,474 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from cryptography.fernet import Fernet, InvalidToken
+
+import draw_schedule
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id           TEXT PRIMARY KEY,
+    user_id      TEXT NOT NULL,
+    credential   BLOB NOT NULL,
+    games        TEXT,              -- 고정 번호 [[6개], ...] (생성 방식이면 NULL)
+    count        INTEGER NOT NULL,  -- 회차당 게임 수
+    mode         TEXT,              -- 번호 생성 방식 (random/statistics/hot)
+    active       INTEGER NOT NULL DEFAULT 1,
+    created_at   REAL NOT NULL,
+    round        INTEGER,           -- 현재 목표 회차
+    next_run_at  REAL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    last_round   INTEGER NOT NULL DEFAULT 0,   -- 마지막으로 구매 성공한 회차
+    last_result  TEXT,
+    run_state    TEXT,              -- NULL(대기) | inflight(제출/실행 중) | unknown(구매 여부 불명)
+    run_round    INTEGER,           -- 진행 중/불명 실행의 회차
+    run_games    TEXT,              -- 진행 중/불명 실행에 제출한 번호
+    run_job      TEXT,
+    run_started_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_orders_due ON orders(active, next_run_at);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id);
+"""
+
+# 이전 버전 DB 에 없는 열 (시작 시 추가)
+_RUN_COLUMNS = {
+    "run_state": "TEXT", "run_round": "INTEGER", "run_games": "TEXT",
+    "run_job": "TEXT", "run_started_at": "REAL",
+}
+
+# 재시도하지 않는 실패 (사이트가 구매를 거절 → 이번 회차는 포기)
+FINAL_REASONS = {"insufficient_balance", "limit_exceeded", "sales_closed"}
+# 주문을 중지하는 실패 (계정 잠김 방지)
+STOP_REASONS = {"login"}
+# 이 단계에 들어간 뒤의 실패는 실제 구매가 됐는지 알 수 없음 → 자동 재시도하지 않음
+BUY_STEPS = {"buy", "popup"}
+
+
+def _load_key(key, key_file):
+    """Fernet 키 (미설정 시 key_file 에 생성해 재시작 후에도 같은 키 사용)"""
+    if key:
+        return key if isinstance(key, bytes) else key.encode()
+    if os.path.exists(key_file):
+        with open(key_file, "rb") as f:
+            return f.read().strip()
+    key = Fernet.generate_key()
+    fd = os.open(key_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    logger.info(f"[SCHEDULE] 암호화 키 생성: {key_file}")
+    return key
+
+
+class ScheduleStore:
+    """정기 구매 주문 SQLite 저장소 (비밀번호는 Fernet 암호화)"""
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self._local = threading.local()
+        self._fernet = Fernet(_load_key(key, path + ".key"))
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+            columns = {r["name"] for r in conn.execute("PRAGMA table_info(orders)")}
+            for name, kind in _RUN_COLUMNS.items():
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE orders ADD COLUMN {name} {kind}")
+
+    def _conn(self):
+        # sqlite3 연결은 스레드별로 유지
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_order(row):
+        return {
+            "order_id": row["id"],
+            "user_id": row["user_id"],
+            "games": json.loads(row["games"]) if row["games"] else None,
+            "count": row["count"],
+            "mode": row["mode"],
+            "active": bool(row["active"]),
+            "created_at": row["created_at"],
+            "round": row["round"],
+            "next_run_at": row["next_run_at"],
+            "attempts": row["attempts"],
+            "running": row["run_state"] == "inflight",
+            "run": {
+                "state": row["run_state"],
+                "round": row["run_round"],
+                "games": json.loads(row["run_games"]) if row["run_games"] else None,
+                "job_id": row["run_job"],
+                "started_at": row["run_started_at"],
+            } if row["run_state"] else None,
+            "last_round": row["last_round"],
+            "last_result": json.loads(row["last_result"]) if row["last_result"] else None,
+        }
+
+    def add(self, user_id, user_pw, games=None, count=None, mode=None):
+        order_id = uuid.uuid4().hex[:12]
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT INTO orders (id, user_id, credential, games, count, mode, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (order_id, user_id, self._fernet.encrypt(user_pw.encode()),
+                 json.dumps(games) if games else None, len(games) if games else count, mode, time.time()),
+            )
+        return order_id
+
+    def get(self, order_id):
+        row = self._conn().execute("SELECT * FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return self._to_order(row) if row else None
+
+    def list(self, user_id):
+        rows = self._conn().execute(
+            "SELECT * FROM orders WHERE user_id = ? ORDER BY created_at", (user_id,)).fetchall()
+        return [self._to_order(r) for r in rows]
+
+    def delete(self, order_id):
+        with self._conn() as conn:
+            return conn.execute("DELETE FROM orders WHERE id = ?", (order_id,)).rowcount > 0
+
+    def password(self, order_id):
+        row = self._conn().execute("SELECT credential FROM orders WHERE id = ?", (order_id,)).fetchone()
+        if not row:
+            return None
+        try:
+            return self._fernet.decrypt(row["credential"]).decode()
+        except InvalidToken:
+            return None
+
+    def due(self, now, limit):
+        """실행 시각이 된 주문 (진행 중/구매 여부 불명 주문 제외, 오래 기다린 순)"""
+        rows = self._conn().execute(
+            "SELECT * FROM orders WHERE active = 1 AND next_run_at <= ? "
+            "AND run_state IS NULL ORDER BY next_run_at LIMIT ?",
+            (now, limit),
+        ).fetchall()
+        return [self._to_order(r) for r in rows]
+
+    def in_state(self, state):
+        rows = self._conn().execute("SELECT * FROM orders WHERE run_state = ?", (state,)).fetchall()
+        return [self._to_order(r) for r in rows]
+
+    def unplanned(self):
+        rows = self._conn().execute("SELECT * FROM orders WHERE active = 1 AND next_run_at IS NULL").fetchall()
+        return [self._to_order(r) for r in rows]
+
+    def claim(self, order_id, now, round_no, games):
+        """실행 점유 + 제출할 번호 기록 (진행 중/불명 실행이 있으면 실패), 성공 시 True
+
+        점유는 시간이 지나도 풀리지 않는다. 실행 결과가 기록되거나 구매 여부가 확인될 때까지 유지.
+        """
+        with self._conn() as conn:
+            return conn.execute(
+                "UPDATE orders SET run_state = 'inflight', run_round = ?, run_games = ?, run_job = NULL, "
+                "run_started_at = ?, attempts = attempts + 1 WHERE id = ? AND run_state IS NULL",
+                (round_no, json.dumps(games), now, order_id),
+            ).rowcount > 0
+
+    def update(self, order_id, **fields):
+        if "last_result" in fields:
+            fields["last_result"] = json.dumps(fields["last_result"], ensure_ascii=False)
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self._conn() as conn:
+            conn.execute(f"UPDATE orders SET {cols} WHERE id = ?", (*fields.values(), order_id))
+
+    def count(self):
+        """(전체, 활성, 구매 여부 불명) 주문 수"""
+        return self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(active), 0), COALESCE(SUM(run_state = 'unknown'), 0) FROM orders"
+        ).fetchone()
+
+
+class PurchaseScheduler:
+    """정기 구매 주문을 회차 판매 마감 전에 나눠 실행하는 백그라운드 작업
+
+    - 주문마다 고정된 위치(주문 ID 해시)로 한 주의 판매 시간에 고르게 분산
+    - 기존 구매 대기열로 제출하고 동시에 max_inflight 건까지만 실행
+    - 구매 버튼 클릭 전 실패만 지수 백오프로 마감 retry_cutoff 전까지 재시도
+    - 주문/진행 상태는 SQLite 에 저장 (재시작 후 이어서 실행)
+
+    실제 돈이 나가는 작업이므로 중복 구매를 막는 쪽을 우선한다.
+    구매 버튼 클릭 이후 실패하거나 실행 중 서버가 재시작되면 실행을 unknown 으로 표시하고,
+    verify(order) 가 구매 이력으로 확인하거나 resolve() 로 확인 결과를 받을 때까지 재시도하지 않는다.
+    확인되지 않은 채 판매 마감이 지나면 그 회차는 재시도 없이 넘어간다.
+
+    submit(order, user_pw, games) → Job, generate(order) → games, classify(message) → 실패 사유,
+    verify(order) → True(구매됨) / False(구매 안 됨) / None(판단 불가)
+    """
+
+    def __init__(self, store, submit, generate, classify, verify=None, interval=30, max_inflight=1,
+                 margin=3600, retry_cutoff=600, retry_base=300, retry_max=3600,
+                 max_attempts=4, buy_steps=BUY_STEPS, on_result=None):
+        self.store = store
+        self.submit = submit
+        self.generate = generate
+        self.classify = classify
+        self.verify = verify
+        self.interval = interval
+        self.max_inflight = max(1, int(max_inflight))
+        self.margin = timedelta(seconds=margin)
+        self.retry_cutoff = timedelta(seconds=retry_cutoff)
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_attempts = max_attempts
+        self.buy_steps = set(buy_steps)
+        self.on_result = on_result
+        self._inflight = {}    # order_id → (job, round)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.results = {"success": 0, "retry": 0, "failed": 0, "missed": 0, "unknown": 0}
+        self.last_run_at = None
+
+    # ── 수명 주기 ───────────────────────────────────────────────
+    def start(self):
+        threading.Thread(target=self._loop, name="purchase-scheduler", daemon=True).start()
+        logger.info(f"[SCHEDULE] 정기 구매 스케줄러 시작 (주기 {self.interval}초, 동시 {self.max_inflight}건)")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def wake(self):
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[SCHEDULE] 실행 오류: {e}", exc_info=True)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    # ── 일정 계산 ───────────────────────────────────────────────
+    @staticmethod
+    def _fraction(order_id):
+        return int(hashlib.sha256(order_id.encode()).hexdigest()[:8], 16) / 0xFFFFFFFF
+
+    def plan(self, order_id, now=None, after_round=0):
+        """after_round 이후 첫 회차의 분산 실행 시각 → (회차, 실행 시각 epoch)"""
+        now = now or draw_schedule.now_kst()
+        round_no = draw_schedule.current_sales_round(now)
+        if now >= draw_schedule.sales_deadline(round_no) - self.margin:
+            round_no += 1
+        round_no = max(round_no, after_round + 1)
+        slot = draw_schedule.sales_slot(round_no, self._fraction(order_id), self.margin)
+        run_at = max(slot, draw_schedule.next_sales_time(now))
+        return round_no, run_at.timestamp()
+
+    def schedule(self, order_id, after_round=0):
+        """다음 회차 일정 (진행 중이던 실행 기록은 정리 - 결과가 확정된 뒤에만 호출)"""
+        round_no, run_at = self.plan(order_id, after_round=after_round)
+        self.store.update(order_id, round=round_no, next_run_at=run_at, attempts=0, **self._idle())
+        return round_no, run_at
+
+    @staticmethod
+    def _idle():
+        return {"run_state": None, "run_round": None, "run_games": None, "run_job": None, "run_started_at": None}
+
+    # ── 실행 ────────────────────────────────────────────────────
+    def run_once(self):
+        now = time.time()
+        self._collect()
+        self._recover()
+        self._check_unknown(now)
+        for order in self.store.unplanned():
+            self.schedule(order["order_id"], order["last_round"])
+        with self._lock:
+            free = self.max_inflight - len(self._inflight)
+        if free > 0:
+            for order in self.store.due(now, free):
+                self._dispatch(order, now)
+        with self._lock:
+            self.runs += 1
+            self.last_run_at = now
+
+    def _dispatch(self, order, now):
+        order_id, round_no = order["order_id"], order["round"]
+        if order["last_round"] >= round_no:
+            self.schedule(order_id, order["last_round"])
+            return
+        deadline = draw_schedule.sales_deadline(round_no) - self.retry_cutoff
+        if datetime.fromtimestamp(now, draw_schedule.KST) >= deadline:
+            self._finish(order, "missed", "판매 마감 전에 구매하지 못했습니다.")
+            return
+        user_pw = self.store.password(order_id)
+        if user_pw is None:
+            self.store.update(order_id, active=0, last_result=self._result(round_no, False, "저장된 비밀번호를 복호화할 수 없습니다."))
+            return
+        try:
+            games = order["games"] or self.generate(order)
+        except Exception as e:
+            logger.warning(f"[SCHEDULE] 주문 {order_id} 번호 생성 실패: {e}")
+            self.store.update(order_id, next_run_at=now + 60)
+            return
+        if not self.store.claim(order_id, now, round_no, games):
+            return
+        try:
+            job = self.submit(order, user_pw, games)
+        except Exception as e:
+            # 대기열 포화 등 (작업이 시작되지 않음) → 점유/시도 횟수 되돌리고 잠시 후 다시
+            logger.warning(f"[SCHEDULE] 주문 {order_id} 제출 실패: {e}")
+            self.store.update(order_id, attempts=order["attempts"], next_run_at=now + 60, **self._idle())
+            return
+        self.store.update(order_id, run_job=job.id)
+        logger.info(f"[SCHEDULE] 주문 {order_id} ({order['user_id']}) {round_no}회 구매 제출 → 작업 {job.id}")
+        with self._lock:
+            self._inflight[order_id] = (job, round_no)
+
+    def _collect(self):
+        with self._lock:
+            done = [(oid, job, r) for oid, (job, r) in self._inflight.items() if job.finished_at is not None]
+            for oid, _, _ in done:
+                del self._inflight[oid]
+        for order_id, job, round_no in done:
+            order = self.store.get(order_id)
+            if order is None:   # 실행 중 삭제된 주문
+                continue
+            result = job.result if isinstance(job.result, dict) else {}
+            message = result.get("message") or job.error or "알 수 없는 오류"
+            if result.get("success"):
+                self._succeed(order, round_no, message, job.id)
+                continue
+            reason = self.classify(message)
+            if reason in FINAL_REASONS:
+                self._finish(order, "failed", message, job.id)
+            elif self._past_buy(job):
+                self._mark_unknown(order, message, job.id)
+            elif reason in STOP_REASONS:
+                logger.warning(f"[SCHEDULE] 주문 {order_id} 로그인 실패 → 주문 중지")
+                self.store.update(order_id, active=0, last_result=self._result(round_no, False, message, job.id),
+                                  **self._idle())
+                self._count("failed")
+            elif order["attempts"] >= self.max_attempts:
+                self._finish(order, "failed", message, job.id)
+            else:
+                self._retry(order, message, job.id)
+
+    def _past_buy(self, job):
+        """구매 버튼 클릭 단계에 들어갔는지 (이후 실패는 구매 여부 불명)"""
+        return any(s["name"] in self.buy_steps for s in job.to_dict()["steps"])
+
+    def _recover(self):
+        """이 프로세스가 추적하지 않는 진행 중 실행 (재시작/비정상 종료 전 실행) → unknown"""
+        with self._lock:
+            tracked = set(self._inflight)
+        for order in self.store.in_state("inflight"):
+            if order["order_id"] not in tracked:
+                self._mark_unknown(order, "실행 중 서버가 종료되어 구매 여부를 알 수 없습니다.",
+                                   order["run"]["job_id"])
+
+    def _mark_unknown(self, order, message, job_id):
+        run_round = (order["run"] or {}).get("round") or order["round"]
+        logger.warning(f"[SCHEDULE] 주문 {order['order_id']} {run_round}회 구매 여부 불명 → 확인 전까지 재시도 안 함 ({message})")
+        self.store.update(order["order_id"], run_state="unknown",
+                          last_result=self._result(run_round, None, message, job_id))
+        self._count("unknown")
+
+    def _check_unknown(self, now):
+        """구매 여부 불명 실행을 구매 이력으로 확인, 판단 불가인 채 판매 마감이 지나면 다음 회차로"""
+        for order in self.store.in_state("unknown"):
+            run = order["run"]
+            verdict = None
+            if self.verify:
+                try:
+                    verdict = self.verify(order)
+                except Exception as e:
+                    logger.warning(f"[SCHEDULE] 주문 {order['order_id']} 구매 이력 확인 실패: {e}")
+            if verdict is not None:
+                self._settle_unknown(order, verdict, "구매 이력 확인")
+            elif datetime.fromtimestamp(now, draw_schedule.KST) >= draw_schedule.sales_deadline(run["round"]):
+                logger.warning(f"[SCHEDULE] 주문 {order['order_id']} {run['round']}회 구매 여부 미확인 상태로 판매 마감 → 다음 회차")
+                self.schedule(order["order_id"], max(run["round"], order["last_round"]))
+
+    def resolve(self, order_id, purchased):
+        """구매 여부 불명 실행의 확인 결과 반영 (동행복권 구매내역을 직접 확인한 경우), 대상이 아니면 False"""
+        order = self.store.get(order_id)
+        if not order or not order["run"] or order["run"]["state"] != "unknown":
+            return False
+        self._settle_unknown(order, purchased, "사용자 확인")
+        return True
+
+    def _settle_unknown(self, order, purchased, source):
+        run = order["run"]
+        if purchased:
+            self._succeed(order, run["round"], f"{source}: 구매됨", run["job_id"])
+            return
+        # 구매되지 않은 것이 확인됨 → 버튼 클릭 전 실패와 같이 처리
+        message = f"{source}: 구매되지 않음"
+        if order["attempts"] >= self.max_attempts:
+            self._finish(order, "failed", message, run["job_id"])
+        else:
+            self._retry(order, message, run["job_id"])
+
+    def _succeed(self, order, round_no, message, job_id):
+        self.store.update(order["order_id"], last_round=round_no,
+                          last_result=self._result(round_no, True, message, job_id))
+        self.schedule(order["order_id"], round_no)
+        self._count("success")
+
+    def _retry(self, order, message, job_id):
+        attempts = order["attempts"]
+        delay = min(self.retry_max, self.retry_base * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+        run_at = datetime.fromtimestamp(time.time() + delay, draw_schedule.KST)
+        run_at = draw_schedule.next_sales_time(run_at)
+        if run_at >= draw_schedule.sales_deadline(order["round"]) - self.retry_cutoff:
+            self._finish(order, "missed", message, job_id)
+            return
+        logger.info(f"[SCHEDULE] 주문 {order['order_id']} {attempts}회 실패 → {run_at:%m-%d %H:%M} 재시도 ({message})")
+        self.store.update(order["order_id"], next_run_at=run_at.timestamp(),
+                          last_result=self._result(order["round"], False, message, job_id), **self._idle())
+        self._count("retry")
+
+    def _finish(self, order, outcome, message, job_id=None):
+        """이번 회차 포기 → 다음 회차 일정"""
+        logger.warning(f"[SCHEDULE] 주문 {order['order_id']} {order['round']}회 {outcome}: {message}")
+        self.store.update(order["order_id"], last_result=self._result(order["round"], False, message, job_id))
+        self.schedule(order["order_id"], order["round"])
+        self._count(outcome)
+
+    @staticmethod
+    def _result(round_no, success, message, job_id=None):
+        return {"round": round_no, "success": success, "message": message, "job_id": job_id, "at": time.time()}
+
+    def _count(self, outcome):
+        with self._lock:
+            self.results[outcome] += 1
+        if self.on_result:
+            try:
+                self.on_result(outcome)
+            except Exception:
+                pass
+
+    def stats(self):
+        total, active, unknown = self.store.count()
+        with self._lock:
+            return {
+                "orders": total,
+                "active": active,
+                "unknown": unknown,
+                "inflight": len(self._inflight),
+                "max_inflight": self.max_inflight,
+                "interval": self.interval,
+                "runs": self.runs,
+                "results": dict(self.results),
+                "last_run_at": self.last_run_at,
+            }
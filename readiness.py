@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """서버 시작 후 예열 단계(브라우저 실행/확인 등) 진행 상태
+
+    liveness 는 프로세스가 응답하는지만, readiness 는 예열이 끝나 구매를 받을 수 있는지를 뜻한다.
+    단계가 실패하면 retry 초 후 처음부터 다시 시도한다 (최대 retry_max 초 간격).
+    """
+
+    def __init__(self, steps, retry=15, retry_max=300):
+        self.steps = steps          # [(이름, fn), ...]
+        self.retry = retry
+        self.retry_max = retry_max
+        self.phase = "starting"     # starting → warming → ready | failed(재시도 대기)
+        self.step = None
+        self.error = None
+        self.attempts = 0
+        self.durations = {}
+        self.started_at = time.time()
+        self.ready_at = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name="warmup", daemon=True).start()
+        return self
+
+    def _set(self, **fields):
+        with self._lock:
+            for k, v in fields.items():
+                setattr(self, k, v)
+
+    def _run(self):
+        delay = self.retry
+        while True:
+            self._set(phase="warming", error=None, attempts=self.attempts + 1)
+            try:
+                for name, fn in self.steps:
+                    self._set(step=name)
+                    started = time.perf_counter()
+                    fn()
+                    with self._lock:
+                        self.durations[name] = round(time.perf_counter() - started, 3)
+                self._set(phase="ready", step=None, ready_at=time.time())
+                logger.info(f"[READY] 예열 완료 ({time.time() - self.started_at:.1f}초, {self.durations})")
+                return
+            except Exception as e:
+                self._set(phase="failed", error=f"{self.step}: {str(e)[:200]}")
+                logger.error(f"[READY] 예열 실패 ({self.step}): {e} → {delay}초 후 재시도")
+                time.sleep(delay)
+                delay = min(self.retry_max, delay * 2)
+
+    @property
+    def ready(self):
+        return self.phase == "ready"
+
+    def state(self):
+        with self._lock:
+            return {
+                "phase": self.phase,
+                "ready": self.phase == "ready",
+                "step": self.step,
+                "error": self.error,
+                "attempts": self.attempts,
+                "durations": dict(self.durations),
+                "started_at": self.started_at,
+                "ready_at": self.ready_at,
+            }
+
+
+class CachedCheck:
+    """TTL 이 있는 진단 결과 캐시 (조회는 캐시만 반환, 갱신은 백그라운드 스레드 1개)
+
+    - ttl 이 지나면 백그라운드에서 check() 를 다시 실행 (조회 시 stale 이면 즉시 갱신 요청)
+    - busy() 가 참이면(구매 진행 중) 갱신을 미루고 이전 결과 유지
+    - check() 는 dict 를 반환하고 예외는 실패 결과로 기록
+    """
+
+    def __init__(self, check, ttl=300, busy=None, ready=None, retry=10):
+        self.check = check
+        self.ttl = ttl
+        self.busy = busy or (lambda: False)
+        self.ready = ready or (lambda: True)
+        self.retry = retry
+        self.result = None
+        self.checked_at = None
+        self.duration = None
+        self.refreshing = False
+        self.started = False
+        self.runs = 0
+        self.deferred = 0
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self.started:
+                return self
+            self.started = True
+        threading.Thread(target=self._loop, name="diagnostic", daemon=True).start()
+        return self
+
+    def stale(self):
+        return self.checked_at is None or time.time() - self.checked_at >= self.ttl
+
+    def refresh(self):
+        """다음 갱신을 바로 실행하도록 요청 (기다리지 않음)"""
+        with self._lock:
+            self.checked_at = None if self.result is None else self.checked_at - self.ttl
+        self._wake.set()
+
+    def get(self):
+        with self._lock:
+            data = {
+                "result": self.result,
+                "checked_at": self.checked_at,
+                "age": None if self.checked_at is None else round(time.time() - self.checked_at, 1),
+                "duration": self.duration,
+                "stale": self.stale(),
+                "refreshing": self.refreshing,
+                "ttl": self.ttl,
+            }
+        if data["stale"] and not data["refreshing"]:
+            self._wake.set()
+        return data
+
+    def _loop(self):
+        while True:
+            if not self.stale():
+                wait = self.ttl - (time.time() - self.checked_at)
+            elif not self.ready() or self.busy():
+                with self._lock:
+                    self.deferred += 1
+                wait = self.retry
+            else:
+                self._run_check()
+                continue
+            self._wake.wait(max(wait, 0.1))
+            self._wake.clear()
+
+    def _run_check(self):
+        with self._lock:
+            self.refreshing = True
+        started = time.perf_counter()
+        try:
+            result = self.check()
+        except Exception as e:
+            result = {"success": False, "msg": str(e)[:200]}
+        with self._lock:
+            self.result = result
+            self.checked_at = time.time()
+            self.duration = round(time.perf_counter() - started, 3)
+            self.refreshing = False
+            self.runs += 1
+        level = logging.INFO if result.get("success") else logging.WARNING
+        logger.log(level, f"[DIAG] 진단 갱신 ({self.duration}초): {result.get('msg')}")
+
+    def stats(self):
+        data = self.get()
+        return {k: data[k] for k in ("checked_at", "age", "stale", "refreshing")} | {
+            "success": (data["result"] or {}).get("success"), "runs": self.runs, "deferred": self.deferred,
+        }
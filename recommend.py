@@ -0,0 +1,104 @@
+import numpy as np
+
+BALLS = 45
+PICK = 6
+_BITS = np.uint64(1) << np.arange(BALLS, dtype=np.uint64)   # 번호 n → 비트 n-1
+
+
+def to_mask(numbers):
+    """번호 리스트 → 45비트 정수"""
+    mask = 0
+    for n in numbers:
+        mask |= 1 << (int(n) - 1)
+    return mask
+
+
+def rows_to_masks(rows):
+    """(N, 6) 번호 배열 → uint64 비트마스크 배열"""
+    rows = np.asarray(rows, dtype=np.intp)
+    if not rows.size:
+        return np.zeros(0, dtype=np.uint64)
+    return np.bitwise_or.reduce(_BITS[rows - 1], axis=1)
+
+
+def masks_to_rows(masks):
+    """uint64 비트마스크 배열 → 정렬된 (N, 6) 번호 배열"""
+    masks = np.asarray(masks, dtype=np.uint64)
+    bits = (masks[:, None] & _BITS) != 0
+    return np.nonzero(bits)[1].reshape(-1, PICK) + 1
+
+
+def _longest_run(rows):
+    """정렬된 조합별 최장 연속번호 길이"""
+    consecutive = np.diff(rows, axis=1) == 1
+    run = np.ones(len(rows), dtype=np.int64)
+    best = run.copy()
+    for col in consecutive.T:      # 열 5개만 순회, 조합 방향은 벡터 연산
+        run = np.where(col, run + 1, 1)
+        best = np.maximum(best, run)
+    return best
+
+
+class Constraints:
+    """조합 필터 조건 (None 이면 미적용)"""
+
+    def __init__(self, sum_min=None, sum_max=None, odd_min=None, odd_max=None, max_consecutive=None):
+        self.sum_min = sum_min
+        self.sum_max = sum_max
+        self.odd_min = odd_min
+        self.odd_max = odd_max
+        self.max_consecutive = max_consecutive
+
+    def mask(self, rows):
+        keep = np.ones(len(rows), dtype=bool)
+        if self.sum_min is not None or self.sum_max is not None:
+            total = rows.sum(axis=1)
+            if self.sum_min is not None:
+                keep &= total >= self.sum_min
+            if self.sum_max is not None:
+                keep &= total <= self.sum_max
+        if self.odd_min is not None or self.odd_max is not None:
+            odd = (rows % 2).sum(axis=1)
+            if self.odd_min is not None:
+                keep &= odd >= self.odd_min
+            if self.odd_max is not None:
+                keep &= odd <= self.odd_max
+        if self.max_consecutive is not None:
+            keep &= _longest_run(rows) <= self.max_consecutive
+        return keep
+
+    def to_dict(self):
+        return {k: v for k, v in vars(self).items() if v is not None}
+
+
+def generate(count, rng, weights=None, constraints=None, exclude=None,
+             batch=4096, max_candidates=200000):
+    """조건을 만족하는 서로 다른 조합 count개 생성
+
+    weights: 번호별 가중치(45) - 있으면 Gumbel top-k로 가중 비복원 추출
+    exclude: 제외할 조합 비트마스크 배열 (역대 당첨/사용자 구매 조합)
+    반환: (uint64 비트마스크 배열, 검사한 후보 수)
+    """
+    exclude = np.unique(np.asarray(exclude if exclude is not None else [], dtype=np.uint64))
+    log_w = None
+    if weights is not None:
+        w = np.asarray(weights, dtype=np.float64)
+        log_w = np.log(np.clip(w, 1e-9, None) / w.sum())
+    chosen = np.zeros(0, dtype=np.uint64)
+    generated = 0
+    while len(chosen) < count and generated < max_candidates:
+        keys = rng.random((batch, BALLS))
+        if log_w is not None:
+            keys = log_w - np.log(-np.log(keys))      # Gumbel 잡음 + log 가중치
+        rows = np.sort(np.argpartition(-keys, PICK, axis=1)[:, :PICK] + 1, axis=1)
+        generated += batch
+        if constraints is not None:
+            rows = rows[constraints.mask(rows)]
+        masks = rows_to_masks(rows)
+        if exclude.size:
+            masks = masks[~np.isin(masks, exclude)]
+        # 배치 내·기존 결과와 중복 제거 (생성 순서 유지)
+        masks = masks[~np.isin(masks, chosen)]
+        _, first = np.unique(masks, return_index=True)
+        chosen = np.concatenate([chosen, masks[np.sort(first)]])
+    return chosen[:count], generated
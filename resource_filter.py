@@ -0,0 +1,119 @@
+import logging
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# 구매 흐름에 필요한 유형 (허용 도메인이면 차단 규칙과 무관하게 통과)
+ESSENTIAL_TYPES = frozenset({"document", "script", "xhr", "fetch"})
+
+# 차단 요청 1건당 추정 절감 바이트 (차단하면 실제 크기를 알 수 없으므로 유형별 평균치 사용)
+SIZE_ESTIMATES = {
+    "image": 30 * 1024,
+    "media": 300 * 1024,
+    "font": 50 * 1024,
+    "stylesheet": 20 * 1024,
+    "script": 40 * 1024,
+    "document": 30 * 1024,
+}
+DEFAULT_ESTIMATE = 10 * 1024
+
+
+def _host_in(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourceRules:
+    """요청 차단 규칙 (유형/도메인 기반, 모든 작업이 공유)"""
+
+    def __init__(self, block_types=(), deny_domains=(), allow_domains=()):
+        self.block_types = frozenset(block_types)
+        self.deny_domains = tuple(deny_domains)
+        self.allow_domains = tuple(allow_domains)
+
+    @classmethod
+    def from_strings(cls, block_types, deny_domains, allow_domains):
+        """쉼표 구분 환경변수 값으로 생성"""
+        split = lambda value: [v.strip().lower() for v in (value or "").split(",") if v.strip()]
+        return cls(split(block_types), split(deny_domains), split(allow_domains))
+
+    def decide(self, url, resource_type):
+        """차단 사유("domain"/"type"), 통과면 None"""
+        host = (urlsplit(url).hostname or "").lower()
+        if resource_type in ESSENTIAL_TYPES and _host_in(host, self.allow_domains):
+            return None
+        if _host_in(host, self.deny_domains):
+            return "domain"
+        if resource_type in self.block_types:
+            return "type"
+        return None
+
+    def to_dict(self):
+        return {
+            "block_types": sorted(self.block_types),
+            "deny_domains": list(self.deny_domains),
+            "allow_domains": list(self.allow_domains),
+        }
+
+
+class ResourceBlocker:
+    """작업 1건의 컨텍스트에 규칙을 적용하고 차단 건수/추정 절감량 집계"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.allowed = 0
+        self.blocked = {}          # 유형 → 건수
+        self.blocked_domain = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+
+    def attach(self, context):
+        context.route("**/*", self._handle)
+        return self
+
+    async def attach_async(self, context):
+        await context.route("**/*", self._handle_async)
+        return self
+
+    def _decide(self, request):
+        rtype = request.resource_type
+        reason = self.rules.decide(request.url, rtype)
+        with self._lock:
+            if reason is None:
+                self.allowed += 1
+            else:
+                self.blocked[rtype] = self.blocked.get(rtype, 0) + 1
+                self.blocked_domain += reason == "domain"
+                self.bytes_saved += SIZE_ESTIMATES.get(rtype, DEFAULT_ESTIMATE)
+        return reason
+
+    def _handle(self, route):
+        reason = self._decide(route.request)
+        try:
+            if reason is None:
+                route.continue_()
+            else:
+                route.abort("blockedbyclient")
+        except Exception as e:
+            # 페이지 이동/컨텍스트 종료 중 취소된 요청
+            logger.debug(f"[BLOCK] 요청 처리 생략: {e}")
+
+    async def _handle_async(self, route):
+        reason = self._decide(route.request)
+        try:
+            if reason is None:
+                await route.continue_()
+            else:
+                await route.abort("blockedbyclient")
+        except Exception as e:
+            logger.debug(f"[BLOCK] 요청 처리 생략: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "allowed": self.allowed,
+                "blocked": sum(self.blocked.values()),
+                "blocked_by_type": dict(self.blocked),
+                "blocked_by_domain": self.blocked_domain,
+                "bytes_saved_estimate": self.bytes_saved,
+            }
@@ -0,0 +1,249 @@
+import asyncio
+import base64
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class ViewerLimit(Exception):
+    """스트림 시청자 수 제한 초과 (scope: 'job' 작업당 / 'total' 서버 전체)"""
+
+    def __init__(self, message, scope):
+        super().__init__(message)
+        self.scope = scope
+
+
+class FrameStream:
+    """작업 1건의 실시간 화면 프레임 (최신 프레임 1장만 보관, 대기 중인 구독자에게 push)
+
+    - fps 초과로 들어온 프레임은 보류했다가 다음 프레임/종료 시 반영 (마지막 화면 유실 방지)
+    - 직전과 같은 이미지는 버림
+    """
+
+    def __init__(self, fps=2):
+        self.min_interval = 1.0 / fps if fps > 0 else 0
+        self.frame = None
+        self.seq = 0
+        self.closed = False
+        self.closed_at = None
+        self.received = 0
+        self.published = 0
+        self.skipped = 0
+        self.viewers = 0      # 현재 연결된 MJPEG 시청자 수 (ScreencastHub 가 관리)
+        self._pending = None
+        self._last_at = 0.0
+        self._cond = threading.Condition()
+
+    def publish(self, data):
+        now = time.monotonic()
+        with self._cond:
+            self.received += 1
+            if now - self._last_at < self.min_interval:
+                if self._pending is not None:
+                    self.skipped += 1
+                self._pending = data
+                return
+            self._pending = None
+            self._push(data, now)
+
+    def _push(self, data, now):
+        if data == self.frame:
+            self.skipped += 1
+            return
+        self.frame = data
+        self.seq += 1
+        self.published += 1
+        self._last_at = now
+        self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            if self._pending is not None:
+                self._push(self._pending, time.monotonic())
+                self._pending = None
+            self.closed = True
+            self.closed_at = time.monotonic()
+            self._cond.notify_all()
+
+    def wait(self, after_seq, timeout):
+        """after_seq 이후의 새 프레임 (seq, 이미지), 시간 초과/종료 시 (after_seq, None)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self.seq > after_seq or self.closed, timeout)
+            if self.seq > after_seq:
+                return self.seq, self.frame
+            return after_seq, None
+
+    def stats(self):
+        with self._cond:
+            return {
+                "seq": self.seq,
+                "received": self.received,
+                "published": self.published,
+                "skipped": self.skipped,
+                "closed": self.closed,
+            }
+
+
+class ScreencastHub:
+    """job_id별 FrameStream 보관소 (종료된 스트림은 linger초 후 정리)
+
+    MJPEG 시청자는 연결 동안 웹 워커 스레드 1개를 점유하므로 작업당/전체 시청자 수를 제한한다.
+    """
+
+    def __init__(self, fps=2, linger=120, keep=50, max_viewers=2, max_viewers_per_stream=1):
+        self.fps = fps
+        self.linger = linger
+        self.keep = keep
+        self.max_viewers = max_viewers
+        self.max_viewers_per_stream = max_viewers_per_stream
+        self.viewers = 0
+        self.rejected = 0
+        self._streams = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, job_id):
+        """job_id의 스트림 (없으면 생성)"""
+        with self._lock:
+            stream = self._streams.get(job_id)
+            if stream is None:
+                self._evict()
+                stream = self._streams[job_id] = FrameStream(self.fps)
+            return stream
+
+    def get(self, job_id):
+        with self._lock:
+            return self._streams.get(job_id)
+
+    def attach(self, job_id):
+        """시청자 1명 등록 후 스트림 반환 (없으면 None, 제한 초과 시 ViewerLimit) - 연결 종료 시 detach"""
+        with self._lock:
+            stream = self._streams.get(job_id)
+            if stream is None:
+                return None
+            if stream.viewers >= self.max_viewers_per_stream:
+                self.rejected += 1
+                raise ViewerLimit("이미 이 작업의 화면을 보고 있는 연결이 있습니다.", "job")
+            if self.viewers >= self.max_viewers:
+                self.rejected += 1
+                raise ViewerLimit("실시간 화면 시청자가 많습니다. 잠시 후 다시 시도하세요.", "total")
+            stream.viewers += 1
+            self.viewers += 1
+            return stream
+
+    def detach(self, stream):
+        with self._lock:
+            stream.viewers -= 1
+            self.viewers -= 1
+
+    def stats(self):
+        with self._lock:
+            live = sum(1 for s in self._streams.values() if not s.closed)
+            return {
+                "fps": self.fps, "streams": len(self._streams), "live": live,
+                "viewers": self.viewers, "max_viewers": self.max_viewers, "rejected": self.rejected,
+            }
+
+    def _evict(self):
+        now = time.monotonic()
+        for job_id in list(self._streams):
+            s = self._streams[job_id]
+            if s.closed and (now - s.closed_at > self.linger or len(self._streams) > self.keep):
+                del self._streams[job_id]
+
+
+class Screencast:
+    """CDP Page.startScreencast 로 브라우저가 보내는 프레임을 FrameStream 에 전달
+
+    프레임은 화면이 바뀔 때만 브라우저가 인코딩해 보내므로 자동화 흐름에서
+    page.screenshot() 을 호출할 필요가 없다. 페이지를 소유한 스레드에서 start/stop 호출.
+    """
+
+    def __init__(self, page, stream, quality=60, max_width=800, max_height=1200):
+        self.page = page
+        self.stream = stream
+        self.params = {"format": "jpeg", "quality": quality,
+                       "maxWidth": max_width, "maxHeight": max_height, "everyNthFrame": 1}
+        self._cdp = None
+
+    def start(self):
+        try:
+            self._cdp = self.page.context.new_cdp_session(self.page)
+            self._cdp.on("Page.screencastFrame", self._on_frame)
+            self._cdp.send("Page.startScreencast", self.params)
+        except Exception as e:
+            # CDP 미지원(비 Chromium) 환경에서는 화면 중계만 생략
+            logger.debug(f"[SCREEN] 스크린캐스트 시작 실패: {e}")
+            self._cdp = None
+        return self
+
+    def _on_frame(self, params):
+        try:
+            self._cdp.send("Page.screencastFrameAck", {"sessionId": params["sessionId"]})
+        except Exception:
+            pass
+        self.stream.publish(base64.b64decode(params["data"]))
+
+    def stop(self):
+        if self._cdp is not None:
+            try:
+                self._cdp.send("Page.stopScreencast")
+                self._cdp.detach()
+            except Exception:
+                pass
+            self._cdp = None
+        self.stream.close()
+
+
+class AsyncScreencast(Screencast):
+    """Screencast 의 async Playwright 버전 (이벤트 루프에서 start/stop 을 await)"""
+
+    async def start(self):
+        try:
+            self._cdp = await self.page.context.new_cdp_session(self.page)
+            self._cdp.on("Page.screencastFrame", self._on_frame)
+            await self._cdp.send("Page.startScreencast", self.params)
+        except Exception as e:
+            logger.debug(f"[SCREEN] 스크린캐스트 시작 실패: {e}")
+            self._cdp = None
+        return self
+
+    def _on_frame(self, params):
+        asyncio.ensure_future(self._ack(params["sessionId"]))
+        self.stream.publish(base64.b64decode(params["data"]))
+
+    async def _ack(self, session_id):
+        try:
+            await self._cdp.send("Page.screencastFrameAck", {"sessionId": session_id})
+        except Exception:
+            pass
+
+    async def stop(self):
+        if self._cdp is not None:
+            try:
+                await self._cdp.send("Page.stopScreencast")
+                await self._cdp.detach()
+            except Exception:
+                pass
+            self._cdp = None
+        self.stream.close()
+
+
+def mjpeg(stream, boundary="frame", keepalive=15, max_duration=600, done=None):
+    """multipart/x-mixed-replace 응답 본문 제너레이터 (새 프레임이 있을 때만 전송)
+
+    스트림이 닫히거나 done() 이 참(작업 종료)이 되면 연결을 끝낸다.
+    """
+    seq = 0
+    deadline = time.monotonic() + max_duration
+    while time.monotonic() < deadline:
+        seq, frame = stream.wait(seq, keepalive)
+        if frame is not None:
+            yield (f"--{boundary}\r\nContent-Type: image/jpeg\r\n"
+                   f"Content-Length: {len(frame)}\r\n\r\n").encode() + frame + b"\r\n"
+        elif stream.closed or (done and done()):
+            break
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Playwright 전용 텍스트 의사 선택자 → (css, 방식, 텍스트)
+_TEXT_PSEUDO_RE = re.compile(r"^(.*?):(text-is|has-text)\(\s*(['\"])(.*)\3\s*\)$")
+
+# 후보 선택자 전체를 한 번에 검사: 후보 순서대로 첫 번째 '보이는' 요소의 (후보 번호, nth) 반환
+# nth 는 Playwright locator(selector).nth() 와 같은 문서 순서 기준 (숨겨진 요소 포함)
+_FIND_JS = """(cands) => {
+    const norm = s => (s || '').replace(/\\s+/g, ' ').trim();
+    const textOf = el => el.tagName === 'INPUT' && /^(button|submit|reset)$/i.test(el.type) ? el.value : el.textContent;
+    const visible = el => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length)
+        && getComputedStyle(el).visibility !== 'hidden';
+    for (let i = 0; i < cands.length; i++) {
+        const [css, mode, text] = cands[i];
+        let els;
+        try { els = Array.from(document.querySelectorAll(css || '*')); } catch (e) { continue; }
+        if (mode === 'text-is') els = els.filter(el => norm(textOf(el)) === text);
+        else if (mode === 'has-text') els = els.filter(el => norm(textOf(el)).toLowerCase().includes(text.toLowerCase()));
+        const nth = els.findIndex(visible);
+        if (nth >= 0) return [i, nth];
+    }
+    return null;
+}"""
+
+
+def _parse(selector):
+    m = _TEXT_PSEUDO_RE.match(selector)
+    if m:
+        return [m.group(1), m.group(2), " ".join(m.group(4).split())]
+    return [selector, None, None]
+
+
+def frame_key(frame):
+    """학습 기록용 프레임 식별자 (이름, 없으면 URL 경로, 메인 프레임은 '')"""
+    if frame.parent_frame is None:
+        return ""
+    return frame.name or urlsplit(frame.url).path
+
+
+class SelectorResolver:
+    """단계별로 클릭할 요소(프레임 + 선택자)를 찾고, 찾은 위치를 학습해 다음에 먼저 확인
+
+    - 프레임당 evaluate 1회로 후보 선택자 전체 검사 (is_visible 왕복 없음)
+    - 학습된 프레임이 있으면 그 프레임만 먼저 확인 → 학습된(또는 최우선) 선택자가 보이면 왕복 1회
+      그 외 후보만 보이면 우선순위가 더 높은 후보가 다른 프레임에 있을 수 있으므로 전체 탐색
+    - 학습 결과는 JSON 파일로 저장해 재시작 후에도 유지
+
+    on_resolve(step, result): 조회마다 호출, result 는 hit(학습 위치 적중)/miss(전체 탐색)/none(못 찾음)
+    """
+
+    def __init__(self, path=None, on_resolve=None):
+        self.path = path
+        self.on_resolve = on_resolve
+        self.learned = {}     # step → {"frame": key, "selector": sel}
+        self.stats_by_step = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.learned = {k: v for k, v in json.load(f).items() if isinstance(v, dict)}
+            logger.info(f"[RESOLVE] 학습된 선택자 {len(self.learned)}개 로드")
+        except Exception as e:
+            logger.warning(f"[RESOLVE] 학습 파일 로드 실패: {e}")
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.learned, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f"[RESOLVE] 학습 파일 저장 실패: {e}")
+
+    def _count(self, step, result):
+        with self._lock:
+            counts = self.stats_by_step.setdefault(step, {"hit": 0, "miss": 0, "none": 0})
+            counts[result] += 1
+        if self.on_resolve:
+            try:
+                self.on_resolve(step, result)
+            except Exception:
+                pass
+
+    def _learn(self, step, frame, selector):
+        entry = {"frame": frame_key(frame), "selector": selector}
+        with self._lock:
+            if self.learned.get(step) == entry:
+                return
+            self.learned[step] = entry
+            self._save()
+
+    @staticmethod
+    def _find(frame, cands):
+        try:
+            return frame.evaluate(_FIND_JS, cands)
+        except Exception:
+            return None   # 이동 중이거나 분리된 프레임
+
+    @staticmethod
+    async def _find_async(frame, cands):
+        try:
+            return await frame.evaluate(_FIND_JS, cands)
+        except Exception:
+            return None
+
+    def _frames(self, page, frame_names):
+        """우선 프레임 → 나머지 하위 프레임 → 메인 페이지 순"""
+        frames = [f for f in (page.frame(name=n) for n in frame_names) if f]
+        frames += [f for f in page.frames if f not in frames and f is not page.main_frame]
+        return frames + [page.main_frame]
+
+    def _plan(self, page, step, selectors, frame_names):
+        """(후보, 전체 탐색 프레임, 학습된 프레임 또는 None, 학습된 선택자 번호)"""
+        cands = [_parse(s) for s in selectors]
+        frames = self._frames(page, frame_names)
+        learned = self.learned.get(step)
+        first, idx = None, None
+        if learned and learned.get("selector") in selectors:
+            first = next((f for f in frames if frame_key(f) == learned["frame"]), None)
+            idx = selectors.index(learned["selector"])
+        return cands, frames, first, idx
+
+    @staticmethod
+    def _accept(found, idx):
+        """학습된 프레임 결과를 그대로 써도 되는지 (학습된 선택자 또는 최우선 후보일 때만)"""
+        return bool(found) and found[0] in (0, idx)
+
+    def _hit(self, step, selectors, frame, found):
+        self._count(step, "hit")
+        return frame, selectors[found[0]], found[1]
+
+    @staticmethod
+    def _better(best, frame, found):
+        if found and (best is None or found[0] < best[1][0]):
+            return frame, found
+        return best
+
+    def _settle(self, step, selectors, best):
+        if best is None:
+            self._count(step, "none")
+            return None
+        frame, (idx, nth) = best
+        self._count(step, "miss")
+        self._learn(step, frame, selectors[idx])
+        return frame, selectors[idx], nth
+
+    def resolve(self, page, step, selectors, frame_names=()):
+        """보이는 요소의 (frame, selector, nth), 없으면 None
+
+        선택자 우선순위가 프레임 순서보다 앞선다 (원래 선택자별 전체 프레임 순회와 같은 결과).
+        """
+        cands, frames, first, idx = self._plan(page, step, selectors, frame_names)
+        found = self._find(first, cands) if first else None
+        if self._accept(found, idx):
+            return self._hit(step, selectors, first, found)
+        best = None
+        for frame in frames:
+            # 학습된 프레임은 이미 확인한 결과 재사용 (프레임 순서상 원래 위치에서 비교)
+            best = self._better(best, frame, found if frame is first else self._find(frame, cands))
+            if best and best[1][0] == 0:
+                break
+        return self._settle(step, selectors, best)
+
+    async def resolve_async(self, page, step, selectors, frame_names=()):
+        """resolve 의 async Playwright 버전"""
+        cands, frames, first, idx = self._plan(page, step, selectors, frame_names)
+        found = await self._find_async(first, cands) if first else None
+        if self._accept(found, idx):
+            return self._hit(step, selectors, first, found)
+        best = None
+        for frame in frames:
+            best = self._better(best, frame, found if frame is first else await self._find_async(frame, cands))
+            if best and best[1][0] == 0:
+                break
+        return self._settle(step, selectors, best)
+
+    def forget(self, step):
+        """학습된 위치에서 클릭이 실패하면 다음 조회 때 전체 탐색"""
+        with self._lock:
+            if self.learned.pop(step, None) is not None:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            totals = {"hit": 0, "miss": 0, "none": 0}
+            for counts in self.stats_by_step.values():
+                for k, v in counts.items():
+                    totals[k] += v
+            return {
+                **totals,
+                "learned": len(self.learned),
+                "steps": {k: dict(v) for k, v in self.stats_by_step.items()},
+            }
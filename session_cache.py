@@ -0,0 +1,153 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from cryptography.fernet import Fernet, InvalidToken
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCache:
+    """로그인 완료된 Playwright storage_state 캐시 (사용자별, 암호화 저장)
+
+    - 메모리: LRU (max_entries 초과 시 가장 오래 안 쓴 항목 제거)
+    - 디스크: Fernet 암호화 파일, TTL 경과 시 복호화 단계에서 만료 처리
+    - 비밀번호가 다르면 캐시를 재사용하지 않음 (HMAC 다이제스트 비교)
+    """
+
+    def __init__(self, directory, ttl=1200, max_entries=50, key=None):
+        self.directory = directory
+        self.ttl = int(ttl)
+        self.max_entries = max(1, int(max_entries))
+        if not key:
+            # 키 미설정 시 프로세스 전용 임시 키 (재시작 후 기존 파일은 자동 무효)
+            key = Fernet.generate_key()
+            logger.info("[SESSION] SESSION_CACHE_KEY 미설정 → 임시 암호화 키 사용")
+        self._key = key if isinstance(key, bytes) else key.encode()
+        self._fernet = Fernet(self._key)
+        self._entries = OrderedDict()   # file_id → 암호화 토큰
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.rejected = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    # ── 키/경로 ─────────────────────────────────────────────────
+    def _file_id(self, user_id):
+        return hmac.new(self._key, user_id.encode(), hashlib.sha256).hexdigest()[:32]
+
+    def _pw_digest(self, user_id, user_pw):
+        return hmac.new(self._key, f"{user_id}\0{user_pw}".encode(), hashlib.sha256).hexdigest()
+
+    def _path(self, file_id):
+        return os.path.join(self.directory, f"{file_id}.bin")
+
+    # ── 조회/저장 ───────────────────────────────────────────────
+    def get(self, user_id, user_pw):
+        """유효한 storage_state 반환, 없거나 만료되면 None"""
+        file_id = self._file_id(user_id)
+        with self._lock:
+            cached = self._entries.get(file_id)
+            if cached:
+                self._entries.move_to_end(file_id)
+        token = cached or self._read(file_id)
+        if token is None:
+            return self._miss()
+
+        try:
+            payload = json.loads(self._fernet.decrypt(token, ttl=self.ttl))
+        except InvalidToken:
+            # TTL 만료 또는 다른 키로 암호화된 파일
+            self.expired += 1
+            self.invalidate(user_id)
+            return self._miss()
+
+        if not hmac.compare_digest(payload.get("pw", ""), self._pw_digest(user_id, user_pw)):
+            return self._miss()
+        state = payload.get("state")
+        if not state or self._cookies_expired(state):
+            self.expired += 1
+            self.invalidate(user_id)
+            return self._miss()
+
+        if not cached:
+            self._remember(file_id, token)
+        self.hits += 1
+        return state
+
+    def put(self, user_id, user_pw, state):
+        payload = json.dumps({"pw": self._pw_digest(user_id, user_pw), "state": state})
+        token = self._fernet.encrypt(payload.encode())
+        file_id = self._file_id(user_id)
+        self._remember(file_id, token)
+        try:
+            tmp = self._path(file_id) + ".tmp"
+            with open(tmp, 'wb') as f:
+                f.write(token)
+            os.replace(tmp, self._path(file_id))
+        except OSError as e:
+            logger.warning(f"[SESSION] 캐시 파일 저장 실패: {e}")
+
+    def invalidate(self, user_id):
+        """재사용 실패(세션 거부) 시 호출"""
+        file_id = self._file_id(user_id)
+        with self._lock:
+            self._entries.pop(file_id, None)
+        try:
+            os.remove(self._path(file_id))
+        except OSError:
+            pass
+
+    def reject(self, user_id):
+        self.rejected += 1
+        self.invalidate(user_id)
+
+    def stats(self):
+        total = self.hits + self.misses
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "rejected": self.rejected,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "ttl": self.ttl,
+        }
+
+    # ── 내부 ────────────────────────────────────────────────────
+    def _miss(self):
+        self.misses += 1
+        return None
+
+    def _remember(self, file_id, token):
+        with self._lock:
+            self._entries[file_id] = token
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_entries:
+                old_id, _ = self._entries.popitem(last=False)
+                try:
+                    os.remove(self._path(old_id))
+                except OSError:
+                    pass
+
+    def _read(self, file_id):
+        try:
+            with open(self._path(file_id), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    @staticmethod
+    def _cookies_expired(state):
+        # 만료 시각이 있는 쿠키가 모두 지났으면 서버 접속 없이 만료로 판단
+        now = time.time()
+        timed = [c.get("expires", -1) for c in state.get("cookies", []) if c.get("expires", -1) > 0]
+        return bool(timed) and all(exp < now for exp in timed)
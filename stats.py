@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BALLS = 45
+
+
+def onehot(draws):
+    """(N, 7) 번호 배열 → (N, 45) 당첨번호 one-hot (보너스 제외, 미수집 회차는 전부 0)"""
+    draws = np.asarray(draws, dtype=np.intp).reshape(-1, 7)
+    X = np.zeros((len(draws), BALLS + 1), dtype=np.int32)
+    X[np.arange(len(draws))[:, None], draws[:, :6]] = 1
+    return X[:, 1:]
+
+
+class DrawStats:
+    """역대 당첨번호 통계 (번호별 빈도, 45×45 동시출현, 미출현 기간, 최근 N회 빈도)
+
+    모든 계산은 NumPy 배열 연산이며, 새 회차는 누적값에 더하기만 해서 반영한다.
+    """
+
+    def __init__(self, windows=(5, 10, 26, 52)):
+        self.windows = tuple(windows)
+        self._lock = threading.Lock()
+        self._reset(0)
+
+    def _reset(self, count):
+        self.count = count
+        self.freq = np.zeros(BALLS, dtype=np.int64)
+        self.bonus_freq = np.zeros(BALLS, dtype=np.int64)
+        self.cooc = np.zeros((BALLS, BALLS), dtype=np.int64)
+        self.last_seen = np.full(BALLS, -1, dtype=np.int64)      # 마지막 출현 인덱스(회차-1)
+        self.cumsum = np.zeros((1, BALLS), dtype=np.int32)      # 누적 출현 수 (구간 빈도용)
+        self._summary = None
+        self.updated_at = None
+
+    # ── 갱신 ────────────────────────────────────────────────────
+    def rebuild(self, numbers, count):
+        """아카이브 전체(numbers: 회차당 7바이트 버퍼)로 다시 계산"""
+        started = time.perf_counter()
+        draws = np.frombuffer(numbers, dtype=np.uint8, count=count * 7).reshape(-1, 7)
+        with self._lock:
+            self._reset(0)
+            self._append(draws)
+        logger.info(f"[STATS] {count}회차 통계 계산 ({(time.perf_counter() - started) * 1000:.1f}ms)")
+
+    def add(self, draws, start_index):
+        """start_index(회차-1)부터 이어지는 새 회차만 누적, 이어지지 않으면 False"""
+        with self._lock:
+            if start_index != self.count:
+                return False
+            self._append(np.asarray(draws, dtype=np.uint8).reshape(-1, 7))
+            return True
+
+    def _append(self, draws):
+        X = onehot(draws)
+        k = len(X)
+        if not k:
+            return
+        self.freq += X.sum(axis=0)
+        self.cooc += X.T @ X
+        bonus = draws[:, 6].astype(np.intp)
+        self.bonus_freq += np.bincount(bonus[bonus > 0] - 1, minlength=BALLS)
+        idx = np.where(X, np.arange(self.count, self.count + k)[:, None], -1)
+        self.last_seen = np.maximum(self.last_seen, idx.max(axis=0))
+        self.cumsum = np.vstack([self.cumsum, self.cumsum[-1] + X.cumsum(axis=0)])
+        self.count += k
+        self._summary = None
+        self.updated_at = time.time()
+
+    # ── 조회 ────────────────────────────────────────────────────
+    def window_freq(self, window):
+        """최근 window회 번호별 출현 수"""
+        with self._lock:
+            w = min(window, self.count)
+            return self.cumsum[-1] - self.cumsum[-1 - w]
+
+    def summary(self, matrix=False):
+        with self._lock:
+            if self._summary is None:
+                self._summary = self._build_summary()
+            data = dict(self._summary)
+            if matrix:
+                data["cooccurrence"] = self.cooc.tolist()
+            return data
+
+    def _build_summary(self):
+        numbers = np.arange(1, BALLS + 1)
+        gaps = np.where(self.last_seen >= 0, self.count - 1 - self.last_seen, self.count)
+        # 동시출현 상위 쌍 (대각선 = 단일 출현 수이므로 상삼각만)
+        upper = np.triu(self.cooc, k=1)
+        top = np.argsort(upper, axis=None)[::-1][:10]
+        rows, cols = np.unravel_index(top, upper.shape)
+        windows = {}
+        for w in self.windows:
+            wf = self.cumsum[-1] - self.cumsum[-1 - min(w, self.count)]
+            windows[str(w)] = {
+                "frequency": wf.tolist(),
+                "hot": (numbers[np.argsort(-wf, kind="stable")][:6]).tolist(),
+            }
+        return {
+            "rounds": int(self.count),
+            "frequency": self.freq.tolist(),
+            "bonus_frequency": self.bonus_freq.tolist(),
+            "gaps": gaps.tolist(),
+            "most_frequent": numbers[np.argsort(-self.freq, kind="stable")][:10].tolist(),
+            "least_frequent": numbers[np.argsort(self.freq, kind="stable")][:10].tolist(),
+            "most_overdue": numbers[np.argsort(-gaps, kind="stable")][:10].tolist(),
+            "top_pairs": [
+                {"pair": [int(r) + 1, int(c) + 1], "count": int(upper[r, c])}
+                for r, c in zip(rows, cols)
+            ],
+            "windows": windows,
+            "updated_at": self.updated_at,
+        }